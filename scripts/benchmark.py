@@ -0,0 +1,275 @@
+"""Benchmark suite for the encoder and decoder of every backend.
+
+Measures the throughput in MPixel/s, the peak memory and the number of
+function calls per pixel of encoding and decoding the test assets and
+synthetic images, writes the results as JSON and compares them against a
+baseline. The fraction of pixels repeating their predecessor is reported
+next to every case, as it decides how much time RUN opcodes save.
+
+Usage:
+    python benchmark.py [--backend NAME ...] [--case NAME ...]
+                        [--output results.json]
+                        [--baseline baseline.json] [--threshold 0.1]
+                        [--update-baseline]
+
+With --baseline, the run fails with exit code 1 if any throughput dropped or
+any peak memory grew by more than the threshold. --update-baseline writes the
+results to the baseline file instead of comparing them.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+from qoi_py import backend, qoi_decode, qoi_decode_file, qoi_encode
+
+ASSETS_DIR = Path(__file__).parent.parent / "tests" / "assets"
+DEFAULT_BASELINE = Path(__file__).parent / "benchmark_baseline.json"
+SYNTHETIC_SIZE = (512, 512)
+REPEATS = 5
+# The reference backend is orders of magnitude slower, a single run suffices
+REPEATS_OF_BACKEND = {"python": 1}
+
+
+def synthetic_images() -> dict[str, np.ndarray]:
+    """Images which stress different opcodes of the codec."""
+    height, width = SYNTHETIC_SIZE
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+
+    flat = np.full((height, width, 3), (40, 120, 200), dtype=np.uint8)
+    noise = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    gradient = np.stack(
+        [x * 255 // width, y * 255 // height, (x + y) * 255 // (width + height)],
+        axis=-1,
+    ).astype(np.uint8)
+    alpha_heavy = np.concatenate(
+        [gradient, rng.integers(0, 256, (height, width, 1), dtype=np.uint8)],
+        axis=-1,
+    )
+    return {
+        "flat": flat,
+        "noise": noise,
+        "gradient": gradient,
+        "alpha_heavy": alpha_heavy,
+    }
+
+
+def load_cases() -> dict[str, np.ndarray]:
+    """All benchmark images by name: the test assets and synthetic images."""
+    cases = {
+        f"asset:{path.stem}": qoi_decode_file(path).data
+        for path in sorted(ASSETS_DIR.glob("*.qoi"))
+    }
+    cases.update(
+        {f"synthetic:{name}": image for name, image in synthetic_images().items()}
+    )
+    return cases
+
+
+def peak_memory(function: Callable[[], object]) -> int:
+    """Return the peak memory allocated while running a function, in bytes."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def calls(function: Callable[[], object]) -> int:
+    """Return the number of Python and builtin function calls of a function."""
+    count = 0
+
+    def profile(frame: object, event: str, arg: object) -> None:
+        nonlocal count
+        if event == "call" or event == "c_call":
+            count += 1
+
+    sys.setprofile(profile)
+    try:
+        function()
+    finally:
+        sys.setprofile(None)
+    return count
+
+
+def run_fraction(image: np.ndarray) -> float:
+    """Return the fraction of pixels which repeat their predecessor."""
+    flat_pixels = image.reshape(-1, image.shape[2])
+    return float(np.mean(np.all(flat_pixels[1:] == flat_pixels[:-1], axis=1)))
+
+
+def measure(
+    case: str,
+    image: np.ndarray,
+    backend_name: str,
+    operation: str,
+    function: Callable[[], object],
+) -> dict:
+    """Benchmark one operation on an image, returning a JSON-serializable result."""
+    pixels = image.shape[0] * image.shape[1]
+    # Warm up, which also compiles the numba kernels
+    function()
+    repeats = REPEATS_OF_BACKEND.get(backend_name, REPEATS)
+    best = min(timeit.repeat(function, number=1, repeat=repeats))
+    return {
+        "case": case,
+        "backend": backend_name,
+        "operation": operation,
+        "pixels": pixels,
+        "run_fraction": run_fraction(image),
+        "best_s": best,
+        "mpixels_per_s": pixels / best / 1e6,
+        "peak_bytes": peak_memory(function),
+        "calls_per_pixel": calls(function) / pixels,
+    }
+
+
+def run(backends: list[str], cases: dict[str, np.ndarray]) -> list[dict]:
+    results = []
+    for backend_name in backends:
+        with backend.use_backend(backend_name):
+            for case, image in cases.items():
+                data = qoi_encode(image)
+                for operation, function in [
+                    ("encode", lambda: qoi_encode(image)),
+                    ("decode", lambda: qoi_decode(data)),
+                ]:
+                    result = measure(case, image, backend_name, operation, function)
+                    results.append(result)
+                    print(
+                        f"{backend_name:<7} {operation:<7} {case:<24} "
+                        f"{result['run_fraction']:>6.1%} runs "
+                        f"{result['best_s'] * 1000:>10.2f} ms "
+                        f"{result['mpixels_per_s']:>9.2f} MPixel/s "
+                        f"{result['peak_bytes'] / 1e6:>8.2f} MB "
+                        f"{result['calls_per_pixel']:>8.3f} calls/pixel"
+                    )
+    return results
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    """Return a description of every regression above the threshold."""
+
+    def key(result: dict) -> tuple[str, str, str]:
+        return result["case"], result["backend"], result["operation"]
+
+    previous = {key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+
+        name = "/".join(key(result))
+        speed = result["mpixels_per_s"] / before["mpixels_per_s"]
+        if speed < 1 - threshold:
+            regressions.append(
+                f"{name}: throughput {before['mpixels_per_s']:.2f} -> "
+                f"{result['mpixels_per_s']:.2f} MPixel/s ({speed - 1:+.1%})"
+            )
+        memory = result["peak_bytes"] / max(before["peak_bytes"], 1)
+        if memory > 1 + threshold:
+            regressions.append(
+                f"{name}: peak memory {before['peak_bytes']} -> "
+                f"{result['peak_bytes']} bytes ({memory - 1:+.1%})"
+            )
+        # Baselines written before calls were counted do not have them
+        calls_before = before.get("calls_per_pixel")
+        if calls_before and result["calls_per_pixel"] > calls_before * (1 + threshold):
+            regressions.append(
+                f"{name}: calls per pixel {calls_before:.3f} -> "
+                f"{result['calls_per_pixel']:.3f}"
+            )
+    return regressions
+
+
+def metadata() -> dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "backends": backend.available_backends(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the QOI codec of every backend."
+    )
+    parser.add_argument(
+        "--backend",
+        action="append",
+        dest="backends",
+        help="backend to benchmark, can be repeated (default: all available)",
+    )
+    parser.add_argument(
+        "--case",
+        action="append",
+        dest="cases",
+        help="image to benchmark, like asset:dice or synthetic:noise, can be "
+        "repeated (default: all)",
+    )
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        help=f"compare against a baseline (default: {DEFAULT_BASELINE.name})",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative change which counts as a regression (default: 0.1)",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="write the results to the baseline instead of comparing",
+    )
+    args = parser.parse_args()
+
+    all_cases = load_cases()
+    names = args.cases or list(all_cases)
+    unknown = sorted(set(names) - set(all_cases))
+    if unknown:
+        print(f"Unknown cases {unknown}, expected some of {list(all_cases)}.")
+        sys.exit(2)
+
+    cases = {name: all_cases[name] for name in names}
+    results = run(args.backends or backend.available_backends(), cases)
+    report = {"metadata": metadata(), "results": results}
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    baseline_path = args.baseline or DEFAULT_BASELINE
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"Baseline written to {baseline_path}.")
+    elif args.baseline is not None and not baseline_path.exists():
+        print(
+            f"\nNo baseline at {baseline_path}, skipping the comparison. "
+            "Write one with --update-baseline."
+        )
+    elif args.baseline is not None:
+        baseline = json.loads(baseline_path.read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions above {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions above {args.threshold:.0%}.")
@@ -1,6 +1,6 @@
 from PIL import Image
 import numpy as np
-from qoi_py import qoi_decode
+from qoi_py import qoi_decode_file
 import sys
 from pathlib import Path
 
@@ -26,9 +26,8 @@ if __name__ == "__main__":
         print(f"Decoding PNG image: {png_path}")
         original_array = np.array(img)
 
-    with open(qoi_path, "rb") as f:
-        print(f"Decoding QOI image: {qoi_path}")
-        decoded_array = qoi_decode(f.read()).data
+    print(f"Decoding QOI image: {qoi_path}")
+    decoded_array = qoi_decode_file(qoi_path).data
 
     if original_array.shape != decoded_array.shape:
         print(
@@ -1,2 +1,32 @@
+from . import backend as backend
+from . import batch as batch
+from ._async import get_async_limit as get_async_limit
+from ._async import set_async_limit as set_async_limit
+from ._async import qoi_decode_async as qoi_decode_async
+from ._async import qoi_decode_file_async as qoi_decode_file_async
+from ._async import qoi_encode_async as qoi_encode_async
+from ._async import qoi_encode_file_async as qoi_encode_file_async
+from ._cache import QOICacheStats as QOICacheStats
+from ._cache import QOIDecodeCache as QOIDecodeCache
 from ._decode import qoi_decode as qoi_decode
+from ._decode import qoi_decode_file as qoi_decode_file
 from ._encode import qoi_encode as qoi_encode
+from ._encode import qoi_max_encoded_size as qoi_max_encoded_size
+from ._index import QOIIndex as QOIIndex
+from ._index import QOIIndexEntry as QOIIndexEntry
+from ._index import qoi_probe as qoi_probe
+from ._pixel import qoi_hash_array as qoi_hash_array
+from ._scan import qoi_best_scan_order as qoi_best_scan_order
+from ._scan import qoi_decode_scan as qoi_decode_scan
+from ._scan import qoi_encode_scan as qoi_encode_scan
+from ._sequence import QOISequenceReader as QOISequenceReader
+from ._sequence import QOISequenceWriter as QOISequenceWriter
+from ._stack import qoi_decode_stack as qoi_decode_stack
+from ._stack import qoi_encode_stack as qoi_encode_stack
+from ._stats import QOIStats as QOIStats
+from ._structure import QOIHeader as QOIHeader
+from ._stream import QOIStreamDecoder as QOIStreamDecoder
+from ._stream import QOIStreamEncoder as QOIStreamEncoder
+from ._tiled import QOITiledImage as QOITiledImage
+from ._tiled import qoi_decode_tiled as qoi_decode_tiled
+from ._tiled import qoi_encode_tiled as qoi_encode_tiled
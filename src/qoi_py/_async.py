@@ -0,0 +1,248 @@
+"""Encoding and decoding without blocking the asyncio event loop.
+
+The codec runs on an executor, by default a thread pool of this module. At
+most `get_async_limit()` jobs run at a time per event loop, further calls wait
+for a free slot. A job only frees its slot once it has actually finished, so
+cancelled requests cannot pile up on the executor either.
+"""
+
+import asyncio
+import os
+import weakref
+from collections.abc import Buffer, Callable
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from os import PathLike
+from typing import Literal, overload
+
+from .types import (
+    ImageContent,
+    QOIChannelCount,
+    QOIColorspace,
+    RGBImage,
+    RGBAImage,
+)
+from ._decode import qoi_decode, qoi_decode_file
+from ._encode import qoi_encode
+
+
+_limit = os.process_cpu_count() or 1
+_limiters: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+    weakref.WeakKeyDictionary()
+)
+_default_executor: ThreadPoolExecutor | None = None
+
+
+def get_async_limit() -> int:
+    """Return the maximum number of concurrent jobs per event loop."""
+    return _limit
+
+
+def set_async_limit(limit: int | None) -> None:
+    """Set the maximum number of concurrent jobs per event loop.
+
+    Jobs which are already waiting keep the previous limit.
+
+    Args:
+        limit: The number of jobs, or None for one per CPU.
+
+    Raises:
+        ValueError: If the limit is less than 1.
+    """
+    global _limit
+    if limit is None:
+        limit = os.process_cpu_count() or 1
+    if limit < 1:
+        raise ValueError("The limit must be at least 1.")
+    _limit = limit
+    _limiters.clear()
+
+
+def _limiter(loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+    """Return the semaphore limiting the jobs of an event loop."""
+    if loop not in _limiters:
+        _limiters[loop] = asyncio.Semaphore(_limit)
+    return _limiters[loop]
+
+
+def _executor() -> ThreadPoolExecutor:
+    """Return the thread pool used if no executor is given."""
+    global _default_executor
+    if _default_executor is None:
+        _default_executor = ThreadPoolExecutor(thread_name_prefix="qoi_py")
+    return _default_executor
+
+
+def _release_from(loop: asyncio.AbstractEventLoop, limiter: asyncio.Semaphore):
+    """Return a done callback which frees a slot of the limiter on its loop."""
+
+    def release(_: Future) -> None:
+        try:
+            loop.call_soon_threadsafe(limiter.release)
+        except RuntimeError:
+            # The loop is already closed, nobody is waiting anymore
+            pass
+
+    return release
+
+
+async def _run[T](executor: Executor | None, function: Callable[..., T], *args) -> T:
+    """Run a function on the executor once a slot of the limiter is free.
+
+    Cancelling the returned coroutine cancels the job if it has not started
+    yet. A running job cannot be interrupted, but keeps its slot until it is
+    done.
+    """
+    loop = asyncio.get_running_loop()
+    limiter = _limiter(loop)
+    await limiter.acquire()
+    try:
+        future = (executor or _executor()).submit(function, *args)
+    except BaseException:
+        limiter.release()
+        raise
+    future.add_done_callback(_release_from(loop, limiter))
+    return await asyncio.wrap_future(future)
+
+
+def _encode_file(
+    path: str | PathLike[str], image: ImageContent, colorspace: QOIColorspace
+) -> int:
+    """Encode an image and write it to a file, returning the size."""
+    data = qoi_encode(image, colorspace)
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+async def qoi_encode_async(
+    image: ImageContent,
+    colorspace: QOIColorspace = QOIColorspace.SRGB,
+    executor: Executor | None = None,
+) -> bytes:
+    """
+    Encode an image to QOI format on an executor, see `qoi_encode`.
+
+    Args:
+        image (ImageContent): The image to encode. It must not be mutated until
+            the encoding is done.
+        colorspace (QOIColorspace): The colorspace stored in the header.
+        executor (Executor | None): The thread or process pool to encode on.
+            If None, a thread pool of this module is used.
+
+    Returns:
+        bytes: The encoded QOI image data.
+    """
+    return await _run(executor, qoi_encode, image, colorspace)
+
+
+async def qoi_encode_file_async(
+    path: str | PathLike[str],
+    image: ImageContent,
+    colorspace: QOIColorspace = QOIColorspace.SRGB,
+    executor: Executor | None = None,
+) -> int:
+    """
+    Encode an image and write it to a QOI file on an executor.
+
+    Args:
+        path (str | PathLike[str]): The path of the file to write.
+        image (ImageContent): The image to encode. It must not be mutated until
+            the encoding is done.
+        colorspace (QOIColorspace): The colorspace stored in the header.
+        executor (Executor | None): The thread or process pool to encode on.
+            If None, a thread pool of this module is used.
+
+    Returns:
+        int: The size of the written file in bytes.
+    """
+    return await _run(executor, _encode_file, path, image, colorspace)
+
+
+@overload
+async def qoi_decode_async(
+    data: Buffer,
+    channels: Literal[QOIChannelCount.RGB],
+    executor: Executor | None = None,
+) -> RGBImage: ...
+
+
+@overload
+async def qoi_decode_async(
+    data: Buffer,
+    channels: Literal[QOIChannelCount.RGBA],
+    executor: Executor | None = None,
+) -> RGBAImage: ...
+
+
+@overload
+async def qoi_decode_async(
+    data: Buffer, channels: None = None, executor: Executor | None = None
+) -> RGBImage | RGBAImage: ...
+
+
+async def qoi_decode_async(
+    data: Buffer,
+    channels: QOIChannelCount | None = None,
+    executor: Executor | None = None,
+) -> RGBImage | RGBAImage:
+    """
+    Decode a QOI image on an executor, see `qoi_decode`.
+
+    Args:
+        data: The bytes of the QOI image to decode. They must not be mutated
+            until the decoding is done. Process pools only accept picklable
+            buffers, like bytes.
+        channels: The number of channels to decode. If None, the function will
+            determine the channel count from the image header.
+        executor: The thread or process pool to decode on. If None, a thread
+            pool of this module is used.
+
+    Returns:
+        RGBImage | RGBAImage: The decoded image as an RGB or RGBA image.
+    """
+    return await _run(executor, qoi_decode, data, channels)
+
+
+@overload
+async def qoi_decode_file_async(
+    path: str | PathLike[str],
+    channels: Literal[QOIChannelCount.RGB],
+    executor: Executor | None = None,
+) -> RGBImage: ...
+
+
+@overload
+async def qoi_decode_file_async(
+    path: str | PathLike[str],
+    channels: Literal[QOIChannelCount.RGBA],
+    executor: Executor | None = None,
+) -> RGBAImage: ...
+
+
+@overload
+async def qoi_decode_file_async(
+    path: str | PathLike[str],
+    channels: None = None,
+    executor: Executor | None = None,
+) -> RGBImage | RGBAImage: ...
+
+
+async def qoi_decode_file_async(
+    path: str | PathLike[str],
+    channels: QOIChannelCount | None = None,
+    executor: Executor | None = None,
+) -> RGBImage | RGBAImage:
+    """
+    Read and decode a QOI file on an executor, see `qoi_decode_file`.
+
+    Args:
+        path: The path of the QOI file to decode.
+        channels: The number of channels to decode. If None, the function will
+            determine the channel count from the image header.
+        executor: The thread or process pool to decode on. If None, a thread
+            pool of this module is used.
+
+    Returns:
+        RGBImage | RGBAImage: The decoded image as an RGB or RGBA image.
+    """
+    return await _run(executor, qoi_decode_file, path, channels)
@@ -0,0 +1,171 @@
+"""Caching decoded images in memory."""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Buffer, Callable, Hashable
+from dataclasses import dataclass
+from os import PathLike
+
+import numpy as np
+
+from .types import QOIChannelCount, QOIColorspace, RGBImage, RGBAImage
+from ._decode import qoi_decode, qoi_decode_file
+
+
+@dataclass(frozen=True)
+class QOICacheStats:
+    """A snapshot of the counters of a `QOIDecodeCache`."""
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    nbytes: int
+    """The decoded size of all cached images in bytes."""
+
+
+class QOIDecodeCache:
+    """A thread-safe LRU cache of decoded images with a byte budget.
+
+    Images are looked up by the hash of their encoded content, or for files by
+    their path, modification time and size, so a modified file is decoded
+    again. The budget applies to the decoded pixels, height * width * channels
+    bytes per image. When it is exceeded, the least recently used images are
+    evicted. Images larger than the whole budget are decoded but not cached.
+
+    The returned pixel arrays are read-only, as they are shared between all
+    callers. Copy them to modify them.
+
+    Example usage:
+    ```python
+    cache = QOIDecodeCache(max_bytes=512 * 1024**2)
+    image = cache.decode_file("sprites/player.qoi")
+    ```
+    """
+
+    def __init__(self, max_bytes: int):
+        """Create an empty cache.
+
+        Args:
+            max_bytes: The maximum decoded size of all cached images.
+        """
+        if max_bytes < 0:
+            raise ValueError("max_bytes must not be negative.")
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, tuple[np.ndarray, QOIColorspace]] = (
+            OrderedDict()
+        )
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def decode(
+        self, data: Buffer, channels: QOIChannelCount | None = None
+    ) -> RGBImage | RGBAImage:
+        """
+        Decode a QOI image, or return it from the cache, see `qoi_decode`.
+
+        The cache key is a hash of the data, which has to be read completely.
+
+        Args:
+            data: The bytes of the QOI image to decode, or any other buffer.
+            channels: The number of channels to decode. If None, the channel
+                count of the image header is used.
+
+        Returns:
+            RGBImage | RGBAImage: The decoded image with read-only pixels.
+        """
+        key = ("data", hashlib.blake2b(data, digest_size=16).digest(), channels)
+        return self._get(key, lambda: qoi_decode(data, channels))
+
+    def decode_file(
+        self, path: str | PathLike[str], channels: QOIChannelCount | None = None
+    ) -> RGBImage | RGBAImage:
+        """
+        Decode a QOI file, or return it from the cache, see `qoi_decode_file`.
+
+        The cache key is the absolute path, modification time and size of the
+        file, so the file is only read on a miss.
+
+        Args:
+            path: The path of the QOI file to decode.
+            channels: The number of channels to decode. If None, the channel
+                count of the image header is used.
+
+        Returns:
+            RGBImage | RGBAImage: The decoded image with read-only pixels.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        key = ("file", path, stat.st_mtime_ns, stat.st_size, channels)
+        return self._get(key, lambda: qoi_decode_file(path, channels))
+
+    def _get(
+        self, key: Hashable, decode: Callable[[], RGBImage | RGBAImage]
+    ) -> RGBImage | RGBAImage:
+        """Return the image of a key, decoding and inserting it on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+            else:
+                self._misses += 1
+
+        if entry is None:
+            # Decoding happens outside the lock, so other threads are not
+            # blocked. If two threads miss the same image, the first one wins.
+            image = decode()
+            image.data.setflags(write=False)
+            entry = self._insert(key, (image.data, image.colorspace))
+
+        data, colorspace = entry
+        if data.shape[2] == QOIChannelCount.RGB:
+            return RGBImage(colorspace=colorspace, data=data)
+        return RGBAImage(colorspace=colorspace, data=data)
+
+    def _insert(
+        self, key: Hashable, entry: tuple[np.ndarray, QOIColorspace]
+    ) -> tuple[np.ndarray, QOIColorspace]:
+        """Add an entry and evict the least recently used ones over budget."""
+        nbytes = entry[0].nbytes
+        if nbytes > self.max_bytes:
+            return entry
+
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                return existing
+
+            self._entries[key] = entry
+            self._nbytes += nbytes
+            while self._nbytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+                self._evictions += 1
+        return entry
+
+    @property
+    def stats(self) -> QOICacheStats:
+        """The current counters of the cache."""
+        with self._lock:
+            return QOICacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                nbytes=self._nbytes,
+            )
+
+    def clear(self) -> None:
+        """Remove all images from the cache. The counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,48 @@
+"""Channel conversions which the decoders apply while decoding.
+
+Every opcode decodes to a single pixel, repeated by RUN opcodes, so the
+conversions are applied once per opcode rather than once per output pixel.
+"""
+
+import numpy as np
+
+from .types import QOIChannelCount
+
+PREMULTIPLY = (
+    (np.arange(256)[:, np.newaxis] * np.arange(256)[np.newaxis, :] + 127) // 255
+).astype(np.uint8)
+"""The premultiplied value of every color by alpha, `PREMULTIPLY[alpha, color]`,
+rounded to the nearest integer."""
+
+
+def convert_pixels(
+    pixels: np.ndarray,
+    channels: QOIChannelCount,
+    alpha_fill: int | None = None,
+    premultiply_alpha: bool = False,
+) -> np.ndarray:
+    """
+    Convert decoded RGBA pixels to the requested output.
+
+    Args:
+        pixels (np.ndarray): The (n, 4) array of decoded RGBA pixels.
+        channels (QOIChannelCount): The channel count of the output. The alpha
+            channel is dropped for RGB.
+        alpha_fill (int | None): If not None, the alpha of every pixel is
+            replaced by this value.
+        premultiply_alpha (bool): Whether to multiply the colors by the alpha.
+
+    Returns:
+        np.ndarray: The (n, channels) array of converted pixels. Without any
+            conversion, it is a view of `pixels`.
+    """
+    if alpha_fill is None and not premultiply_alpha:
+        return pixels[:, : channels.value]
+
+    converted = pixels[:, : channels.value].copy()
+    alphas = pixels[:, 3] if alpha_fill is None else np.uint8(alpha_fill)
+    if channels == QOIChannelCount.RGBA:
+        converted[:, 3] = alphas
+    if premultiply_alpha:
+        converted[:, :3] = PREMULTIPLY[np.reshape(alphas, (-1, 1)), converted[:, :3]]
+    return converted
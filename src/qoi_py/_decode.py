@@ -1,154 +1,358 @@
 from .types import RGBImage, RGBAImage, QOIChannelCount
-from ._opcodes import QOIOpcode, MASK_2BIT_DATA
 from ._structure import QOIHeader
-from ._pixel import Pixel
+from .backend import load_backend
+from ._stats import QOIStats
+from collections.abc import Buffer, Callable, Iterator
+from contextlib import contextmanager
+from os import PathLike
+from typing import assert_never, overload, Literal, NamedTuple
+import mmap
+import os
+import traceback
 import numpy as np
-from typing import assert_never, overload, Literal
-
-
-def _wraparound(value: int, min_value: int = 0, max_value: int = 256) -> int:
-    """Wrap around a value to be within min_value (inclusive) and max_value (exclusive)
-
-    Examples:
-        >>> _wraparound(257)
-        1
-        >>> _wraparound(-1)
-        255
-        >>> _wraparound(128, 100, 200)
-        128
-        >>> _wraparound(99, 100, 200)
-        200
-        >>> _wraparound(201, 100, 200)
-        101
+
+
+def _output_array(
+    out: Buffer | None, header: QOIHeader, channels: QOIChannelCount
+) -> np.ndarray:
+    """Return the (height, width, channels) array to decode into.
+
+    Raises:
+        ValueError: If `out` does not fit the image described by the header.
     """
-    return (value - min_value) % (max_value - min_value) + min_value
+    shape = (header.height, header.width, channels.value)
+    if out is None:
+        return np.empty(shape, dtype=np.uint8)
+
+    if isinstance(out, np.ndarray):
+        if out.dtype != np.uint8 or out.shape != shape:
+            raise ValueError(
+                f"out must be a uint8 array of shape {shape}, got a {out.dtype} "
+                f"array of shape {out.shape}."
+            )
+        if not out.flags.c_contiguous or not out.flags.writeable:
+            raise ValueError("out must be a writable C-contiguous array.")
+        return out
+
+    view = memoryview(out)
+    if view.readonly or not view.c_contiguous:
+        raise ValueError("out must be a writable C-contiguous buffer.")
+    if view.nbytes != np.prod(shape):
+        raise ValueError(
+            f"out must have a size of {np.prod(shape)} bytes, got {view.nbytes}."
+        )
+    return np.frombuffer(view.cast("B"), dtype=np.uint8).reshape(shape)
 
 
 @overload
-def qoi_decode(data: bytes, channels: Literal[QOIChannelCount.RGB]) -> RGBImage: ...
+def qoi_decode(
+    data: Buffer,
+    channels: Literal[QOIChannelCount.RGB],
+    out: Buffer | None = None,
+    stats: QOIStats | None = None,
+    *,
+    premultiply_alpha: bool = False,
+    alpha_fill: int = 255,
+) -> RGBImage: ...
 
 
 @overload
-def qoi_decode(data: bytes, channels: Literal[QOIChannelCount.RGBA]) -> RGBAImage: ...
+def qoi_decode(
+    data: Buffer,
+    channels: Literal[QOIChannelCount.RGBA],
+    out: Buffer | None = None,
+    stats: QOIStats | None = None,
+    *,
+    premultiply_alpha: bool = False,
+    alpha_fill: int = 255,
+) -> RGBAImage: ...
 
 
 @overload
-def qoi_decode(data: bytes, channels: None = None) -> RGBImage | RGBAImage: ...
+def qoi_decode(
+    data: Buffer,
+    channels: None = None,
+    out: Buffer | None = None,
+    stats: QOIStats | None = None,
+    *,
+    premultiply_alpha: bool = False,
+    alpha_fill: int = 255,
+) -> RGBImage | RGBAImage: ...
 
 
 def qoi_decode(
-    data: bytes, channels: QOIChannelCount | None = None
+    data: Buffer,
+    channels: QOIChannelCount | None = None,
+    out: Buffer | None = None,
+    stats: QOIStats | None = None,
+    *,
+    premultiply_alpha: bool = False,
+    alpha_fill: int = 255,
 ) -> RGBImage | RGBAImage:
     """
-    Decode a QOI image from a BytesIO object.
+    Decode a QOI image from bytes or any other buffer.
+
+    Any channel count can be decoded from any image. Decoding RGB from an RGBA
+    image drops the alpha channel, decoding RGBA from an RGB image fills it in
+    with `alpha_fill`. Conversions happen while decoding, without another pass
+    over the image.
 
     Args:
-        data: The bytes of the QOI image to decode.
+        data: The bytes of the QOI image to decode. Any object supporting the
+            buffer protocol, like a memoryview or an mmap, is decoded without
+            copying it.
         channels: The number of channels to decode. If None, the function will
             determine the channel count from the image header.
+        out: A preallocated C-contiguous uint8 array of shape (height, width,
+            channels), or any writable buffer of that size, to decode into.
+            It can be reused across calls to avoid allocating new images. The
+            returned image data is a view of it.
+        stats: If given, the opcode statistics and phase timings of the image
+            are added to it.
+        premultiply_alpha: Whether to multiply the colors by the alpha,
+            rounded to the nearest integer, as expected by most GPU blending.
+        alpha_fill: The alpha of all pixels when decoding RGBA from an RGB
+            image.
 
     Returns:
         RGBImage | RGBAImage: The decoded image as an RGB or RGBA image.
+
+    Raises:
+        ValueError: If `out` does not fit the image described by the header,
+            or `alpha_fill` is not in the range [0, 255].
     """
-    header = QOIHeader.from_bytes(data[:14])
+    if not 0 <= alpha_fill <= 255:
+        raise ValueError("alpha_fill must be in the range [0, 255].")
+
+    data = memoryview(data).cast("B")
+    options = _DecodeOptions(alpha_fill, premultiply_alpha)
+    try:
+        if stats is None:
+            header, img_data = _decode(data, channels, out, options)
+        else:
+            header, img_data = _decode_with_stats(data, channels, out, options, stats)
+    finally:
+        data.release()
+
+    return _image(img_data, header)
+
+
+class _DecodeOptions(NamedTuple):
+    """The conversion options of `qoi_decode`."""
+
+    alpha_fill: int
+    premultiply_alpha: bool
+
+    def backend_arguments(
+        self, header: QOIHeader, channels: QOIChannelCount
+    ) -> tuple[int | None, bool]:
+        """The alpha_fill and premultiply_alpha arguments of `decode_pixels`."""
+        fills_alpha = (
+            header.channels == QOIChannelCount.RGB and channels == QOIChannelCount.RGBA
+        )
+        alpha_fill = self.alpha_fill if fills_alpha else None
+        return alpha_fill, self.premultiply_alpha
+
+
+def _decode(
+    data: memoryview,
+    channels: QOIChannelCount | None,
+    out: Buffer | None,
+    options: _DecodeOptions,
+) -> tuple[QOIHeader, np.ndarray]:
+    """Decode the image with the active backend, see `qoi_decode`."""
+    header = QOIHeader.from_bytes(data)
     if channels is None:
         channels = header.channels
 
-    running_index: list[Pixel] = [
-        Pixel(0, 0, 0, 0) for _ in range(64)
-    ]  # FIXME: Is this correct?
-    pixel = Pixel(0, 0, 0, 255)
-    run_length: int | None = None
-
-    img_data = np.empty((header.height * header.width, channels.value), dtype=np.uint8)
-    img_data_pointer = 0
-
-    in_data_pointer = 14
-    while (
-        in_data_pointer < len(data) - 8
-    ):  # Last 8 bytes are padding (7x 0x00 and 1x 0x01)
-        byte1 = data[in_data_pointer]
-        match QOIOpcode.from_byte(byte1):
-            case QOIOpcode.INDEX:
-                index = byte1 & MASK_2BIT_DATA
-                pixel = running_index[index]
-
-                in_data_pointer += 1
-            case QOIOpcode.DIFF:
-                # Differences are -2..1
-                rdiff = ((byte1 & 0b00110000) >> 4) - 2
-                gdiff = ((byte1 & 0b00001100) >> 2) - 2
-                bdiff = (byte1 & 0b00000011) - 2
-                pixel = Pixel(
-                    r=_wraparound(pixel.r + rdiff),
-                    g=_wraparound(pixel.g + gdiff),
-                    b=_wraparound(pixel.b + bdiff),
-                    a=pixel.a,
-                )
-
-                in_data_pointer += 1
-            case QOIOpcode.LUMA:
-                byte2 = data[in_data_pointer + 1]
-                gdiff = (byte1 & 0b00111111) - 32
-                rdiff_gdiff = ((byte2 & 0b11110000) >> 4) - 8
-                bdiff_gdiff = (byte2 & 0b00001111) - 8
-
-                pixel = Pixel(
-                    r=_wraparound(pixel.r + rdiff_gdiff + gdiff),
-                    g=_wraparound(pixel.g + gdiff),
-                    b=_wraparound(pixel.b + bdiff_gdiff + gdiff),
-                    a=pixel.a,
-                )
-
-                in_data_pointer += 2
-            case QOIOpcode.RUN:
-                run_length = (byte1 & MASK_2BIT_DATA) + 1
-                in_data_pointer += 1
-            case QOIOpcode.RGB:
-                pixel = Pixel(
-                    r=data[in_data_pointer + 1],
-                    g=data[in_data_pointer + 2],
-                    b=data[in_data_pointer + 3],
-                    a=pixel.a,
-                )
-
-                in_data_pointer += 4  # Opcode + 3 color bytes
-            case QOIOpcode.RGBA:
-                if channels != QOIChannelCount.RGBA:
-                    raise ValueError(
-                        "RGBA opcode encountered, but channels is not set to RGBA."
-                    )
-
-                pixel = Pixel(
-                    r=data[in_data_pointer + 1],
-                    g=data[in_data_pointer + 2],
-                    b=data[in_data_pointer + 3],
-                    a=data[in_data_pointer + 4],
-                )
-
-                in_data_pointer += 5  # Opcode + 4 color bytes
-
-        running_index[pixel.hash()] = pixel
-
-        for _ in range(run_length if run_length is not None else 1):
-            img_data[img_data_pointer][0] = pixel.r
-            img_data[img_data_pointer][1] = pixel.g
-            img_data[img_data_pointer][2] = pixel.b
-
-            if channels == QOIChannelCount.RGBA:
-                img_data[img_data_pointer][3] = pixel.a
-            img_data_pointer += 1
-        run_length = None
+    img_data = _output_array(out, header, channels)
+    load_backend().decode_pixels(
+        data,
+        img_data.reshape(-1, channels.value),
+        *options.backend_arguments(header, channels),
+    )
+    return header, img_data
+
+
+def _image(img_data: np.ndarray, header: QOIHeader) -> RGBImage | RGBAImage:
+    """Wrap decoded pixels into an image of their channel count."""
+    channels = QOIChannelCount(img_data.shape[2])
 
     if channels == QOIChannelCount.RGB:
-        return RGBImage(
-            colorspace=header.colorspace,
-            data=img_data.reshape((header.height, header.width, 3)),
-        )
+        return RGBImage(colorspace=header.colorspace, data=img_data)
     elif channels == QOIChannelCount.RGBA:
-        return RGBAImage(
-            colorspace=header.colorspace,
-            data=img_data.reshape((header.height, header.width, 4)),
-        )
+        return RGBAImage(colorspace=header.colorspace, data=img_data)
     else:
         assert_never(channels)
+
+
+def _decode_with_stats(
+    data: memoryview,
+    channels: QOIChannelCount | None,
+    out: Buffer | None,
+    options: _DecodeOptions,
+    stats: QOIStats,
+) -> tuple[QOIHeader, np.ndarray]:
+    """`_decode`, timing every phase and collecting opcode statistics.
+
+    Kept apart, so that decoding without statistics pays nothing for them.
+    """
+    with stats.time("decode_setup"):
+        header = QOIHeader.from_bytes(data)
+        if channels is None:
+            channels = header.channels
+        img_data = _output_array(out, header, channels)
+
+    # The decoder counts the opcodes, the stream is not scanned again
+    opcode_counts = np.zeros(256, dtype=np.int64)
+    with stats.time("decode_opcodes"):
+        load_backend().decode_pixels(
+            data,
+            img_data.reshape(-1, channels.value),
+            *options.backend_arguments(header, channels),
+            opcode_counts,
+        )
+    stats.add_opcode_counts(opcode_counts, header.width * header.height, len(data))
+    return header, img_data
+
+
+@overload
+def qoi_decode_file(
+    path: str | PathLike[str],
+    channels: Literal[QOIChannelCount.RGB],
+    out: Buffer | None = None,
+    stats: QOIStats | None = None,
+    *,
+    premultiply_alpha: bool = False,
+    alpha_fill: int = 255,
+) -> RGBImage: ...
+
+
+@overload
+def qoi_decode_file(
+    path: str | PathLike[str],
+    channels: Literal[QOIChannelCount.RGBA],
+    out: Buffer | None = None,
+    stats: QOIStats | None = None,
+    *,
+    premultiply_alpha: bool = False,
+    alpha_fill: int = 255,
+) -> RGBAImage: ...
+
+
+@overload
+def qoi_decode_file(
+    path: str | PathLike[str],
+    channels: None = None,
+    out: Buffer | None = None,
+    stats: QOIStats | None = None,
+    *,
+    premultiply_alpha: bool = False,
+    alpha_fill: int = 255,
+) -> RGBImage | RGBAImage: ...
+
+
+def qoi_decode_file(
+    path: str | PathLike[str],
+    channels: QOIChannelCount | None = None,
+    out: Buffer | None = None,
+    stats: QOIStats | None = None,
+    *,
+    premultiply_alpha: bool = False,
+    alpha_fill: int = 255,
+) -> RGBImage | RGBAImage:
+    """
+    Decode a QOI image file.
+
+    The file is memory-mapped and decoded straight from the mapping, so it is
+    never read into memory as a whole.
+
+    Args:
+        path: The path of the QOI file to decode.
+        channels: The number of channels to decode. If None, the function will
+            determine the channel count from the image header.
+        out: A preallocated buffer to decode into, see `qoi_decode`.
+        stats: Collects opcode statistics and phase timings, see `qoi_decode`.
+        premultiply_alpha: Whether to multiply the colors by the alpha, see
+            `qoi_decode`.
+        alpha_fill: The alpha of all pixels when decoding RGBA from an RGB
+            image.
+
+    Returns:
+        RGBImage | RGBAImage: The decoded image as an RGB or RGBA image.
+    """
+    image, mapped = _open_mapped(
+        path,
+        lambda mapped: qoi_decode(
+            mapped,
+            channels,
+            out,
+            stats,
+            premultiply_alpha=premultiply_alpha,
+            alpha_fill=alpha_fill,
+        ),
+        min_size=14,
+        message="Invalid QOI header",
+    )
+    mapped.close()
+    return image
+
+
+def _open_mapped[T](
+    path: str | PathLike[str],
+    parse: Callable[[mmap.mmap], T],
+    min_size: int,
+    message: str,
+) -> tuple[T, mmap.mmap]:
+    """
+    Memory-map a file for reading and parse it, unmapping it if that fails.
+
+    Args:
+        path: The path of the file.
+        parse: Called with the mapping, like the constructor of a container.
+        min_size: The size below which the file cannot be valid. Empty files
+            cannot be mapped, so it must be at least 1.
+        message: The message of the ValueError raised for smaller files.
+
+    Returns:
+        tuple[T, mmap.mmap]: The result of `parse` and the mapping, which the
+            caller closes.
+
+    Raises:
+        ValueError: If the file is smaller than `min_size`.
+    """
+    with open(path, "rb") as f:
+        if f.seek(0, os.SEEK_END) < min_size:
+            raise ValueError(message)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        with _clearing_frames():
+            return parse(mapped), mapped
+    except BaseException:
+        mapped.close()
+        raise
+
+
+@contextmanager
+def _clearing_frames() -> Iterator[None]:
+    """Clear the frames of the traceback of an error raised inside.
+
+    The frames reference views of the data, which would keep a memory-mapped
+    file or shared memory from closing. The traceback itself is kept.
+    """
+    try:
+        yield
+    except Exception as error:
+        traceback.clear_frames(error.__traceback__)
+        raise
+
+
+@contextmanager
+def _released(view: memoryview) -> Iterator[memoryview]:
+    """Release a view of the data once done with it, see `_clearing_frames`."""
+    try:
+        with _clearing_frames():
+            yield view
+    finally:
+        view.release()
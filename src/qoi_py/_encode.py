@@ -1,145 +1,196 @@
 from .types import ImageContent, QOIColorspace, QOIChannelCount
 from ._structure import QOIHeader, END_MARKER
-from ._pixel import Pixel
-from ._opcodes import QOIOpcode
+from .backend import load_backend
+from ._stats import QOIStats
+from collections.abc import Buffer
+from typing import overload
+import numpy as np
 
 
-def _write_run_length(data: bytearray, run_length: int) -> None:
+def qoi_max_encoded_size(width: int, height: int, channels: QOIChannelCount) -> int:
     """
-    Write the run length to the data bytearray.
+    Return the largest possible size of an encoded QOI image.
+
+    In the worst case every pixel is written as a full RGB or RGBA opcode, which
+    takes one byte more than the pixel itself.
 
     Args:
-        data (bytearray): The bytearray to write to.
-        run_length (int): The run length to write.
+        width (int): The width of the image.
+        height (int): The height of the image.
+        channels (QOIChannelCount): The channel count of the image.
+
+    Returns:
+        int: The size in bytes, including header and end marker.
     """
-    assert 1 <= run_length <= 62, "Run length must be between 1 and 62 inclusive."
-    data.append(QOIOpcode.RUN | (run_length - 1))
+    # 14 bytes header
+    n_pixels = width * height
+    return 14 + n_pixels * (int(channels) + 1) + len(END_MARKER)
+
 
+def _output_buffer(out: Buffer | None, max_size: int) -> np.ndarray:
+    """Return the uint8 array to encode into.
+
+    Raises:
+        ValueError: If `out` is not writable or too small for the worst case.
+    """
+    if out is None:
+        return np.empty(max_size, dtype=np.uint8)
+
+    view = memoryview(out)
+    if view.readonly or not view.c_contiguous:
+        raise ValueError("out must be a writable C-contiguous buffer.")
+    if view.nbytes < max_size:
+        raise ValueError(
+            f"out must have a size of at least {max_size} bytes, got {view.nbytes}."
+        )
+    return np.frombuffer(view.cast("B"), dtype=np.uint8)
 
+
+@overload
+def qoi_encode(
+    image: ImageContent,
+    colorspace: QOIColorspace = QOIColorspace.SRGB,
+    out: None = None,
+    stats: QOIStats | None = None,
+    *,
+    tolerance: int = 0,
+) -> bytes: ...
+
+
+@overload
 def qoi_encode(
-    image: ImageContent, colorspace: QOIColorspace = QOIColorspace.SRGB
-) -> bytes:
+    image: ImageContent,
+    colorspace: QOIColorspace = QOIColorspace.SRGB,
+    *,
+    out: Buffer,
+    stats: QOIStats | None = None,
+    tolerance: int = 0,
+) -> int: ...
+
+
+def qoi_encode(
+    image: ImageContent,
+    colorspace: QOIColorspace = QOIColorspace.SRGB,
+    out: Buffer | None = None,
+    stats: QOIStats | None = None,
+    *,
+    tolerance: int = 0,
+) -> bytes | int:
     """
     Encode an image to QOI format.
 
+    With a tolerance, encoding is lossy: every channel of a decoded pixel may
+    differ by up to `tolerance` from the image, in exchange for more RUN, DIFF
+    and LUMA opcodes. The output is a standard QOI image, which decodes to
+    the same pixels with any decoder.
+
+    Tolerance mode is only faster with the numba backend. Every pixel depends
+    on the reconstruction of the previous one, so the NumPy and reference
+    backends share a scalar loop: their output is just as small, but encoding
+    is 3-5x slower than lossless encoding with NumPy.
+
     Args:
         image (ImageContent): The image to encode, which can be either RGB or
             RGBA. The array will never be mutated.
+        colorspace (QOIColorspace): The colorspace stored in the header.
+        out (Buffer | None): A writable buffer, like a bytearray or a
+            memoryview, to write the encoded image to, starting at offset 0.
+            It must have room for `qoi_max_encoded_size` bytes and can be
+            reused across calls to avoid allocating new buffers. Every backend
+            writes the opcodes straight into it. Without it, the result is
+            copied once from a worst-case buffer into the returned bytes.
+        stats (QOIStats | None): If given, the opcode statistics and phase
+            timings of the image are added to it.
+        tolerance (int): The largest error per channel, in the range
+            [0, 255]. 0 encodes losslessly.
 
     Returns:
-        bytes: The encoded QOI image data.
+        bytes | int: The encoded QOI image data, or the number of bytes written
+            to `out` if it was given.
+
+    Raises:
+        ValueError: If `out` is not writable or too small, or `tolerance` is
+            not in the range [0, 255].
     """
-    data = bytearray()
+    if not 0 <= tolerance <= 255:
+        raise ValueError("tolerance must be in the range [0, 255].")
+    if stats is not None:
+        return _encode_with_stats(image, colorspace, out, tolerance, stats)
 
     width, height, channels = (
         image.shape[1],
         image.shape[0],
         QOIChannelCount(image.shape[2]),
     )
-    data.extend(
-        QOIHeader(
-            width=width,
-            height=height,
-            colorspace=colorspace,
-            channels=channels,
-        ).to_bytes()
-    )
-
-    previous_pixel = Pixel(0, 0, 0, 255)
-    run_length = 0
-
-    # 64-entry running pixel index
-    running_index: list[Pixel] = [Pixel(0, 0, 0, 0) for _ in range(64)]
+    buffer = _output_buffer(out, qoi_max_encoded_size(width, height, channels))
+    used = _write_header(buffer, width, height, channels, colorspace)
 
     # flatten image into list of pixels
     flat_pixels = image.reshape(-1, image.shape[2])
-    print(f"{flat_pixels.shape=}, {flat_pixels.dtype=}")
-
-    for raw_pixel in flat_pixels:
-        # create a Pixel object from raw data
-        current_pixel = Pixel(
-            r=int(raw_pixel[0]),
-            g=int(raw_pixel[1]),
-            b=int(raw_pixel[2]),
-            a=int(raw_pixel[3]) if channels == QOIChannelCount.RGBA else 255,
+    used += load_backend().encode_pixels(
+        flat_pixels, channels, buffer[used:], tolerance
+    )
+    used = _write_end_marker(buffer, used)
+
+    if out is not None:
+        return used
+    return buffer[:used].tobytes()
+
+
+def _write_header(
+    buffer: np.ndarray,
+    width: int,
+    height: int,
+    channels: QOIChannelCount,
+    colorspace: QOIColorspace,
+) -> int:
+    """Write the header to the start of the buffer and return its size."""
+    header = QOIHeader(
+        width=width,
+        height=height,
+        colorspace=colorspace,
+        channels=channels,
+    ).to_bytes()
+    buffer[: len(header)] = np.frombuffer(header, dtype=np.uint8)
+    return len(header)
+
+
+def _write_end_marker(buffer: np.ndarray, used: int) -> int:
+    """Append the end marker after `used` bytes and return the new size."""
+    buffer[used : used + len(END_MARKER)] = np.frombuffer(END_MARKER, dtype=np.uint8)
+    return used + len(END_MARKER)
+
+
+def _encode_with_stats(
+    image: ImageContent,
+    colorspace: QOIColorspace,
+    out: Buffer | None,
+    tolerance: int,
+    stats: QOIStats,
+) -> bytes | int:
+    """`qoi_encode`, timing every phase and collecting opcode statistics.
+
+    Kept apart, so that encoding without statistics pays nothing for them.
+    """
+    with stats.time("encode_setup"):
+        width, height, channels = (
+            image.shape[1],
+            image.shape[0],
+            QOIChannelCount(image.shape[2]),
         )
+        buffer = _output_buffer(out, qoi_max_encoded_size(width, height, channels))
+        used = _write_header(buffer, width, height, channels, colorspace)
+        flat_pixels = image.reshape(-1, image.shape[2])
+
+    with stats.time("encode_opcodes"):
+        used += load_backend().encode_pixels(
+            flat_pixels, channels, buffer[used:], tolerance
+        )
+        used = _write_end_marker(buffer, used)
+
+    stats.add_stream(buffer[:used], width * height)
 
-        # Check for run
-        if current_pixel == previous_pixel:
-            run_length += 1
-            if run_length == 62:
-                _write_run_length(data, run_length)
-                run_length = 0
-            previous_pixel = current_pixel
-            continue
-
-        # If there was a run pending, write it out now
-        if run_length > 0:
-            _write_run_length(data, run_length)
-            run_length = 0
-
-        index_pos = current_pixel.hash()
-
-        # Check index match
-        if current_pixel == running_index[index_pos]:
-            data.append(QOIOpcode.INDEX | index_pos)
-            previous_pixel = current_pixel
-            continue
-
-        # Update the index with the current pixel
-        running_index[index_pos] = current_pixel
-
-        # Check alpha difference
-        if previous_pixel.a != current_pixel.a:
-            data.extend(
-                [
-                    QOIOpcode.RGBA,
-                    current_pixel.r,
-                    current_pixel.g,
-                    current_pixel.b,
-                    current_pixel.a,
-                ]
-            )
-            previous_pixel = current_pixel
-            continue
-
-        # color channel diffs
-        rdiff = current_pixel.r - previous_pixel.r
-        gdiff = current_pixel.g - previous_pixel.g
-        bdiff = current_pixel.b - previous_pixel.b
-
-        # Small diff
-        if -2 <= rdiff <= 1 and -2 <= gdiff <= 1 and -2 <= bdiff <= 1:
-            data.append(
-                QOIOpcode.DIFF | ((rdiff + 2) << 4) | ((gdiff + 2) << 2) | (bdiff + 2)
-            )
-            previous_pixel = current_pixel
-            continue
-
-        # Luma diff
-        rdiff_gdiff = rdiff - gdiff
-        bdiff_gdiff = bdiff - gdiff
-
-        if -8 <= rdiff_gdiff <= 7 and -8 <= bdiff_gdiff <= 7 and -32 <= gdiff <= 31:
-            data.extend(
-                [
-                    QOIOpcode.LUMA | (gdiff + 32),
-                    ((rdiff_gdiff + 8) << 4) | (bdiff_gdiff + 8),
-                ]
-            )
-            previous_pixel = current_pixel
-            continue
-
-        # Fallback to RGB opcode
-        data.extend([QOIOpcode.RGB, current_pixel.r, current_pixel.g, current_pixel.b])
-
-        previous_pixel = current_pixel
-
-    # There might be a final run left to flush
-    if run_length > 0:
-        _write_run_length(data, run_length)
-
-    # Append the end marker
-    data.extend(END_MARKER)
-
-    return bytes(data)
+    if out is not None:
+        return used
+    with stats.time("encode_output"):
+        return buffer[:used].tobytes()
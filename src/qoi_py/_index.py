@@ -0,0 +1,270 @@
+"""Reading the metadata of QOI images without decoding them.
+
+`qoi_probe` reads the header of a single image. `QOIIndex` keeps the headers
+of all images in a directory tree in a compact cache file, which is updated
+incrementally: only new and modified files are probed again.
+"""
+
+import os
+from collections.abc import Buffer, Iterator
+from dataclasses import dataclass
+from os import PathLike
+from pathlib import Path
+
+import numpy as np
+
+from .types import QOIChannelCount, QOIColorspace
+from ._structure import QOIHeader
+
+
+def qoi_probe(source: str | PathLike[str] | Buffer) -> QOIHeader:
+    """
+    Read the header of a QOI image without decoding it.
+
+    Args:
+        source: The path of a QOI file, of which only the first 14 bytes are
+            read, or the bytes of a QOI image or any other buffer.
+
+    Returns:
+        QOIHeader: The header with the dimensions, channels and colorspace.
+
+    Raises:
+        ValueError: If the header is invalid.
+    """
+    if isinstance(source, (str, PathLike)):
+        with open(source, "rb") as f:
+            return QOIHeader.from_bytes(f.read(14))
+    return QOIHeader.from_bytes(source)
+
+
+@dataclass(frozen=True)
+class QOIIndexEntry:
+    """The metadata of one image in a `QOIIndex`."""
+
+    path: str
+    """The path of the image relative to the root, with forward slashes."""
+    header: QOIHeader
+    size: int
+    """The size of the file in bytes."""
+    mtime_ns: int
+    """The modification time of the file in nanoseconds."""
+
+
+# One record per image, the paths are stored separately
+_RECORD = np.dtype(
+    [
+        ("width", "<u4"),
+        ("height", "<u4"),
+        ("channels", "u1"),
+        ("colorspace", "u1"),
+        ("size", "<u8"),
+        ("mtime_ns", "<i8"),
+    ]
+)
+# The size and modification time of files with an invalid header, which are
+# remembered so that they are not probed again
+_INVALID_RECORD = np.dtype([("size", "<u8"), ("mtime_ns", "<i8")])
+_MAGIC = b"qoix\x01"
+
+
+class QOIIndex:
+    """The metadata of all QOI images in a directory tree, cached on disk.
+
+    The cache file is a small binary table: a magic, the image count, the
+    count of files with an invalid header, one 26-byte record per image, one
+    16-byte record per invalid file and the NUL separated UTF-8 paths of
+    both. Loading it does not touch the images, `refresh` rescans the tree
+    and only probes files whose size or modification time changed.
+
+    Example usage:
+    ```python
+    index = QOIIndex("assets")
+    index.refresh()
+    large = [entry.path for entry in index if entry.header.width > 4096]
+    ```
+    """
+
+    def __init__(
+        self,
+        root: str | PathLike[str],
+        cache_path: str | PathLike[str] | None = None,
+    ):
+        """Load the cache, if it exists. The tree is not scanned.
+
+        Args:
+            root: The directory to index.
+            cache_path: The cache file. If None, `.qoi_index` in the root.
+        """
+        self.root = Path(root)
+        self.cache_path = (
+            Path(cache_path) if cache_path is not None else self.root / ".qoi_index"
+        )
+        self._paths: list[str] = []
+        self._records = np.empty(0, dtype=_RECORD)
+        self._rows: dict[str, int] | None = None
+        # The (size, mtime_ns) of every file with an invalid header
+        self._invalid: dict[str, tuple[int, int]] = {}
+
+        if self.cache_path.exists():
+            self._load()
+
+    @property
+    def paths(self) -> list[str]:
+        """The relative paths of all images, in the order of `records`."""
+        return self._paths
+
+    @property
+    def records(self) -> np.ndarray:
+        """The metadata of all images as a structured array, for fast queries.
+
+        Its fields are width, height, channels, colorspace, size and mtime_ns.
+        """
+        return self._records
+
+    def _load(self) -> None:
+        data = self.cache_path.read_bytes()
+        if data[: len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{self.cache_path} is not a QOI index.")
+
+        offset = len(_MAGIC) + 8
+        count = int.from_bytes(data[len(_MAGIC) : offset - 4], "little")
+        invalid_count = int.from_bytes(data[offset - 4 : offset], "little")
+        self._records = np.frombuffer(data, dtype=_RECORD, count=count, offset=offset)
+        offset += count * _RECORD.itemsize
+        invalid = np.frombuffer(
+            data, dtype=_INVALID_RECORD, count=invalid_count, offset=offset
+        )
+        offset += invalid_count * _INVALID_RECORD.itemsize
+
+        paths = data[offset:].decode().split("\0") if count + invalid_count else []
+        self._paths = paths[:count]
+        self._invalid = dict(zip(paths[count:], invalid.tolist()))
+        self._rows = None
+
+    def save(self) -> None:
+        """Write the cache file, replacing it atomically."""
+        temporary = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        with open(temporary, "wb") as f:
+            f.write(_MAGIC)
+            f.write(len(self._paths).to_bytes(4, "little"))
+            f.write(len(self._invalid).to_bytes(4, "little"))
+            f.write(self._records.tobytes())
+            invalid = np.array(list(self._invalid.values()), dtype=_INVALID_RECORD)
+            f.write(invalid.tobytes())
+            f.write("\0".join([*self._paths, *self._invalid]).encode())
+        os.replace(temporary, self.cache_path)
+
+    def _scan(
+        self, directory: Path, prefix: str
+    ) -> Iterator[tuple[str, os.stat_result]]:
+        """Yield the relative path and stat of every QOI file in a directory."""
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self._scan(Path(entry.path), f"{prefix}{entry.name}/")
+                elif entry.name.lower().endswith(".qoi") and entry.is_file():
+                    yield prefix + entry.name, entry.stat()
+
+    def refresh(self, save: bool = True) -> int:
+        """
+        Rescan the tree and update the index.
+
+        Files with the same size and modification time as in the index are
+        not read. Files with an invalid header are left out, but remembered
+        the same way, so they are only probed again once they change.
+
+        Args:
+            save: Whether to write the cache file if anything changed.
+
+        Returns:
+            int: The number of files which were added, modified or removed.
+        """
+        rows = self._row_lookup()
+        # Python tuples are much faster to compare than numpy records
+        previous = self._records.tolist()
+        paths: list[str] = []
+        records: list[tuple[int, int, int, int, int, int]] = []
+        invalid: dict[str, tuple[int, int]] = {}
+        changes = 0
+        seen = 0
+        seen_invalid = 0
+
+        for path, stat in self._scan(self.root, ""):
+            row = rows.get(path)
+            if row is not None:
+                seen += 1
+                record = previous[row]
+                if record[4:] == (stat.st_size, stat.st_mtime_ns):
+                    paths.append(path)
+                    records.append(record)
+                    continue
+
+            size_and_mtime = (stat.st_size, stat.st_mtime_ns)
+            previous_invalid = self._invalid.get(path)
+            if previous_invalid is not None:
+                seen_invalid += 1
+                if previous_invalid == size_and_mtime:
+                    invalid[path] = size_and_mtime
+                    continue
+
+            changes += 1
+            try:
+                header = qoi_probe(self.root / path)
+            except (OSError, ValueError):
+                invalid[path] = size_and_mtime
+                continue
+            paths.append(path)
+            records.append(
+                (
+                    header.width,
+                    header.height,
+                    header.channels.value,
+                    header.colorspace.value,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                )
+            )
+
+        # Files which were removed
+        changes += len(rows) - seen + len(self._invalid) - seen_invalid
+        self._paths = paths
+        self._records = np.array(records, dtype=_RECORD)
+        self._invalid = invalid
+        self._rows = None
+
+        if save and (changes or not self.cache_path.exists()):
+            self.save()
+        return changes
+
+    def _row_lookup(self) -> dict[str, int]:
+        if self._rows is None:
+            self._rows = {path: row for row, path in enumerate(self._paths)}
+        return self._rows
+
+    def _entry(self, row: int) -> QOIIndexEntry:
+        width, height, channels, colorspace, size, mtime_ns = self._records[row].item()
+        return QOIIndexEntry(
+            path=self._paths[row],
+            header=QOIHeader(
+                width=width,
+                height=height,
+                channels=QOIChannelCount(channels),
+                colorspace=QOIColorspace(colorspace),
+            ),
+            size=size,
+            mtime_ns=mtime_ns,
+        )
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __iter__(self) -> Iterator[QOIIndexEntry]:
+        for row in range(len(self._paths)):
+            yield self._entry(row)
+
+    def __contains__(self, path: object) -> bool:
+        return path in self._row_lookup()
+
+    def __getitem__(self, path: str) -> QOIIndexEntry:
+        """Return the entry of an image by its relative path."""
+        return self._entry(self._row_lookup()[path])
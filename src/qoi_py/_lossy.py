@@ -0,0 +1,148 @@
+"""Lossy encoding, trading exact pixels for smaller and faster output.
+
+Every pixel may be replaced by a pixel within a tolerance per channel, if
+that lets it be encoded with a cheaper opcode: a repetition of the previous
+pixel becomes part of a RUN, and deltas just outside the DIFF and LUMA ranges
+are snapped into them. The encoder carries forward the pixel the decoder will
+reconstruct, not the original one, so errors do not accumulate and the output
+is a standard QOI stream.
+
+Unlike lossless encoding, every pixel depends on the reconstruction of the
+previous one, so there is no vectorized implementation. This scalar loop is
+shared by the reference and NumPy backends, the numba backend compiles the
+same decisions. Only numba makes lossy encoding faster, without it the
+output is smaller but encoding is slower than lossless encoding.
+"""
+
+from array import array
+
+import numpy as np
+
+from .types import QOIChannelCount
+from ._opcodes import QOIOpcode
+
+
+def encode_pixels_lossy(
+    flat_pixels: np.ndarray,
+    channels: QOIChannelCount,
+    out: np.ndarray,
+    tolerance: int,
+) -> int:
+    """
+    Encode the pixels of an image to QOI opcodes, allowing small errors.
+
+    Args:
+        flat_pixels (np.ndarray): The (n, channels) array of pixels.
+        channels (QOIChannelCount): The channel count of the pixels.
+        out (np.ndarray): The uint8 array to write the opcodes to, without
+            header and end marker. It must have room for n * (channels + 1)
+            bytes, the worst case.
+        tolerance (int): The largest difference per channel between a pixel
+            and its decoded value.
+
+    Returns:
+        int: The number of bytes written to `out`.
+    """
+    # The opcodes are written straight into the output
+    view = memoryview(out)
+    pointer = 0
+    running_index = array("I", bytes(4 * 64))
+    previous_r, previous_g, previous_b, previous_a = 0, 0, 0, 255
+    run_length = 0
+    has_alpha = channels == QOIChannelCount.RGBA
+
+    for pixel in flat_pixels.tolist():
+        r, g, b = pixel[0], pixel[1], pixel[2]
+        a = pixel[3] if has_alpha else 255
+        if abs(a - previous_a) <= tolerance:
+            a = previous_a
+
+        # Close enough to the previous pixel to continue the run
+        if (
+            a == previous_a
+            and abs(r - previous_r) <= tolerance
+            and abs(g - previous_g) <= tolerance
+            and abs(b - previous_b) <= tolerance
+        ):
+            run_length += 1
+            if run_length == 62:
+                view[pointer] = QOIOpcode.RUN | 61
+                pointer += 1
+                run_length = 0
+            continue
+
+        # If there was a run pending, write it out now
+        if run_length > 0:
+            view[pointer] = QOIOpcode.RUN | (run_length - 1)
+            pointer += 1
+            run_length = 0
+
+        index_pos = (r * 3 + g * 5 + b * 7 + a * 11) % 64
+        if running_index[index_pos] == (r << 24) | (g << 16) | (b << 8) | a:
+            view[pointer] = QOIOpcode.INDEX | index_pos
+            pointer += 1
+            previous_r, previous_g, previous_b, previous_a = r, g, b, a
+            continue
+
+        if a != previous_a:
+            view[pointer : pointer + 5] = bytes((QOIOpcode.RGBA, r, g, b, a))
+            pointer += 5
+        else:
+            rdiff = r - previous_r
+            gdiff = g - previous_g
+            bdiff = b - previous_b
+
+            # The deltas snapped into the DIFF range, which always stay
+            # between the previous and the current value
+            diff_r = min(max(rdiff, -2), 1)
+            diff_g = min(max(gdiff, -2), 1)
+            diff_b = min(max(bdiff, -2), 1)
+            # The deltas snapped into the LUMA range, which may overshoot
+            luma_g = min(max(gdiff, -32), 31)
+            luma_r = luma_g + min(max(rdiff - luma_g, -8), 7)
+            luma_b = luma_g + min(max(bdiff - luma_g, -8), 7)
+
+            if (
+                abs(rdiff - diff_r) <= tolerance
+                and abs(gdiff - diff_g) <= tolerance
+                and abs(bdiff - diff_b) <= tolerance
+            ):
+                view[pointer] = (
+                    QOIOpcode.DIFF
+                    | ((diff_r + 2) << 4)
+                    | ((diff_g + 2) << 2)
+                    | (diff_b + 2)
+                )
+                pointer += 1
+                r = previous_r + diff_r
+                g = previous_g + diff_g
+                b = previous_b + diff_b
+            elif (
+                abs(rdiff - luma_r) <= tolerance
+                and abs(gdiff - luma_g) <= tolerance
+                and abs(bdiff - luma_b) <= tolerance
+                and 0 <= previous_r + luma_r <= 255
+                and 0 <= previous_b + luma_b <= 255
+            ):
+                view[pointer] = QOIOpcode.LUMA | (luma_g + 32)
+                view[pointer + 1] = ((luma_r - luma_g + 8) << 4) | (luma_b - luma_g + 8)
+                pointer += 2
+                r = previous_r + luma_r
+                g = previous_g + luma_g
+                b = previous_b + luma_b
+            else:
+                view[pointer : pointer + 4] = bytes((QOIOpcode.RGB, r, g, b))
+                pointer += 4
+
+        # The index holds the decoded pixel, which may differ from the input
+        index_pos = (r * 3 + g * 5 + b * 7 + a * 11) % 64
+        running_index[index_pos] = (r << 24) | (g << 16) | (b << 8) | a
+        previous_r, previous_g, previous_b, previous_a = r, g, b, a
+
+    # There might be a final run left to flush
+    if run_length > 0:
+        view[pointer] = QOIOpcode.RUN | (run_length - 1)
+        pointer += 1
+
+    view.release()
+    return pointer
@@ -0,0 +1,365 @@
+"""Numba implementation of the QOI codec.
+
+The same scalar loops as the reference implementation in `_python.py`, but
+compiled to machine code on first use. Importing this module fails with an
+`ImportError` if numba is not installed.
+"""
+
+from collections.abc import Buffer
+
+import numba
+import numpy as np
+
+from .types import QOIChannelCount
+from ._convert import PREMULTIPLY
+
+
+@numba.njit(cache=True, nogil=True)
+def _encode_kernel(pixels: np.ndarray, has_alpha: bool, out: np.ndarray) -> int:
+    """Encode the (n, channels) pixels into `out` and return the bytes used."""
+    running_index = np.zeros(64, dtype=np.int64)
+    previous_r, previous_g, previous_b, previous_a = 0, 0, 0, 255
+    run_length = 0
+    pointer = 0
+
+    for i in range(pixels.shape[0]):
+        r = np.int64(pixels[i, 0])
+        g = np.int64(pixels[i, 1])
+        b = np.int64(pixels[i, 2])
+        a = np.int64(pixels[i, 3]) if has_alpha else np.int64(255)
+
+        # Check for run
+        if r == previous_r and g == previous_g and b == previous_b and a == previous_a:
+            run_length += 1
+            if run_length == 62:
+                out[pointer] = 0xC0 | (run_length - 1)
+                pointer += 1
+                run_length = 0
+            continue
+
+        # If there was a run pending, write it out now
+        if run_length > 0:
+            out[pointer] = 0xC0 | (run_length - 1)
+            pointer += 1
+            run_length = 0
+
+        index_pos = (r * 3 + g * 5 + b * 7 + a * 11) % 64
+        packed = (r << 24) | (g << 16) | (b << 8) | a
+
+        if running_index[index_pos] == packed:
+            out[pointer] = index_pos
+            pointer += 1
+        else:
+            running_index[index_pos] = packed
+
+            rdiff = r - previous_r
+            gdiff = g - previous_g
+            bdiff = b - previous_b
+            rdiff_gdiff = rdiff - gdiff
+            bdiff_gdiff = bdiff - gdiff
+
+            if a != previous_a:
+                out[pointer] = 0xFF
+                out[pointer + 1] = r
+                out[pointer + 2] = g
+                out[pointer + 3] = b
+                out[pointer + 4] = a
+                pointer += 5
+            elif -2 <= rdiff <= 1 and -2 <= gdiff <= 1 and -2 <= bdiff <= 1:
+                out[pointer] = (
+                    0x40 | ((rdiff + 2) << 4) | ((gdiff + 2) << 2) | (bdiff + 2)
+                )
+                pointer += 1
+            elif (
+                -8 <= rdiff_gdiff <= 7 and -8 <= bdiff_gdiff <= 7 and -32 <= gdiff <= 31
+            ):
+                out[pointer] = 0x80 | (gdiff + 32)
+                out[pointer + 1] = ((rdiff_gdiff + 8) << 4) | (bdiff_gdiff + 8)
+                pointer += 2
+            else:
+                out[pointer] = 0xFE
+                out[pointer + 1] = r
+                out[pointer + 2] = g
+                out[pointer + 3] = b
+                pointer += 4
+
+        previous_r, previous_g, previous_b, previous_a = r, g, b, a
+
+    # There might be a final run left to flush
+    if run_length > 0:
+        out[pointer] = 0xC0 | (run_length - 1)
+        pointer += 1
+
+    return pointer
+
+
+@numba.njit(cache=True, nogil=True)
+def _encode_lossy_kernel(
+    pixels: np.ndarray, has_alpha: bool, tolerance: int, out: np.ndarray
+) -> int:
+    """`_encode_kernel` allowing errors up to `tolerance`, see `_lossy.py`."""
+    running_index = np.zeros(64, dtype=np.int64)
+    previous_r, previous_g, previous_b, previous_a = 0, 0, 0, 255
+    run_length = 0
+    pointer = 0
+
+    for i in range(pixels.shape[0]):
+        r = np.int64(pixels[i, 0])
+        g = np.int64(pixels[i, 1])
+        b = np.int64(pixels[i, 2])
+        a = np.int64(pixels[i, 3]) if has_alpha else np.int64(255)
+        if abs(a - previous_a) <= tolerance:
+            a = previous_a
+
+        # Close enough to the previous pixel to continue the run
+        if (
+            a == previous_a
+            and abs(r - previous_r) <= tolerance
+            and abs(g - previous_g) <= tolerance
+            and abs(b - previous_b) <= tolerance
+        ):
+            run_length += 1
+            if run_length == 62:
+                out[pointer] = 0xC0 | (run_length - 1)
+                pointer += 1
+                run_length = 0
+            continue
+
+        # If there was a run pending, write it out now
+        if run_length > 0:
+            out[pointer] = 0xC0 | (run_length - 1)
+            pointer += 1
+            run_length = 0
+
+        index_pos = (r * 3 + g * 5 + b * 7 + a * 11) % 64
+        if running_index[index_pos] == (r << 24) | (g << 16) | (b << 8) | a:
+            out[pointer] = index_pos
+            pointer += 1
+            previous_r, previous_g, previous_b, previous_a = r, g, b, a
+            continue
+
+        if a != previous_a:
+            out[pointer] = 0xFF
+            out[pointer + 1] = r
+            out[pointer + 2] = g
+            out[pointer + 3] = b
+            out[pointer + 4] = a
+            pointer += 5
+        else:
+            rdiff = r - previous_r
+            gdiff = g - previous_g
+            bdiff = b - previous_b
+
+            diff_r = min(max(rdiff, -2), 1)
+            diff_g = min(max(gdiff, -2), 1)
+            diff_b = min(max(bdiff, -2), 1)
+            luma_g = min(max(gdiff, -32), 31)
+            luma_r = luma_g + min(max(rdiff - luma_g, -8), 7)
+            luma_b = luma_g + min(max(bdiff - luma_g, -8), 7)
+
+            if (
+                abs(rdiff - diff_r) <= tolerance
+                and abs(gdiff - diff_g) <= tolerance
+                and abs(bdiff - diff_b) <= tolerance
+            ):
+                out[pointer] = (
+                    0x40 | ((diff_r + 2) << 4) | ((diff_g + 2) << 2) | (diff_b + 2)
+                )
+                pointer += 1
+                r = previous_r + diff_r
+                g = previous_g + diff_g
+                b = previous_b + diff_b
+            elif (
+                abs(rdiff - luma_r) <= tolerance
+                and abs(gdiff - luma_g) <= tolerance
+                and abs(bdiff - luma_b) <= tolerance
+                and 0 <= previous_r + luma_r <= 255
+                and 0 <= previous_b + luma_b <= 255
+            ):
+                out[pointer] = 0x80 | (luma_g + 32)
+                out[pointer + 1] = ((luma_r - luma_g + 8) << 4) | (luma_b - luma_g + 8)
+                pointer += 2
+                r = previous_r + luma_r
+                g = previous_g + luma_g
+                b = previous_b + luma_b
+            else:
+                out[pointer] = 0xFE
+                out[pointer + 1] = r
+                out[pointer + 2] = g
+                out[pointer + 3] = b
+                pointer += 4
+
+        # The index holds the decoded pixel, which may differ from the input
+        index_pos = (r * 3 + g * 5 + b * 7 + a * 11) % 64
+        running_index[index_pos] = (r << 24) | (g << 16) | (b << 8) | a
+        previous_r, previous_g, previous_b, previous_a = r, g, b, a
+
+    # There might be a final run left to flush
+    if run_length > 0:
+        out[pointer] = 0xC0 | (run_length - 1)
+        pointer += 1
+
+    return pointer
+
+
+@numba.njit(cache=True, nogil=True)
+def _decode_kernel(
+    data: np.ndarray,
+    end: int,
+    out: np.ndarray,
+    alpha_fill: int,
+    premultiply: np.ndarray | None,
+    opcode_counts: np.ndarray | None,
+) -> None:
+    """Decode the opcodes in `data[14:end]` into the (n, channels) `out`.
+
+    A negative `alpha_fill` keeps the decoded alpha. If given, `premultiply`
+    is the `PREMULTIPLY` table and the colors are multiplied by the alpha,
+    and the opcodes are counted by first byte into `opcode_counts`.
+    """
+    n_pixels = out.shape[0]
+    has_alpha = out.shape[1] == 4
+    index_r = np.zeros(64, dtype=np.int64)
+    index_g = np.zeros(64, dtype=np.int64)
+    index_b = np.zeros(64, dtype=np.int64)
+    index_a = np.zeros(64, dtype=np.int64)
+    r, g, b, a = np.int64(0), np.int64(0), np.int64(0), np.int64(255)
+    out_r, out_g, out_b, out_a = r, g, b, a
+
+    pixel_pointer = 0
+    pointer = 14
+    while pointer < end and pixel_pointer < n_pixels:
+        byte1 = np.int64(data[pointer])
+        if opcode_counts is not None:
+            opcode_counts[byte1] += 1
+        run_length = 1
+        if byte1 == 0xFE:
+            r = np.int64(data[pointer + 1])
+            g = np.int64(data[pointer + 2])
+            b = np.int64(data[pointer + 3])
+            pointer += 4
+        elif byte1 == 0xFF:
+            r = np.int64(data[pointer + 1])
+            g = np.int64(data[pointer + 2])
+            b = np.int64(data[pointer + 3])
+            a = np.int64(data[pointer + 4])
+            pointer += 5
+        elif byte1 < 0x40:
+            r = index_r[byte1]
+            g = index_g[byte1]
+            b = index_b[byte1]
+            a = index_a[byte1]
+            pointer += 1
+        elif byte1 < 0x80:
+            r = (r + ((byte1 >> 4) & 0b11) - 2) & 0xFF
+            g = (g + ((byte1 >> 2) & 0b11) - 2) & 0xFF
+            b = (b + (byte1 & 0b11) - 2) & 0xFF
+            pointer += 1
+        elif byte1 < 0xC0:
+            byte2 = np.int64(data[pointer + 1])
+            gdiff = (byte1 & 0x3F) - 32
+            r = (r + gdiff + (byte2 >> 4) - 8) & 0xFF
+            g = (g + gdiff) & 0xFF
+            b = (b + gdiff + (byte2 & 0x0F) - 8) & 0xFF
+            pointer += 2
+        else:
+            run_length = (byte1 & 0x3F) + 1
+            pointer += 1
+
+        index_pos = (r * 3 + g * 5 + b * 7 + a * 11) % 64
+        index_r[index_pos] = r
+        index_g[index_pos] = g
+        index_b[index_pos] = b
+        index_a[index_pos] = a
+
+        # The output pixel is converted once per opcode, not per pixel
+        out_r, out_g, out_b, out_a = r, g, b, a
+        if alpha_fill >= 0:
+            out_a = alpha_fill
+        if premultiply is not None:
+            out_r = premultiply[out_a, r]
+            out_g = premultiply[out_a, g]
+            out_b = premultiply[out_a, b]
+
+        run_end = min(pixel_pointer + run_length, n_pixels)
+        if has_alpha:
+            for i in range(pixel_pointer, run_end):
+                out[i, 0] = out_r
+                out[i, 1] = out_g
+                out[i, 2] = out_b
+                out[i, 3] = out_a
+        else:
+            for i in range(pixel_pointer, run_end):
+                out[i, 0] = out_r
+                out[i, 1] = out_g
+                out[i, 2] = out_b
+        pixel_pointer = run_end
+
+    # If the data ends early, the last pixel is repeated
+    for i in range(pixel_pointer, n_pixels):
+        out[i, 0] = out_r
+        out[i, 1] = out_g
+        out[i, 2] = out_b
+        if has_alpha:
+            out[i, 3] = out_a
+
+
+def encode_pixels(
+    flat_pixels: np.ndarray,
+    channels: QOIChannelCount,
+    out: np.ndarray,
+    tolerance: int = 0,
+) -> int:
+    """
+    Encode the pixels of an image to QOI opcodes.
+
+    Args:
+        flat_pixels (np.ndarray): The (n, channels) array of pixels.
+        channels (QOIChannelCount): The channel count of the pixels.
+        out (np.ndarray): The uint8 array to write the opcodes to, without
+            header and end marker. It must have room for n * (channels + 1)
+            bytes, the worst case.
+        tolerance (int): The largest error per channel of lossy encoding, or
+            0 for lossless encoding.
+
+    Returns:
+        int: The number of bytes written to `out`.
+    """
+    pixels = np.ascontiguousarray(flat_pixels)
+    has_alpha = channels == QOIChannelCount.RGBA
+    if tolerance > 0:
+        return _encode_lossy_kernel(pixels, has_alpha, tolerance, out)
+    return _encode_kernel(pixels, has_alpha, out)
+
+
+def decode_pixels(
+    data: Buffer,
+    img_data: np.ndarray,
+    alpha_fill: int | None = None,
+    premultiply_alpha: bool = False,
+    opcode_counts: np.ndarray | None = None,
+) -> None:
+    """
+    Decode the opcodes of an image.
+
+    Args:
+        data (Buffer): The complete encoded image, including the header.
+        img_data (np.ndarray): The (n_pixels, channels) uint8 array to decode
+            into, where n_pixels is the pixel count the header announces.
+            The alpha channel is dropped if it has 3 channels.
+        alpha_fill (int | None): If not None, the alpha of every pixel is
+            replaced by this value.
+        premultiply_alpha (bool): Whether to multiply the colors by the alpha.
+        opcode_counts (np.ndarray | None): If given, the (256,) int64 array
+            to which the number of decoded opcodes by first byte is added.
+    """
+    # Last 8 bytes are padding (7x 0x00 and 1x 0x01)
+    end = len(data) - 8
+    _decode_kernel(
+        np.frombuffer(data, dtype=np.uint8),
+        end,
+        img_data,
+        alpha_fill if alpha_fill is not None else -1,
+        PREMULTIPLY if premultiply_alpha else None,
+        opcode_counts,
+    )
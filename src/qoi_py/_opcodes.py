@@ -35,3 +35,50 @@ class QOIOpcode(IntEnum):
 
         # Now, mask to get the first two bits for 2-bit opcodes
         return cls(byte & MASK_2BIT_OPCODE)
+
+
+def _diff_deltas(byte: int) -> tuple[int, int, int]:
+    """The (rdiff, gdiff, bdiff) stored in a DIFF opcode, each -2..1."""
+    return ((byte >> 4) & 0b11) - 2, ((byte >> 2) & 0b11) - 2, (byte & 0b11) - 2
+
+
+def _luma_deltas(byte2: int) -> tuple[int, int]:
+    """The (rdiff - gdiff, bdiff - gdiff) stored in the second byte of a LUMA
+    opcode, each -8..7."""
+    return (byte2 >> 4) - 8, (byte2 & 0x0F) - 8
+
+
+# Dispatch tables by the first byte of an opcode, so that decoders never have
+# to construct a QOIOpcode or unpack the payload bits themselves. Entries of
+# the tables for one opcode are meaningless for bytes of other opcodes.
+OPCODE_OF_BYTE = tuple(QOIOpcode.from_byte(byte) for byte in range(256))
+"""The opcode of every byte."""
+SIZE_OF_BYTE = tuple(
+    {QOIOpcode.LUMA: 2, QOIOpcode.RGB: 4, QOIOpcode.RGBA: 5}.get(opcode, 1)
+    for opcode in OPCODE_OF_BYTE
+)
+"""The size in bytes of the opcode starting with every byte."""
+PIXELS_OF_BYTE = tuple(
+    (byte & MASK_2BIT_DATA) + 1 if opcode == QOIOpcode.RUN else 1
+    for byte, opcode in enumerate(OPCODE_OF_BYTE)
+)
+"""The number of pixels the opcode starting with every byte decodes."""
+DIFF_DELTAS = tuple(_diff_deltas(byte) for byte in range(256))
+"""The (rdiff, gdiff, bdiff) of every DIFF byte."""
+LUMA_GREEN_DELTA = tuple((byte & MASK_2BIT_DATA) - 32 for byte in range(256))
+"""The gdiff of every first LUMA byte."""
+LUMA_RED_BLUE_DELTAS = tuple(_luma_deltas(byte) for byte in range(256))
+"""The (rdiff - gdiff, bdiff - gdiff) of every second LUMA byte."""
+
+# The inverse tables for the encoder, which double as range checks: deltas
+# outside the range of an opcode are not in its table.
+DIFF_BYTE_OF_DELTAS = {
+    DIFF_DELTAS[byte]: byte for byte in range(QOIOpcode.DIFF, QOIOpcode.LUMA)
+}
+"""The DIFF byte of every (rdiff, gdiff, bdiff)."""
+LUMA_BYTE_OF_GREEN_DELTA = {
+    LUMA_GREEN_DELTA[byte]: byte for byte in range(QOIOpcode.LUMA, QOIOpcode.RUN)
+}
+"""The first LUMA byte of every gdiff."""
+LUMA_BYTE_OF_RED_BLUE_DELTAS = {LUMA_RED_BLUE_DELTAS[byte]: byte for byte in range(256)}
+"""The second LUMA byte of every (rdiff - gdiff, bdiff - gdiff)."""
@@ -0,0 +1,42 @@
+"""Thread pool helpers shared by the functions which work on many images or
+tiles at once.
+
+Only the numba backend releases the GIL, in its `nogil` kernels, so only
+with it do the threads run on several cores, without the cost of moving
+pixels between processes. The hot loops of the NumPy and reference backends
+are Python code which holds the GIL, so with them `workers` above 1 gives no
+speed-up. `qoi_py.batch` uses processes instead, for any backend.
+"""
+
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parallel_map[T, R](
+    function: Callable[[T], R], items: list[T], workers: int | None
+) -> list[R]:
+    """
+    Apply a function to all items on a thread pool, preserving their order.
+
+    The items are only processed in parallel if the function releases the
+    GIL, like the codecs of the numba backend.
+
+    Args:
+        function (Callable[[T], R]): The function to apply.
+        items (list[T]): The items.
+        workers (int | None): The number of threads. If None, one per CPU.
+
+    Returns:
+        list[R]: The result for every item.
+
+    Raises:
+        ValueError: If `workers` is less than 1.
+    """
+    workers = workers if workers is not None else os.process_cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    if workers == 1 or len(items) <= 1:
+        return [function(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(function, items))
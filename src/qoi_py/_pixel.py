@@ -1,5 +1,7 @@
 from dataclasses import dataclass
 
+import numpy as np
+
 
 @dataclass(frozen=True)
 class Pixel:
@@ -32,3 +34,33 @@ class Pixel:
                 "Ensure that the pixel values are integers in this range. "
                 f"{self!r}"
             )
+
+
+def qoi_hash_array(pixels: np.ndarray) -> np.ndarray:
+    """
+    Compute the running index position of every pixel at once.
+
+    This is the vectorized counterpart of `Pixel.hash`. The channels are cast
+    to int32 before the weighted sum, which keeps NumPy from promoting uint64
+    channels to float64. Values which do not fit wrap around, like the sum,
+    which does not change it modulo 64.
+
+    Args:
+        pixels (np.ndarray): The (n, 3) array of RGB pixels, with an implicit
+            alpha of 255, or the (n, 4) array of RGBA pixels.
+
+    Returns:
+        np.ndarray: The (n,) uint8 array of index positions in the range
+            [0, 63].
+
+    Raises:
+        ValueError: If the array is not of shape (n, 3) or (n, 4).
+    """
+    if pixels.ndim != 2 or pixels.shape[1] not in (3, 4):
+        raise ValueError(
+            f"Expected an array of shape (n, 3) or (n, 4), got {pixels.shape}."
+        )
+    channels = [pixels[:, i].astype(np.int32) for i in range(pixels.shape[1])]
+    alpha = channels[3] * 11 if len(channels) == 4 else 255 * 11
+    positions = channels[0] * 3 + channels[1] * 5 + channels[2] * 7 + alpha
+    return (positions % 64).astype(np.uint8)
@@ -0,0 +1,318 @@
+"""Pure Python implementation of the QOI codec.
+
+This is the reference implementation: it handles one pixel or opcode at a
+time, exactly as described by the QOI specification. All other backends have
+to produce the same output.
+
+Inside the loops, a pixel is a single int and the running index is an array
+of such ints, so that no object is allocated or validated per pixel. The
+encoder packs pixels as 0xRRGGBBAA. The decoder gives every channel a 16-bit
+lane, 0x00RR00GG00BB00AA, so that DIFF and LUMA deltas are added to all
+channels at once.
+"""
+
+from array import array
+from collections.abc import Buffer
+
+import numpy as np
+
+from .types import QOIChannelCount
+from ._convert import convert_pixels
+from ._lossy import encode_pixels_lossy
+from ._opcodes import (
+    QOIOpcode,
+    DIFF_BYTE_OF_DELTAS,
+    DIFF_DELTAS,
+    LUMA_BYTE_OF_GREEN_DELTA,
+    LUMA_BYTE_OF_RED_BLUE_DELTAS,
+    LUMA_GREEN_DELTA,
+    LUMA_RED_BLUE_DELTAS,
+    OPCODE_OF_BYTE,
+    PIXELS_OF_BYTE,
+    SIZE_OF_BYTE,
+)
+from ._pixel import qoi_hash_array
+from ._vectorized import find_run_breaks
+
+START_PIXEL = 0x000000FF
+"""The implicit previous pixel before the first pixel of an image, packed."""
+
+_LANES = 0x00FF00FF00FF00FF
+"""The channels of a pixel packed into 16-bit lanes."""
+
+
+def _lane_deltas(rdiff: int, gdiff: int, bdiff: int) -> int:
+    """Pack deltas into 16-bit lanes, as their value modulo 256."""
+    return ((rdiff & 0xFF) << 48) | ((gdiff & 0xFF) << 32) | ((bdiff & 0xFF) << 16)
+
+
+# Adding packed deltas to a pixel wraps every channel around on its own: the
+# carry lands in the upper byte of its lane, which `_LANES` masks off. The index
+# position is linear modulo 64, and as 64 divides 256 the wraparound does not
+# affect it, so it is updated by deltas too.
+_DIFF_LANE_DELTAS = tuple(_lane_deltas(*deltas) for deltas in DIFF_DELTAS)
+_DIFF_POSITION_DELTAS = tuple((3 * r + 5 * g + 7 * b) % 64 for r, g, b in DIFF_DELTAS)
+_LUMA_GREEN_LANE_DELTAS = tuple(_lane_deltas(g, g, g) for g in LUMA_GREEN_DELTA)
+_LUMA_GREEN_POSITION_DELTAS = tuple((15 * g) % 64 for g in LUMA_GREEN_DELTA)
+_LUMA_RED_BLUE_LANE_DELTAS = tuple(
+    _lane_deltas(r, 0, b) for r, b in LUMA_RED_BLUE_DELTAS
+)
+_LUMA_RED_BLUE_POSITION_DELTAS = tuple(
+    (3 * r + 7 * b) % 64 for r, b in LUMA_RED_BLUE_DELTAS
+)
+# Shifting a channel into its lane allocates a new int, looking it up does not
+_RED_LANES = tuple(value << 48 for value in range(256))
+_GREEN_LANES = tuple(value << 32 for value in range(256))
+_BLUE_LANES = tuple(value << 16 for value in range(256))
+_PIXELS_OF_BYTE = np.array(PIXELS_OF_BYTE, dtype=np.intp)
+
+
+def decode_pixels(
+    data: Buffer,
+    img_data: np.ndarray,
+    alpha_fill: int | None = None,
+    premultiply_alpha: bool = False,
+    opcode_counts: np.ndarray | None = None,
+) -> None:
+    """
+    Decode the opcodes of an image one by one.
+
+    Args:
+        data (Buffer): The complete encoded image, including the header.
+        img_data (np.ndarray): The (n_pixels, channels) uint8 array to decode
+            into, where n_pixels is the pixel count the header announces.
+            The alpha channel is dropped if it has 3 channels.
+        alpha_fill (int | None): If not None, the alpha of every pixel is
+            replaced by this value.
+        premultiply_alpha (bool): Whether to multiply the colors by the alpha.
+        opcode_counts (np.ndarray | None): If given, the (256,) int64 array
+            to which the number of decoded opcodes by first byte is added.
+    """
+    n_pixels = img_data.shape[0]
+    channels = QOIChannelCount(img_data.shape[1])
+
+    opcode_of_byte = OPCODE_OF_BYTE
+    diff_lane_deltas = _DIFF_LANE_DELTAS
+    diff_position_deltas = _DIFF_POSITION_DELTAS
+    luma_green_lane_deltas = _LUMA_GREEN_LANE_DELTAS
+    luma_green_position_deltas = _LUMA_GREEN_POSITION_DELTAS
+    luma_red_blue_lane_deltas = _LUMA_RED_BLUE_LANE_DELTAS
+    luma_red_blue_position_deltas = _LUMA_RED_BLUE_POSITION_DELTAS
+    red_lanes, green_lanes, blue_lanes = _RED_LANES, _GREEN_LANES, _BLUE_LANES
+    size_of_byte = SIZE_OF_BYTE
+    pixels_of_byte = PIXELS_OF_BYTE
+    INDEX, DIFF, LUMA, RUN, RGB, _ = QOIOpcode
+
+    running_index = array("Q", bytes(8 * 64))
+    pixel = START_PIXEL
+    position = (255 * 11) % 64
+
+    # The pixel and first byte of every opcode, the byte gives how often the
+    # pixel repeats. They are converted and expanded into the output once at
+    # the end. Every opcode is at least one byte and decodes to at least one
+    # pixel, which bounds their number.
+    capacity = max(min(len(data) - 22, n_pixels), 0)
+    opcode_pixels = array("Q", bytes(8 * capacity))
+    opcode_bytes = bytearray(capacity)
+    n_opcodes = 0
+    n_decoded = 0
+
+    pointer = 14
+    end = len(data) - 8  # Last 8 bytes are padding (7x 0x00 and 1x 0x01)
+    # Opcodes beyond the pixel count of the header are ignored
+    while pointer < end and n_decoded < n_pixels:
+        byte1 = data[pointer]
+        opcode = opcode_of_byte[byte1]
+
+        if opcode is DIFF:
+            pixel = (pixel + diff_lane_deltas[byte1]) & _LANES
+            position = (position + diff_position_deltas[byte1]) & 63
+        elif opcode is LUMA:
+            byte2 = data[pointer + 1]
+            pixel = (
+                pixel + luma_green_lane_deltas[byte1] + luma_red_blue_lane_deltas[byte2]
+            ) & _LANES
+            position = (
+                position
+                + luma_green_position_deltas[byte1]
+                + luma_red_blue_position_deltas[byte2]
+            ) & 63
+        elif opcode is INDEX:
+            pixel = running_index[byte1]
+            # Entries that were never written hold (0, 0, 0, 0), whose
+            # position is 0 rather than their own
+            position = byte1 if pixel else 0
+        elif opcode is RUN:
+            pass  # The previous pixel is repeated, see PIXELS_OF_BYTE
+        elif opcode is RGB:
+            r = data[pointer + 1]
+            g = data[pointer + 2]
+            b = data[pointer + 3]
+            a = pixel & 0xFF
+            pixel = red_lanes[r] | green_lanes[g] | blue_lanes[b] | a
+            position = (r * 3 + g * 5 + b * 7 + a * 11) & 63
+        else:
+            r = data[pointer + 1]
+            g = data[pointer + 2]
+            b = data[pointer + 3]
+            a = data[pointer + 4]
+            pixel = red_lanes[r] | green_lanes[g] | blue_lanes[b] | a
+            position = (r * 3 + g * 5 + b * 7 + a * 11) & 63
+
+        running_index[position] = pixel
+
+        pointer += size_of_byte[byte1]
+        opcode_pixels[n_opcodes] = pixel
+        opcode_bytes[n_opcodes] = byte1
+        n_opcodes += 1
+        n_decoded += pixels_of_byte[byte1]
+
+    first_bytes = np.frombuffer(opcode_bytes, dtype=np.uint8)[:n_opcodes]
+    if opcode_counts is not None:
+        opcode_counts += np.bincount(first_bytes, minlength=256)
+    lanes = np.frombuffer(opcode_pixels, dtype=np.uint64)[:n_opcodes]
+    repeats = _PIXELS_OF_BYTE[first_bytes]
+    if n_decoded > n_pixels:
+        # A run may overshoot the pixel count of the header
+        repeats[-1] -= n_decoded - n_pixels
+    elif n_decoded < n_pixels:
+        # If the data ends early, the last pixel is repeated
+        lanes = np.append(lanes, np.uint64(pixel))
+        repeats = np.append(repeats, n_pixels - n_decoded)
+
+    # Every channel is the low byte of its lane, counted from the end in
+    # little-endian byte order
+    rgba = lanes.astype("<u8", copy=False).view(np.uint8).reshape(-1, 8)[:, 6::-2]
+    img_data[:] = np.repeat(
+        convert_pixels(rgba, channels, alpha_fill, premultiply_alpha),
+        repeats,
+        axis=0,
+    )
+
+
+def _write_runs(view: memoryview, pointer: int, run_length: int) -> int:
+    """
+    Write a run of arbitrary length as a sequence of RUN opcodes.
+
+    A single RUN opcode covers at most 62 pixels, so longer runs are split into
+    chunks of 62 followed by the remainder.
+
+    Args:
+        view (memoryview): The byte view of the output to write to.
+        pointer (int): The offset in `view` to write at.
+        run_length (int): The total number of repeated pixels, may be zero.
+
+    Returns:
+        int: The offset after the written opcodes.
+    """
+    full_chunks, remainder = divmod(run_length, 62)
+    view[pointer : pointer + full_chunks] = bytes([QOIOpcode.RUN | 61]) * full_chunks
+    pointer += full_chunks
+    if remainder > 0:
+        view[pointer] = QOIOpcode.RUN | (remainder - 1)
+        pointer += 1
+    return pointer
+
+
+def encode_pixels(
+    flat_pixels: np.ndarray,
+    channels: QOIChannelCount,
+    out: np.ndarray,
+    tolerance: int = 0,
+) -> int:
+    """
+    Encode the pixels of an image to QOI opcodes one by one.
+
+    Args:
+        flat_pixels (np.ndarray): The (n, channels) array of pixels.
+        channels (QOIChannelCount): The channel count of the pixels.
+        out (np.ndarray): The uint8 array to write the opcodes to, without
+            header and end marker. It must have room for n * (channels + 1)
+            bytes, the worst case.
+        tolerance (int): The largest error per channel of lossy encoding, or
+            0 for lossless encoding, see `encode_pixels_lossy`.
+
+    Returns:
+        int: The number of bytes written to `out`.
+    """
+    if tolerance > 0:
+        return encode_pixels_lossy(flat_pixels, channels, out, tolerance)
+
+    # The opcodes are written straight into the output
+    view = memoryview(out)
+    pointer = 0
+    previous_pixel = START_PIXEL
+
+    diff_byte_of_deltas = DIFF_BYTE_OF_DELTAS
+    luma_byte_of_green_delta = LUMA_BYTE_OF_GREEN_DELTA
+    luma_byte_of_red_blue_deltas = LUMA_BYTE_OF_RED_BLUE_DELTAS
+
+    # 64-entry running pixel index
+    running_index = array("I", bytes(4 * 64))
+
+    # Only pixels which break a run have to be looked at, everything in between
+    # is a repetition of the previous pixel and becomes part of a RUN opcode.
+    run_breaks = find_run_breaks(flat_pixels, channels)
+
+    # Pack the pixels and compute their index positions up front
+    rgba = np.full((len(run_breaks), 4), 255, dtype=np.uint8)
+    rgba[:, : channels.value] = flat_pixels[run_breaks]
+    packed = rgba.view(">u4").ravel().tolist()
+    hashes = qoi_hash_array(rgba).tolist()
+
+    next_position = 0
+    for position, pixel, index_pos in zip(run_breaks.tolist(), packed, hashes):
+        # If there was a run pending, write it out now
+        if position != next_position:
+            pointer = _write_runs(view, pointer, position - next_position)
+        next_position = position + 1
+
+        # Check index match
+        if running_index[index_pos] == pixel:
+            view[pointer] = QOIOpcode.INDEX | index_pos
+            pointer += 1
+            previous_pixel = pixel
+            continue
+
+        # Update the index with the current pixel
+        running_index[index_pos] = pixel
+
+        # Check alpha difference
+        if (previous_pixel ^ pixel) & 0xFF:
+            view[pointer] = QOIOpcode.RGBA
+            view[pointer + 1 : pointer + 5] = pixel.to_bytes(4, "big")
+            pointer += 5
+            previous_pixel = pixel
+            continue
+
+        # color channel diffs
+        rdiff = (pixel >> 24) - (previous_pixel >> 24)
+        gdiff = ((pixel >> 16) & 0xFF) - ((previous_pixel >> 16) & 0xFF)
+        bdiff = ((pixel >> 8) & 0xFF) - ((previous_pixel >> 8) & 0xFF)
+        previous_pixel = pixel
+
+        # Small diff, the table only has the deltas in range
+        diff_byte = diff_byte_of_deltas.get((rdiff, gdiff, bdiff))
+        if diff_byte is not None:
+            view[pointer] = diff_byte
+            pointer += 1
+            continue
+
+        # Luma diff
+        luma_byte1 = luma_byte_of_green_delta.get(gdiff)
+        luma_byte2 = luma_byte_of_red_blue_deltas.get((rdiff - gdiff, bdiff - gdiff))
+        if luma_byte1 is not None and luma_byte2 is not None:
+            view[pointer] = luma_byte1
+            view[pointer + 1] = luma_byte2
+            pointer += 2
+            continue
+
+        # Fallback to RGB opcode
+        view[pointer] = QOIOpcode.RGB
+        view[pointer + 1 : pointer + 4] = (pixel >> 8).to_bytes(3, "big")
+        pointer += 4
+
+    # There might be a final run left to flush
+    pointer = _write_runs(view, pointer, len(flat_pixels) - next_position)
+    view.release()
+    return pointer
@@ -0,0 +1,195 @@
+"""Encoding the pixels of an image in a different scan order.
+
+QOI encodes pixels row by row, so runs and DIFF opcodes only find horizontal
+neighbors. For images with vertical structure, or small repeating patterns,
+other orders produce more RUN, DIFF and INDEX opcodes. The reordered pixels
+are encoded as a standard QOI image of the same size behind a small
+`QOIScanHeader`, which records the order to undo after decoding.
+"""
+
+from collections.abc import Buffer, Iterable
+from functools import lru_cache
+
+import numpy as np
+
+from .types import (
+    ImageContent,
+    QOIChannelCount,
+    QOIColorspace,
+    QOIScanOrder,
+    RGBImage,
+    RGBAImage,
+)
+from ._decode import _image, _released, qoi_decode
+from ._encode import qoi_encode
+from ._structure import QOIHeader, QOIScanHeader
+
+_TILE_SIZE = 8
+
+
+def _hilbert_distance(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """The distance along the Hilbert curve filling an n x n square, where n
+    is a power of two, of every point."""
+    x, y = x.copy(), y.copy()
+    distance = np.zeros_like(x)
+    s = n // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        distance += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant, so that the curve continues in it
+        flip = ~ry & rx
+        x[flip] = n - 1 - x[flip]
+        y[flip] = n - 1 - y[flip]
+        swap = ~ry
+        x[swap], y[swap] = y[swap], x[swap]
+        s //= 2
+    return distance
+
+
+@lru_cache(maxsize=4)
+def scan_permutation(order: QOIScanOrder, height: int, width: int) -> np.ndarray:
+    """
+    Return the row-major index of every pixel in scan order.
+
+    The returned arrays are cached and read-only. They are int32 unless the
+    image has more than 2**31 pixels, a 4K permutation takes 33 MB.
+
+    Args:
+        order (QOIScanOrder): The scan order.
+        height (int): The height of the image.
+        width (int): The width of the image.
+
+    Returns:
+        np.ndarray: The (height * width,) permutation.
+    """
+    dtype = np.int32 if height * width <= np.iinfo(np.int32).max else np.intp
+    indices = np.arange(height * width, dtype=dtype).reshape(height, width)
+    if order == QOIScanOrder.ROW_MAJOR:
+        permutation = indices.ravel()
+    elif order == QOIScanOrder.COLUMN_MAJOR:
+        permutation = indices.T.ravel()
+    elif order == QOIScanOrder.SERPENTINE:
+        indices[1::2] = indices[1::2, ::-1]
+        permutation = indices.ravel()
+    elif order == QOIScanOrder.TILES:
+        y, x = np.divmod(indices.ravel(), width)
+        permutation = np.lexsort((x, y, x // _TILE_SIZE, y // _TILE_SIZE))
+    elif order == QOIScanOrder.HILBERT:
+        y, x = np.divmod(indices.ravel(), width)
+        n = 1 << (max(height, width, 1) - 1).bit_length()
+        permutation = np.argsort(_hilbert_distance(x, y, n), kind="stable")
+    else:
+        raise ValueError(f"Unknown scan order {order!r}.")
+
+    permutation = np.ascontiguousarray(permutation, dtype=dtype)
+    permutation.setflags(write=False)
+    return permutation
+
+
+def _reorder(image: ImageContent, order: QOIScanOrder) -> np.ndarray:
+    """Return the pixels of an image in scan order, shaped like the image."""
+    height, width, channels = image.shape
+    if order == QOIScanOrder.ROW_MAJOR:
+        return image
+    permutation = scan_permutation(order, height, width)
+    return image.reshape(-1, channels)[permutation].reshape(image.shape)
+
+
+def qoi_best_scan_order(
+    image: ImageContent,
+    candidates: Iterable[QOIScanOrder] = tuple(QOIScanOrder),
+    sample_size: int = 256,
+) -> QOIScanOrder:
+    """
+    Find the scan order with the smallest encoded size for an image.
+
+    The candidates are compared on a sample, a square from the center of the
+    image, which is much faster than encoding the whole image in every order.
+
+    Args:
+        image (ImageContent): The image, RGB or RGBA.
+        candidates (Iterable[QOIScanOrder]): The orders to try, all by default.
+        sample_size (int): The width and height of the sample.
+
+    Returns:
+        QOIScanOrder: The order with the smallest encoded sample. On a tie,
+            the first of the candidates.
+    """
+    if sample_size < 1:
+        raise ValueError("sample_size must be at least 1.")
+    height, width = image.shape[:2]
+    top = max(0, (height - sample_size) // 2)
+    left = max(0, (width - sample_size) // 2)
+    sample = image[top : top + sample_size, left : left + sample_size]
+
+    candidates = list(candidates)
+    sizes = [len(qoi_encode(_reorder(sample, order))) for order in candidates]
+    return candidates[sizes.index(min(sizes))]
+
+
+def qoi_encode_scan(
+    image: ImageContent,
+    order: QOIScanOrder | None = None,
+    colorspace: QOIColorspace = QOIColorspace.SRGB,
+) -> bytes:
+    """
+    Encode an image with its pixels in a different scan order.
+
+    The result is a `QOIScanHeader` followed by a standard QOI image of the
+    same size, decode it with `qoi_decode_scan`.
+
+    Args:
+        image (ImageContent): The image to encode, RGB or RGBA. The array will
+            never be mutated.
+        order (QOIScanOrder | None): The scan order. If None, the best order
+            is picked with `qoi_best_scan_order`.
+        colorspace (QOIColorspace): The colorspace stored in the header.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    if order is None:
+        order = qoi_best_scan_order(image)
+    header = QOIScanHeader(order=order).to_bytes()
+    return header + qoi_encode(_reorder(image, order), colorspace)
+
+
+def qoi_decode_scan(
+    data: Buffer, channels: QOIChannelCount | None = None
+) -> RGBImage | RGBAImage:
+    """
+    Decode an image encoded with `qoi_encode_scan`.
+
+    Args:
+        data: The bytes of the encoded image, or any other buffer.
+        channels: The number of channels to decode. If None, the channel count
+            of the image header is used.
+
+    Returns:
+        RGBImage | RGBAImage: The decoded image, with its pixels row by row.
+
+    Raises:
+        ValueError: If a header is invalid.
+    """
+    with _released(memoryview(data).cast("B")) as view:
+        scan_header = QOIScanHeader.from_bytes(view)
+        with _released(view[scan_header.size :]) as image:
+            scanned = qoi_decode(image, channels)
+
+    pixels = scanned.data
+    if scan_header.order != QOIScanOrder.ROW_MAJOR:
+        height, width, n_channels = pixels.shape
+        permutation = scan_permutation(scan_header.order, height, width)
+        pixels = np.empty_like(scanned.data)
+        pixels.reshape(-1, n_channels)[permutation] = scanned.data.reshape(
+            -1, n_channels
+        )
+
+    header = QOIHeader(
+        width=pixels.shape[1],
+        height=pixels.shape[0],
+        channels=QOIChannelCount(pixels.shape[2]),
+        colorspace=scanned.colorspace,
+    )
+    return _image(pixels, header)
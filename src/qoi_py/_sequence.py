@@ -0,0 +1,230 @@
+"""Sequence file format for storing many frames in a single file.
+
+The frames are complete QOI images written back to back, followed by a frame
+index, see `QOISequenceIndex`. Reading a frame takes one lookup in the index,
+and a memory-mapped file is only read where the frame is. Appending a frame
+writes the frame over the old index and a new index after it, the frames
+already in the file are never rewritten.
+"""
+
+import mmap
+import os
+from collections.abc import Buffer, Iterator
+from os import PathLike
+from types import TracebackType
+from typing import Self
+
+from .types import ImageContent, QOIChannelCount, QOIColorspace, RGBImage, RGBAImage
+from ._decode import _open_mapped, _released, qoi_decode
+from ._encode import qoi_encode
+from ._structure import QOIHeader, QOISequenceIndex
+
+
+class QOISequenceWriter:
+    """Appends frames to a sequence file, creating it if it does not exist.
+
+    Every append updates the index in the file, so the file is a valid
+    sequence after each one. An append which is interrupted half way leaves
+    the file without a valid index.
+
+    Example usage:
+    ```python
+    with QOISequenceWriter("capture.qois") as writer:
+        for frame in camera:
+            writer.append(frame)
+    ```
+    """
+
+    def __init__(self, path: str | PathLike[str]):
+        """Open or create a sequence file.
+
+        Args:
+            path: The path of the sequence file.
+
+        Raises:
+            ValueError: If the file exists, but is not a sequence file.
+        """
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        self._file = os.fdopen(fd, "r+b")
+        try:
+            size = self._file.seek(0, os.SEEK_END)
+            if size == 0:
+                self.index = QOISequenceIndex(offsets=(0,))
+                self._write_index()
+            else:
+                self.index = self._read_index(size)
+        except BaseException:
+            self._file.close()
+            raise
+
+    def _read_index(self, size: int) -> QOISequenceIndex:
+        """Read the index from the end of the file."""
+        self._file.seek(max(size - 8, 0))
+        footer = self._file.read(8)
+        frames = int.from_bytes(footer[:4], "big")
+        index_size = min(8 * (frames + 1) + 8, size)
+        self._file.seek(size - index_size)
+        index = QOISequenceIndex.from_bytes(self._file.read(index_size))
+        if index.offsets[-1] != size - index.size:
+            raise ValueError("Invalid QOI sequence index")
+        return index
+
+    def _write_index(self) -> None:
+        self._file.seek(self.index.offsets[-1])
+        self._file.write(self.index.to_bytes())
+        self._file.truncate()
+
+    def append(
+        self, image: ImageContent, colorspace: QOIColorspace = QOIColorspace.SRGB
+    ) -> int:
+        """
+        Encode an image and append it as a frame.
+
+        Args:
+            image (ImageContent): The image to encode, RGB or RGBA. Frames do
+                not have to share their size or channel count.
+            colorspace (QOIColorspace): The colorspace stored in the header.
+
+        Returns:
+            int: The number of the frame.
+        """
+        return self.append_encoded(qoi_encode(image, colorspace))
+
+    def append_encoded(self, data: Buffer) -> int:
+        """
+        Append an encoded QOI image as a frame, without decoding it.
+
+        Args:
+            data: The bytes of the complete QOI image, or any other buffer.
+
+        Returns:
+            int: The number of the frame.
+
+        Raises:
+            ValueError: If the data does not start with a valid QOI header.
+        """
+        QOIHeader.from_bytes(data)
+        start = self.index.offsets[-1]
+        self._file.seek(start)
+        size = self._file.write(data)
+        self.index = QOISequenceIndex(offsets=(*self.index.offsets, start + size))
+        self._write_index()
+        return self.index.frames - 1
+
+    def flush(self) -> None:
+        """Flush the written frames to the operating system."""
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the file."""
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self.index.frames
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class QOISequenceReader:
+    """Random access to the frames of a sequence file.
+
+    Only the index is parsed up front. Opened from a path, the file is
+    memory-mapped and only the frames which are decoded are read from disk.
+
+    Example usage:
+    ```python
+    with QOISequenceReader.open("capture.qois") as sequence:
+        last = sequence.decode(len(sequence) - 1)
+    ```
+    """
+
+    def __init__(self, data: Buffer):
+        """Parse the index of a sequence.
+
+        Args:
+            data: The bytes of the sequence, or any other buffer like an mmap.
+                It is referenced, not copied, and must not change.
+
+        Raises:
+            ValueError: If the index is invalid or the data is truncated.
+        """
+        self._data = memoryview(data).cast("B")
+        self._mapped: mmap.mmap | None = None
+        self.index = QOISequenceIndex.from_bytes(self._data)
+        if self.index.offsets[-1] != len(self._data) - self.index.size:
+            self._data.release()
+            raise ValueError("Invalid QOI sequence index")
+
+    @classmethod
+    def open(cls, path: str | PathLike[str]) -> Self:
+        """Memory-map a sequence file. Close it with `close`."""
+        sequence, mapped = _open_mapped(
+            path, cls, min_size=1, message="Invalid QOI sequence index"
+        )
+        sequence._mapped = mapped
+        return sequence
+
+    def frame(self, number: int) -> memoryview:
+        """Return a frame as a complete QOI image, without decoding it."""
+        if not 0 <= number < self.index.frames:
+            raise IndexError(f"There is no frame {number}.")
+        return self._data[self.index.offsets[number] : self.index.offsets[number + 1]]
+
+    def decode(
+        self,
+        number: int,
+        channels: QOIChannelCount | None = None,
+        out: Buffer | None = None,
+    ) -> RGBImage | RGBAImage:
+        """
+        Decode a frame, see `qoi_decode`.
+
+        Args:
+            number: The number of the frame.
+            channels: The number of channels to decode. If None, the channel
+                count of the frame header is used.
+            out: A preallocated buffer to decode into, see `qoi_decode`.
+
+        Returns:
+            RGBImage | RGBAImage: The decoded frame.
+
+        Raises:
+            IndexError: If there is no frame with that number.
+        """
+        with _released(self.frame(number)) as frame:
+            return qoi_decode(frame, channels, out)
+
+    def close(self) -> None:
+        """Release the data, and unmap the file if it was opened from a path."""
+        self._data.release()
+        if self._mapped is not None:
+            self._mapped.close()
+            self._mapped = None
+
+    def __len__(self) -> int:
+        return self.index.frames
+
+    def __iter__(self) -> Iterator[RGBImage | RGBAImage]:
+        """Decode all frames in order."""
+        for number in range(self.index.frames):
+            yield self.decode(number)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
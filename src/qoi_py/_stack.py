@@ -0,0 +1,125 @@
+"""Encoding and decoding stacks of same-sized frames, like animations.
+
+A stack is a single (frames, height, width, channels) array. Every frame is a
+separate QOI image, so the frames are encoded and decoded on a thread pool,
+which runs them in parallel with the numba backend. Decoding writes every
+frame straight into its slice of one preallocated array, so no per-frame
+arrays are concatenated afterwards.
+"""
+
+from collections.abc import Buffer, Sequence
+
+import numpy as np
+
+from .types import QOIChannelCount, QOIColorspace
+from ._decode import qoi_decode
+from ._encode import qoi_encode
+from ._parallel import parallel_map
+from ._structure import QOIHeader
+
+
+def qoi_encode_stack(
+    frames: np.ndarray,
+    colorspace: QOIColorspace = QOIColorspace.SRGB,
+    workers: int | None = None,
+) -> list[bytes]:
+    """
+    Encode every frame of a stack to a QOI image.
+
+    Args:
+        frames (np.ndarray): The (frames, height, width, channels) uint8 array,
+            with 3 or 4 channels. The array will never be mutated.
+        colorspace (QOIColorspace): The colorspace stored in the headers.
+        workers (int | None): The number of threads encoding frames. If None,
+            one per CPU. Only the numba backend encodes on several cores.
+
+    Returns:
+        list[bytes]: The encoded frames, in order.
+
+    Raises:
+        ValueError: If `frames` is not a stack of RGB or RGBA frames, or
+            `workers` is less than 1.
+    """
+    if frames.ndim != 4 or frames.shape[3] not in (3, 4):
+        raise ValueError(
+            "frames must have the shape (frames, height, width, channels) with "
+            f"3 or 4 channels, got {frames.shape}."
+        )
+    if frames.dtype != np.uint8:
+        raise ValueError(f"frames must be a uint8 array, got {frames.dtype}.")
+
+    return parallel_map(
+        lambda frame: qoi_encode(frame, colorspace), list(frames), workers
+    )
+
+
+def _output_stack(
+    out: np.ndarray | None, shape: tuple[int, int, int, int]
+) -> np.ndarray:
+    """Return the stack to decode into.
+
+    Raises:
+        ValueError: If `out` does not fit the frames.
+    """
+    if out is None:
+        return np.empty(shape, dtype=np.uint8)
+    if out.dtype != np.uint8 or out.shape != shape:
+        raise ValueError(
+            f"out must be a uint8 array of shape {shape}, got a {out.dtype} "
+            f"array of shape {out.shape}."
+        )
+    if not out.flags.c_contiguous or not out.flags.writeable:
+        raise ValueError("out must be a writable C-contiguous array.")
+    return out
+
+
+def qoi_decode_stack(
+    frames: Sequence[Buffer],
+    channels: QOIChannelCount | None = None,
+    out: np.ndarray | None = None,
+    workers: int | None = None,
+) -> np.ndarray:
+    """
+    Decode same-sized QOI images into one contiguous stack.
+
+    The headers are read first to allocate the stack once, every frame is then
+    decoded into its slice of it.
+
+    Args:
+        frames: The encoded frames, as bytes or any other buffers.
+        channels: The number of channels to decode. If None, the channel count
+            of the header of the first frame is used.
+        out: A preallocated C-contiguous uint8 array of shape (frames, height,
+            width, channels) to decode into. It can be reused across calls,
+            and is returned.
+        workers: The number of threads decoding frames. If None, one per CPU.
+            Only the numba backend decodes on several cores.
+
+    Returns:
+        np.ndarray: The (frames, height, width, channels) uint8 array.
+
+    Raises:
+        ValueError: If there are no frames, the frames differ in size, a
+            header is invalid or `out` does not fit the frames.
+    """
+    if len(frames) == 0:
+        raise ValueError("frames must contain at least one frame.")
+
+    headers = [QOIHeader.from_bytes(frame) for frame in frames]
+    first = headers[0]
+    for number, header in enumerate(headers):
+        if (header.width, header.height) != (first.width, first.height):
+            raise ValueError(
+                f"Frame {number} is {header.width}x{header.height}, but frame 0 "
+                f"is {first.width}x{first.height}."
+            )
+    if channels is None:
+        channels = first.channels
+
+    stack = _output_stack(out, (len(frames), first.height, first.width, channels.value))
+
+    def decode_frame(number: int) -> None:
+        qoi_decode(frames[number], channels, out=stack[number])
+
+    parallel_map(decode_frame, list(range(len(frames))), workers)
+    return stack
@@ -0,0 +1,150 @@
+"""Opcode statistics and phase timings of the codec.
+
+Collecting statistics is opt-in: `qoi_encode` and `qoi_decode` only fill a
+`QOIStats` passed as `stats`, otherwise they do no additional work at all.
+The opcode statistics of encoding are derived from the encoded stream after
+the fact, decoding counts the opcodes while decoding them. Either way, they
+are the same for every backend.
+"""
+
+import time
+from collections.abc import Buffer, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import numpy as np
+
+from ._opcodes import QOIOpcode, OPCODE_OF_BYTE, PIXELS_OF_BYTE, SIZE_OF_BYTE
+
+
+def _opcode_dict() -> dict[str, int]:
+    return {opcode.name: 0 for opcode in QOIOpcode}
+
+
+@dataclass
+class QOIStats:
+    """Statistics of one or more encoded or decoded images.
+
+    Pass the same instance to several calls to accumulate their statistics.
+
+    Example usage:
+    ```python
+    stats = QOIStats()
+    qoi_encode(image, stats=stats)
+    print(stats.opcode_counts["RGBA"], stats.index_hit_rate)
+    metrics.update(stats.as_dict())
+    ```
+    """
+
+    images: int = 0
+    """The number of images."""
+    pixels: int = 0
+    """The number of pixels of all images."""
+    encoded_bytes: int = 0
+    """The size of all encoded images, including header and end marker."""
+    opcode_counts: dict[str, int] = field(default_factory=_opcode_dict)
+    """The number of opcodes emitted or consumed, by `QOIOpcode` name."""
+    opcode_bytes: dict[str, int] = field(default_factory=_opcode_dict)
+    """The number of bytes taken by the opcodes, by `QOIOpcode` name."""
+    run_lengths: dict[int, int] = field(default_factory=dict)
+    """The number of RUN opcodes by the run length they encode, 1 to 62."""
+    timings: dict[str, float] = field(default_factory=dict)
+    """The time spent in each phase in seconds."""
+
+    @property
+    def index_lookups(self) -> int:
+        """The number of running index lookups, one per pixel outside a run."""
+        return sum(self.opcode_counts.values()) - self.opcode_counts["RUN"]
+
+    @property
+    def index_hit_rate(self) -> float:
+        """The fraction of index lookups which were encoded as INDEX opcode."""
+        lookups = self.index_lookups
+        return self.opcode_counts["INDEX"] / lookups if lookups else 0.0
+
+    @property
+    def bits_per_pixel(self) -> float:
+        """The encoded size per pixel in bits."""
+        return 8 * self.encoded_bytes / self.pixels if self.pixels else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics and derived values as a plain dict."""
+        return {
+            **asdict(self),
+            "index_lookups": self.index_lookups,
+            "index_hit_rate": self.index_hit_rate,
+            "bits_per_pixel": self.bits_per_pixel,
+        }
+
+    @contextmanager
+    def time(self, phase: str) -> Iterator[None]:
+        """Add the time spent in the block to a phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[phase] = self.timings.get(phase, 0.0) + elapsed
+
+    def add_stream(self, data: Buffer, n_pixels: int) -> None:
+        """Add the opcodes of a complete encoded image.
+
+        Like the decoder, opcodes after the pixel count of the header and the
+        end marker are ignored.
+
+        Args:
+            data: The complete encoded image, including the header.
+            n_pixels: The pixel count of the header.
+        """
+        with self.time("analysis"):
+            data = memoryview(data).cast("B")
+            size = len(data)
+            offsets = _opcode_offsets(data, 14, len(data) - 8, n_pixels)
+            first_bytes = np.frombuffer(data, dtype=np.uint8)[offsets]
+            data.release()
+            opcode_counts = np.bincount(first_bytes, minlength=256)
+
+        self.add_opcode_counts(opcode_counts, n_pixels, size)
+
+    def add_opcode_counts(
+        self, opcode_counts: np.ndarray, n_pixels: int, encoded_bytes: int
+    ) -> None:
+        """Add the opcodes of an image, as counted by the decoder.
+
+        Args:
+            opcode_counts: The (256,) array of the number of opcodes by their
+                first byte.
+            n_pixels: The pixel count of the header.
+            encoded_bytes: The size of the encoded image, including header
+                and end marker.
+        """
+        with self.time("analysis"):
+            for byte, count in enumerate(opcode_counts.tolist()):
+                if not count:
+                    continue
+                opcode = OPCODE_OF_BYTE[byte]
+                self.opcode_counts[opcode.name] += count
+                self.opcode_bytes[opcode.name] += count * SIZE_OF_BYTE[byte]
+                if opcode is QOIOpcode.RUN:
+                    run_length = PIXELS_OF_BYTE[byte]
+                    previous = self.run_lengths.get(run_length, 0)
+                    self.run_lengths[run_length] = previous + count
+
+        self.images += 1
+        self.pixels += n_pixels
+        self.encoded_bytes += encoded_bytes
+
+
+def _opcode_offsets(data: memoryview, start: int, end: int, n_pixels: int) -> list[int]:
+    """Return the offsets of the opcodes which decode the first n_pixels."""
+    size_of_byte = SIZE_OF_BYTE
+    pixels_of_byte = PIXELS_OF_BYTE
+    offsets: list[int] = []
+    pointer = start
+    while pointer < end and n_pixels > 0:
+        offsets.append(pointer)
+        byte1 = data[pointer]
+        n_pixels -= pixels_of_byte[byte1]
+        pointer += size_of_byte[byte1]
+    return offsets
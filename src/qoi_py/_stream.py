@@ -0,0 +1,254 @@
+"""Streaming access to QOI images.
+
+The classes in this module never hold the complete image in memory, but only
+a chunk of encoded data and a band of rows at a time.
+"""
+
+from collections.abc import Callable, Iterator
+from types import TracebackType
+from typing import BinaryIO, Protocol, Self
+
+import numpy as np
+
+from .types import ImageContent, QOIChannelCount, QOIColorspace
+from ._structure import QOIHeader, END_MARKER
+from ._vectorized import (
+    DecoderState,
+    EncoderState,
+    decode_opcodes,
+    encode_opcodes,
+    run_opcodes,
+)
+
+
+class Writable(Protocol):
+    """Anything with a `write` method accepting bytes, like a binary file."""
+
+    def write(self, data: bytes, /) -> object: ...
+
+
+class Sendable(Protocol):
+    """Anything with a `sendall` method accepting bytes, like a socket."""
+
+    def sendall(self, data: bytes, /) -> object: ...
+
+
+Sink = bytearray | Writable | Sendable
+"""Where a `QOIStreamEncoder` writes the encoded bytes to."""
+
+
+def _sink_writer(sink: Sink) -> Callable[[bytes], object]:
+    """Return the function which writes bytes to a sink."""
+    if isinstance(sink, bytearray):
+        return sink.extend
+    if hasattr(sink, "write"):
+        return sink.write
+    if hasattr(sink, "sendall"):
+        return sink.sendall
+    raise TypeError(f"Cannot write to {type(sink).__name__!r}, it is not a sink.")
+
+
+class QOIStreamDecoder:
+    """Decode a QOI image from a binary file-like object, band by band.
+
+    The encoded data is read in chunks of `chunk_size` bytes, and the decoded
+    pixels are yielded as soon as a band of `rows_per_band` rows is complete.
+    The running index and the previous pixel are carried across chunks, so
+    memory use is bounded by the chunk and band size instead of the image.
+
+    Example usage:
+    ```python
+    with open("map.qoi", "rb") as f:
+        decoder = QOIStreamDecoder(f, rows_per_band=64)
+        for band in decoder:
+            ...  # (rows, width, channels) uint8 array
+    ```
+    """
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        channels: QOIChannelCount | None = None,
+        rows_per_band: int = 1,
+        chunk_size: int = 1 << 16,
+    ):
+        """Read the header from the file.
+
+        Args:
+            file: The binary file-like object to read from. Reading starts at
+                its current position.
+            channels: The number of channels to decode. If None, the channel
+                count of the image header is used.
+            rows_per_band: The number of rows in every yielded band. The last
+                band may contain fewer rows.
+            chunk_size: The number of bytes to read from the file at once.
+        """
+        if rows_per_band < 1:
+            raise ValueError("rows_per_band must be at least 1.")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1.")
+
+        self.header = QOIHeader.from_bytes(file.read(14))
+        self.channels = (
+            QOIChannelCount(channels) if channels is not None else self.header.channels
+        )
+        self.rows_per_band = rows_per_band
+        self.chunk_size = chunk_size
+        self._file = file
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        """Yield the decoded image as (rows, width, channels) arrays."""
+        width, channels = self.header.width, self.channels.value
+        band_pixels = self.rows_per_band * width
+        remaining = self.header.height * width
+        if remaining == 0:
+            return
+
+        state = DecoderState()
+        buffer = bytearray()
+        pending = np.empty((0, channels), dtype=np.uint8)
+        end_of_file = False
+
+        while remaining > 0:
+            chunk = self._file.read(self.chunk_size)
+            end_of_file = not chunk
+            buffer.extend(chunk)
+
+            # Only opcodes which are known to be complete are decoded, which
+            # are all opcodes before the last 8 bytes. At the end of the file
+            # these are the end marker. The view is released before the
+            # consumed prefix is trimmed, which resizes the buffer.
+            with memoryview(buffer) as view:
+                decoded, consumed = decode_opcodes(
+                    view,
+                    0,
+                    len(buffer) - len(END_MARKER),
+                    self.channels,
+                    remaining,
+                    state,
+                )
+            del buffer[:consumed]
+            remaining -= len(decoded)
+
+            if end_of_file and remaining > 0:
+                # Like `qoi_decode`, repeat the last pixel if the data ends early
+                padding = np.empty((remaining, channels), dtype=np.uint8)
+                padding[:] = state.pixel[:channels]
+                decoded = np.concatenate([decoded, padding])
+                remaining = 0
+
+            pending = np.concatenate([pending, decoded])
+            while len(pending) >= band_pixels or (remaining == 0 and len(pending)):
+                band, pending = pending[:band_pixels], pending[band_pixels:]
+                yield band.reshape(-1, width, channels)
+
+
+class QOIStreamEncoder:
+    """Encode a QOI image band by band, as the rows are produced.
+
+    The header is written immediately, and the opcodes of every band as soon
+    as it is passed to `write_rows`. The running index, the previous pixel and
+    a pending run are carried between bands, so the output is identical to
+    `qoi_encode` on the complete image while only one band is held in memory.
+
+    Example usage:
+    ```python
+    with open("render.qoi", "wb") as f:
+        with QOIStreamEncoder(f, width=1920, height=1080) as encoder:
+            for band in render_bands():
+                encoder.write_rows(band)  # (rows, 1920, 4) uint8 array
+    ```
+    """
+
+    def __init__(
+        self,
+        sink: Sink,
+        width: int,
+        height: int,
+        channels: QOIChannelCount = QOIChannelCount.RGBA,
+        colorspace: QOIColorspace = QOIColorspace.SRGB,
+    ):
+        """Write the header to the sink.
+
+        Args:
+            sink: Where the encoded bytes are written to: a bytearray, a binary
+                file-like object or a socket.
+            width: The width of the image.
+            height: The height of the image.
+            channels: The channel count of the image.
+            colorspace: The colorspace stored in the header.
+        """
+        self.header = QOIHeader(
+            width=width,
+            height=height,
+            channels=QOIChannelCount(channels),
+            colorspace=QOIColorspace(colorspace),
+        )
+        self.rows_written = 0
+        self.closed = False
+        self._write = _sink_writer(sink)
+        self._state = EncoderState()
+
+        self._write(self.header.to_bytes())
+
+    def write_rows(self, rows: ImageContent) -> None:
+        """Encode the next band of rows.
+
+        Args:
+            rows: The (rows, width, channels) uint8 array to encode. The array
+                will never be mutated.
+
+        Raises:
+            ValueError: If the encoder is closed, the band has the wrong shape
+                or more rows than the image height are written.
+        """
+        if self.closed:
+            raise ValueError("Cannot write rows to a closed encoder.")
+
+        expected_shape = (self.header.width, self.header.channels.value)
+        if rows.ndim != 3 or rows.shape[1:] != expected_shape:
+            raise ValueError(
+                f"Rows must have the shape (rows, {expected_shape[0]}, "
+                f"{expected_shape[1]}), got {rows.shape}."
+            )
+        if self.rows_written + rows.shape[0] > self.header.height:
+            raise ValueError(
+                f"Cannot write {rows.shape[0]} more rows, only "
+                f"{self.header.height - self.rows_written} rows are left."
+            )
+
+        flat_pixels = rows.reshape(-1, self.header.channels.value)
+        self._write(encode_opcodes(flat_pixels, self.header.channels, self._state))
+        self.rows_written += rows.shape[0]
+
+    def close(self) -> None:
+        """Flush the pending run and write the end marker.
+
+        The sink itself is not closed. Closing twice has no effect.
+
+        Raises:
+            ValueError: If fewer rows than the image height were written.
+        """
+        if self.closed:
+            return
+        if self.rows_written != self.header.height:
+            raise ValueError(
+                f"Only {self.rows_written} of {self.header.height} rows were written."
+            )
+
+        self._write(run_opcodes(self._state.run_length) + END_MARKER)
+        self._state.run_length = 0
+        self.closed = True
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        # Do not hide the original error behind an incomplete image
+        if exc_type is None:
+            self.close()
@@ -2,12 +2,16 @@
 
 It provides the `QOIHeader` dataclass, which represents the header of a QOI
 image file, and the END_MARKER constant, which is used to indicate the end of a
-QOI image file.
+QOI image file. The `QOITiledHeader` dataclass represents the header of the
+tiled container format, see `qoi_py._tiled`, the `QOISequenceIndex` the
+frame index of the sequence format, see `qoi_py._sequence`, and the
+`QOIScanHeader` the header of reordered images, see `qoi_py._scan`.
 """
 
+from collections.abc import Buffer
 from dataclasses import dataclass
 
-from .types import QOIColorspace, QOIChannelCount
+from .types import QOIColorspace, QOIChannelCount, QOIScanOrder
 
 
 @dataclass(frozen=True)
@@ -35,15 +39,19 @@ class QOIHeader:
     colorspace: QOIColorspace
 
     @classmethod
-    def from_bytes(cls, data: bytes):
+    def from_bytes(cls, data: Buffer):
         """Create a QOIHeader from bytes and verify it's contents.
 
+        Any object supporting the buffer protocol is accepted. Only its first
+        14 bytes are read, further data is ignored.
+
         Example usage:
         ```python
         header_bytes = b"qoif\x00\x00\x00\x64\x00\x00\x00\x64\x04\x01"
         header = QOIHeader.from_bytes(header_bytes)
         ```
         """
+        data = bytes(memoryview(data).cast("B")[:14])
         if len(data) < 14 or data[:4] != b"qoif":
             raise ValueError("Invalid QOI header")
         width = int.from_bytes(data[4:8], "big")
@@ -68,3 +76,194 @@ class QOIHeader:
 
 
 END_MARKER = b"\x00" * 7 + b"\x01"
+
+
+@dataclass(frozen=True)
+class QOITiledHeader:
+    """A dataclass representing the header of a tiled QOI container.
+
+    The image is split into a grid of tiles, which are stored row by row as
+    complete, independent QOI images. The header locates every tile:
+
+    ```cpp
+    qoi_tiled_header {
+        char       magic[4];          // magic bytes "qoit"
+        qoi_header image;             // header of the complete image
+        uint32_t   tile_width;        // tile width in pixels (BE)
+        uint32_t   tile_height;       // tile height in pixels (BE)
+        uint64_t   offsets[tiles+1];  // start of every tile in the file and
+                                      // end of the last one (BE)
+    };
+    ```
+
+    Tiles in the last column and row are cropped to the image.
+    """
+
+    image: QOIHeader
+    tile_width: int
+    tile_height: int
+    offsets: tuple[int, ...]
+
+    @property
+    def columns(self) -> int:
+        """Number of tiles per row."""
+        return -(-self.image.width // self.tile_width)
+
+    @property
+    def rows(self) -> int:
+        """Number of tiles per column."""
+        return -(-self.image.height // self.tile_height)
+
+    @property
+    def size(self) -> int:
+        """Size of the header in bytes."""
+        return 4 + 14 + 8 + 8 * len(self.offsets)
+
+    @classmethod
+    def from_bytes(cls, data: Buffer):
+        """Create a QOITiledHeader from bytes and verify it's contents.
+
+        Any object supporting the buffer protocol is accepted. Only the header
+        is read, further data is ignored.
+        """
+        data = memoryview(data).cast("B")
+        prefix = bytes(data[:26])
+        if len(prefix) < 26 or prefix[:4] != b"qoit":
+            raise ValueError("Invalid tiled QOI header")
+        image = QOIHeader.from_bytes(prefix[4:18])
+        tile_width = int.from_bytes(prefix[18:22], "big")
+        tile_height = int.from_bytes(prefix[22:26], "big")
+        if tile_width < 1 or tile_height < 1:
+            raise ValueError("Invalid tiled QOI header")
+
+        columns = -(-image.width // tile_width)
+        rows = -(-image.height // tile_height)
+        table = bytes(data[26 : 26 + 8 * (columns * rows + 1)])
+        if len(table) != 8 * (columns * rows + 1):
+            raise ValueError("Invalid tiled QOI header")
+        offsets = tuple(
+            int.from_bytes(table[i : i + 8], "big") for i in range(0, len(table), 8)
+        )
+        # The tiles follow the header back to back and must not overlap
+        if offsets[0] < 26 + len(table) or any(
+            start > end for start, end in zip(offsets, offsets[1:])
+        ):
+            raise ValueError("Invalid tiled QOI header")
+        return cls(
+            image=image,
+            tile_width=tile_width,
+            tile_height=tile_height,
+            offsets=offsets,
+        )
+
+    def to_bytes(self) -> bytes:
+        """Convert the QOITiledHeader to bytes."""
+        magic = b"qoit"
+        image = self.image.to_bytes()
+        tile_width = self.tile_width.to_bytes(4, "big")
+        tile_height = self.tile_height.to_bytes(4, "big")
+        offsets = b"".join(offset.to_bytes(8, "big") for offset in self.offsets)
+        return magic + image + tile_width + tile_height + offsets
+
+
+@dataclass(frozen=True)
+class QOISequenceIndex:
+    """A dataclass representing the frame index of a QOI sequence file.
+
+    The frames of a sequence are complete QOI images stored back to back, so
+    the file starts with the first frame. The index trails the frames, which
+    lets frames be appended by rewriting the index alone:
+
+    ```cpp
+    qoi_sequence_index {
+        uint64_t offsets[frames+1];  // start of every frame in the file and
+                                     // end of the last one (BE)
+        uint32_t frames;             // number of frames (BE)
+        char     magic[4];           // magic bytes "qoiq"
+    };
+    ```
+    """
+
+    offsets: tuple[int, ...]
+
+    @property
+    def frames(self) -> int:
+        """Number of frames."""
+        return len(self.offsets) - 1
+
+    @property
+    def size(self) -> int:
+        """Size of the index in bytes."""
+        return 8 * len(self.offsets) + 8
+
+    @classmethod
+    def from_bytes(cls, data: Buffer):
+        """Create a QOISequenceIndex from bytes and verify it's contents.
+
+        Any object supporting the buffer protocol is accepted. The index is
+        read from the end of the data, anything before it is ignored.
+        """
+        data = memoryview(data).cast("B")
+        footer = bytes(data[-8:])
+        if len(footer) < 8 or footer[4:] != b"qoiq":
+            raise ValueError("Invalid QOI sequence index")
+        frames = int.from_bytes(footer[:4], "big")
+        size = 8 * (frames + 1) + 8
+        if len(data) < size:
+            raise ValueError("Invalid QOI sequence index")
+
+        table = bytes(data[len(data) - size : len(data) - 8])
+        offsets = tuple(
+            int.from_bytes(table[i : i + 8], "big") for i in range(0, len(table), 8)
+        )
+        if any(start > end for start, end in zip(offsets, offsets[1:])):
+            raise ValueError("Invalid QOI sequence index")
+        return cls(offsets=offsets)
+
+    def to_bytes(self) -> bytes:
+        """Convert the QOISequenceIndex to bytes."""
+        offsets = b"".join(offset.to_bytes(8, "big") for offset in self.offsets)
+        return offsets + self.frames.to_bytes(4, "big") + b"qoiq"
+
+
+@dataclass(frozen=True)
+class QOIScanHeader:
+    """A dataclass representing the header of a reordered QOI image.
+
+    The header is followed by a complete QOI image, whose pixels are stored
+    in the scan order instead of row by row:
+
+    ```cpp
+    qoi_scan_header {
+        char    magic[4];  // magic bytes "qoio"
+        uint8_t order;     // the QOIScanOrder
+    };
+    ```
+    """
+
+    order: QOIScanOrder
+
+    @property
+    def size(self) -> int:
+        """Size of the header in bytes."""
+        return 5
+
+    @classmethod
+    def from_bytes(cls, data: Buffer):
+        """Create a QOIScanHeader from bytes and verify it's contents.
+
+        Any object supporting the buffer protocol is accepted. Only the header
+        is read, further data is ignored.
+        """
+        prefix = bytes(memoryview(data).cast("B")[:5])
+        if len(prefix) < 5 or prefix[:4] != b"qoio":
+            raise ValueError("Invalid reordered QOI header")
+        try:
+            order = QOIScanOrder(prefix[4])
+        except ValueError:
+            raise ValueError(f"Unknown scan order {prefix[4]}") from None
+        return cls(order=order)
+
+    def to_bytes(self) -> bytes:
+        """Convert the QOIScanHeader to bytes."""
+        return b"qoio" + bytes([self.order])
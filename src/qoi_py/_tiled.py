@@ -0,0 +1,288 @@
+"""Tiled container format for parallel and random-access decoding.
+
+A plain QOI stream has to be decoded in order, because every opcode depends on
+the running index and the previous pixel. The tiled container splits the image
+into a grid of tiles which are encoded as independent QOI images, see
+`QOITiledHeader`. With the numba backend, the tiles are encoded and decoded
+on all cores. With any backend, a region of the image can be decoded from the
+tiles it overlaps alone. Tiles as wide as the image are row strips.
+"""
+
+import mmap
+from collections.abc import Buffer, Iterable
+from os import PathLike
+from types import TracebackType
+from typing import Self, assert_never
+
+import numpy as np
+
+from .types import (
+    ImageContent,
+    QOIChannelCount,
+    QOIColorspace,
+    RGBImage,
+    RGBAImage,
+)
+from ._decode import _open_mapped, _released, qoi_decode
+from ._encode import qoi_encode
+from ._parallel import parallel_map
+from ._structure import QOIHeader, QOITiledHeader
+
+
+def _tile_boxes(
+    header: QOITiledHeader, columns: Iterable[int], rows: Iterable[int]
+) -> list[tuple[int, int, int, int, int]]:
+    """Return (tile, x, y, width, height) of the tiles in the given rows and columns."""
+    boxes = []
+    for row in rows:
+        y = row * header.tile_height
+        height = min(header.tile_height, header.image.height - y)
+        for column in columns:
+            x = column * header.tile_width
+            width = min(header.tile_width, header.image.width - x)
+            boxes.append((row * header.columns + column, x, y, width, height))
+    return boxes
+
+
+def qoi_encode_tiled(
+    image: ImageContent,
+    tile_width: int = 256,
+    tile_height: int = 256,
+    colorspace: QOIColorspace = QOIColorspace.SRGB,
+    workers: int | None = None,
+) -> bytes:
+    """
+    Encode an image to the tiled QOI container format.
+
+    Args:
+        image (ImageContent): The image to encode, which can be either RGB or
+            RGBA. The array will never be mutated.
+        tile_width (int): The width of the tiles. Use the image width to split
+            it into row strips.
+        tile_height (int): The height of the tiles.
+        colorspace (QOIColorspace): The colorspace stored in the headers.
+        workers (int | None): The number of threads encoding tiles. If None,
+            one per CPU. Only the numba backend encodes on several cores.
+
+    Returns:
+        bytes: The encoded tiled container.
+
+    Raises:
+        ValueError: If the tile size or `workers` is less than 1.
+    """
+    if tile_width < 1 or tile_height < 1:
+        raise ValueError("The tile size must be at least 1x1.")
+
+    height, width, channels = image.shape
+    header = QOITiledHeader(
+        image=QOIHeader(
+            width=width,
+            height=height,
+            channels=QOIChannelCount(channels),
+            colorspace=colorspace,
+        ),
+        tile_width=tile_width,
+        tile_height=tile_height,
+        offsets=(),
+    )
+    boxes = _tile_boxes(header, range(header.columns), range(header.rows))
+
+    def encode_tile(box: tuple[int, int, int, int, int]) -> bytes:
+        _, x, y, width, height = box
+        return qoi_encode(image[y : y + height, x : x + width], colorspace)
+
+    tiles = parallel_map(encode_tile, boxes, workers)
+
+    # The offsets are absolute, so the header size has to be known first
+    offsets = [4 + 14 + 8 + 8 * (len(tiles) + 1)]
+    for tile in tiles:
+        offsets.append(offsets[-1] + len(tile))
+    header = QOITiledHeader(
+        image=header.image,
+        tile_width=tile_width,
+        tile_height=tile_height,
+        offsets=tuple(offsets),
+    )
+    return header.to_bytes() + b"".join(tiles)
+
+
+class QOITiledImage:
+    """Random access to an image in the tiled QOI container format.
+
+    Only the header is parsed up front. Tiles are decoded on demand, so
+    decoding a region only touches the tiles overlapping it. Opened from a
+    path, the file is memory-mapped and only those tiles are read from disk.
+
+    Example usage:
+    ```python
+    with QOITiledImage.open("map.qoit") as tiled:
+        region = tiled.decode_region(x=1024, y=512, width=256, height=256)
+    ```
+    """
+
+    def __init__(self, data: Buffer):
+        """Parse the header of a tiled container.
+
+        Args:
+            data: The bytes of the container, or any other buffer like an mmap.
+                It is referenced, not copied, and must not change.
+
+        Raises:
+            ValueError: If the header is invalid or the data is truncated.
+        """
+        self._data = memoryview(data).cast("B")
+        self._mapped: mmap.mmap | None = None
+        self.header = QOITiledHeader.from_bytes(self._data)
+        if self.header.offsets[-1] > len(self._data):
+            raise ValueError("The tiled QOI data is truncated.")
+
+    @classmethod
+    def open(cls, path: str | PathLike[str]) -> Self:
+        """Memory-map a tiled container file. Close it with `close`."""
+        tiled, mapped = _open_mapped(
+            path, cls, min_size=1, message="Invalid tiled QOI header"
+        )
+        tiled._mapped = mapped
+        return tiled
+
+    @property
+    def width(self) -> int:
+        """Width of the image."""
+        return self.header.image.width
+
+    @property
+    def height(self) -> int:
+        """Height of the image."""
+        return self.header.image.height
+
+    def tile(self, column: int, row: int) -> memoryview:
+        """Return a tile as a complete QOI image, without decoding it."""
+        if not (0 <= column < self.header.columns and 0 <= row < self.header.rows):
+            raise IndexError(f"There is no tile at column {column}, row {row}.")
+        index = row * self.header.columns + column
+        return self._data[self.header.offsets[index] : self.header.offsets[index + 1]]
+
+    def decode(
+        self, channels: QOIChannelCount | None = None, workers: int | None = None
+    ) -> RGBImage | RGBAImage:
+        """Decode the complete image, see `decode_region`."""
+        return self.decode_region(0, 0, self.width, self.height, channels, workers)
+
+    def decode_region(
+        self,
+        x: int,
+        y: int,
+        width: int,
+        height: int,
+        channels: QOIChannelCount | None = None,
+        workers: int | None = None,
+    ) -> RGBImage | RGBAImage:
+        """
+        Decode a rectangular region of the image from the tiles it overlaps.
+
+        Args:
+            x: The left edge of the region.
+            y: The top edge of the region.
+            width: The width of the region.
+            height: The height of the region.
+            channels: The number of channels to decode. If None, the channel
+                count of the image header is used.
+            workers: The number of threads decoding tiles. If None, one per
+                CPU. Only the numba backend decodes on several cores.
+
+        Returns:
+            RGBImage | RGBAImage: The region as an RGB or RGBA image.
+
+        Raises:
+            ValueError: If the region is not within the image, or a tile is
+                invalid.
+        """
+        if (
+            min(x, y, width, height) < 0
+            or x + width > self.width
+            or y + height > self.height
+        ):
+            raise ValueError(
+                f"The region ({x}, {y}, {width}, {height}) is not within the "
+                f"{self.width}x{self.height} image."
+            )
+        if channels is None:
+            channels = self.header.image.channels
+
+        region = np.empty((height, width, channels.value), dtype=np.uint8)
+        if width > 0 and height > 0:
+            tile_width, tile_height = self.header.tile_width, self.header.tile_height
+            columns = range(x // tile_width, (x + width - 1) // tile_width + 1)
+            rows = range(y // tile_height, (y + height - 1) // tile_height + 1)
+
+            def decode_tile(box: tuple[int, int, int, int, int]) -> None:
+                index, tile_x, tile_y, tile_width, tile_height = box
+                start, end = self.header.offsets[index : index + 2]
+                with _released(self._data[start:end]) as tile:
+                    tile_header = QOIHeader.from_bytes(tile)
+                    if (tile_header.width, tile_header.height) != (
+                        tile_width,
+                        tile_height,
+                    ):
+                        raise ValueError(
+                            f"Tile {index} is {tile_header.width}x"
+                            f"{tile_header.height}, expected {tile_width}x"
+                            f"{tile_height}."
+                        )
+                    pixels = qoi_decode(tile, channels).data
+                # Copy the overlap of tile and region
+                left, top = max(x, tile_x), max(y, tile_y)
+                right = min(x + width, tile_x + tile_width)
+                bottom = min(y + height, tile_y + tile_height)
+                region[top - y : bottom - y, left - x : right - x] = pixels[
+                    top - tile_y : bottom - tile_y, left - tile_x : right - tile_x
+                ]
+
+            parallel_map(decode_tile, _tile_boxes(self.header, columns, rows), workers)
+
+        if channels == QOIChannelCount.RGB:
+            return RGBImage(colorspace=self.header.image.colorspace, data=region)
+        elif channels == QOIChannelCount.RGBA:
+            return RGBAImage(colorspace=self.header.image.colorspace, data=region)
+        else:
+            assert_never(channels)
+
+    def close(self) -> None:
+        """Release the data, and unmap the file if it was opened from a path."""
+        self._data.release()
+        if self._mapped is not None:
+            self._mapped.close()
+            self._mapped = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def qoi_decode_tiled(
+    data: Buffer,
+    channels: QOIChannelCount | None = None,
+    workers: int | None = None,
+) -> RGBImage | RGBAImage:
+    """
+    Decode an image in the tiled QOI container format.
+
+    Args:
+        data: The bytes of the container, or any other buffer like an mmap.
+        channels: The number of channels to decode. If None, the channel count
+            of the image header is used.
+        workers: The number of threads decoding tiles. If None, one per CPU.
+            Only the numba backend decodes on several cores.
+
+    Returns:
+        RGBImage | RGBAImage: The decoded image as an RGB or RGBA image.
+    """
+    with QOITiledImage(data) as tiled:
+        return tiled.decode(channels, workers)
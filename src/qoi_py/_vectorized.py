@@ -0,0 +1,649 @@
+"""NumPy implementation of the QOI codec.
+
+Almost every decision the encoder makes only depends on the current and the
+previous pixel, so it can be made for the whole image at once with NumPy. Only
+the running index is stateful and is resolved in a tight scalar pass.
+
+The decoder works the other way around: a scalar pass finds the opcodes and
+which pixel each INDEX opcode refers to, after which all pixel values are
+reconstructed with cumulative sums.
+"""
+
+from collections.abc import Buffer
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .types import QOIChannelCount
+from ._convert import convert_pixels
+from ._lossy import encode_pixels_lossy
+from ._opcodes import (
+    QOIOpcode,
+    DIFF_DELTAS,
+    LUMA_GREEN_DELTA,
+    LUMA_RED_BLUE_DELTAS,
+    MASK_2BIT_DATA,
+    MASK_2BIT_OPCODE,
+)
+from ._pixel import qoi_hash_array
+
+
+START_PIXEL = (0, 0, 0, 255)
+"""The implicit previous pixel before the first pixel of an image."""
+
+_INDEX_CHUNK_SIZE = 1 << 16
+"""The number of pixels the running index is resolved for at a time."""
+
+
+def find_run_breaks(
+    flat_pixels: np.ndarray,
+    channels: QOIChannelCount,
+    previous: tuple[int, int, int, int] = START_PIXEL,
+) -> np.ndarray:
+    """
+    Find the positions of all pixels that differ from their predecessor.
+
+    Every pixel is compared with the previous one in bulk. The first pixel is
+    compared with `previous`, by default the implicit start pixel. All pixels
+    that are not returned are part of a run.
+
+    Args:
+        flat_pixels (np.ndarray): The (n, channels) array of pixels.
+        channels (QOIChannelCount): The channel count of the pixels.
+        previous (tuple[int, int, int, int]): The RGBA pixel before the first.
+
+    Returns:
+        np.ndarray: The ascending indices of the pixels that break a run.
+    """
+    is_repeat = np.empty(len(flat_pixels), dtype=np.bool_)
+    if len(flat_pixels) > 0:
+        previous_pixel = np.array(previous[: channels.value], dtype=np.uint8)
+        is_repeat[0] = np.array_equal(flat_pixels[0], previous_pixel)
+        is_repeat[1:] = np.all(flat_pixels[1:] == flat_pixels[:-1], axis=1)
+    return np.flatnonzero(~is_repeat)
+
+
+@dataclass
+class EncoderState:
+    """The state an encoder carries from one pixel to the next."""
+
+    running_index: list[int] = field(default_factory=lambda: [0] * 64)
+    """The running index with pixels packed into RGBA integers, initially
+    filled with (0, 0, 0, 0)."""
+    previous: tuple[int, int, int, int] = START_PIXEL
+    """The RGBA value of the previous pixel."""
+    run_length: int = 0
+    """The number of repetitions of the previous pixel not written yet."""
+
+
+def _find_index_hits(
+    positions: list[int], packed: list[int], running_index: list[int]
+) -> np.ndarray:
+    """
+    Replay the running index over all pixels which break a run.
+
+    Args:
+        positions (list[int]): The index position of every pixel.
+        packed (list[int]): Every pixel packed into a single RGBA integer.
+        running_index (list[int]): The packed running index, which is updated.
+
+    Returns:
+        np.ndarray: A boolean mask of the pixels found in the running index.
+    """
+    hits: list[int] = []
+    for i, (position, pixel) in enumerate(zip(positions, packed)):
+        if running_index[position] == pixel:
+            hits.append(i)
+        else:
+            running_index[position] = pixel
+
+    is_hit = np.zeros(len(packed), dtype=np.bool_)
+    is_hit[hits] = True
+    return is_hit
+
+
+def run_opcodes(run_length: int) -> bytes:
+    """
+    Encode a run of arbitrary length as RUN opcodes of at most 62 pixels.
+
+    Args:
+        run_length (int): The number of repeated pixels, may be zero.
+
+    Returns:
+        bytes: The RUN opcodes.
+    """
+    full_runs, remaining_run = divmod(run_length, 62)
+    opcodes = bytes([QOIOpcode.RUN | 61]) * full_runs
+    if remaining_run > 0:
+        opcodes += bytes([QOIOpcode.RUN | (remaining_run - 1)])
+    return opcodes
+
+
+def encode_opcodes(
+    flat_pixels: np.ndarray,
+    channels: QOIChannelCount,
+    state: EncoderState,
+    out: np.ndarray | None = None,
+) -> bytes | int:
+    """
+    Encode a sequence of pixels to QOI opcodes.
+
+    A run at the end of the pixels is only written up to a multiple of 62,
+    the rest is left in `state.run_length` as it might continue.
+
+    Args:
+        flat_pixels (np.ndarray): The (n, channels) array of pixels.
+        channels (QOIChannelCount): The channel count of the pixels.
+        state (EncoderState): The state before the first pixel, which is
+            updated to the state after the last pixel.
+        out (np.ndarray | None): The uint8 array to write the opcodes to. It
+            must have room for n * (channels + 1) + 1 bytes, the worst case.
+
+    Returns:
+        bytes | int: The opcodes, or the number of bytes written to `out` if
+            it was given.
+    """
+    run_breaks = find_run_breaks(flat_pixels, channels, state.previous)
+    n_tokens = len(run_breaks)
+
+    # Every pixel which breaks a run as RGBA. The pixels in between only
+    # repeat the previous one.
+    current = np.full((n_tokens, 4), 255, dtype=np.uint8)
+    current[:, : channels.value] = flat_pixels[run_breaks]
+
+    positions = qoi_hash_array(current)
+    # The scalar pass works on lists, which are built in chunks so that they
+    # do not take tens of bytes per pixel at once
+    is_index = np.empty(n_tokens, dtype=np.bool_)
+    for start in range(0, n_tokens, _INDEX_CHUNK_SIZE):
+        chunk = current[start : start + _INDEX_CHUNK_SIZE].astype(np.uint32)
+        packed = (chunk[:, 0] << 24) | (chunk[:, 1] << 16) | (chunk[:, 2] << 8)
+        packed |= chunk[:, 3]
+        is_index[start : start + _INDEX_CHUNK_SIZE] = _find_index_hits(
+            positions[start : start + _INDEX_CHUNK_SIZE].tolist(),
+            packed.tolist(),
+            state.running_index,
+        )
+
+    # Opcode candidacy, which only depends on the previous pixel
+    diff = np.empty((n_tokens, 4), dtype=np.int16)
+    diff[:1] = current[:1] - np.array(state.previous, dtype=np.int16)
+    np.subtract(current[1:], current[:-1], out=diff[1:], dtype=np.int16)
+    rdiff, gdiff, bdiff, adiff = diff[:, 0], diff[:, 1], diff[:, 2], diff[:, 3]
+    rdiff_gdiff = rdiff - gdiff
+    bdiff_gdiff = bdiff - gdiff
+    is_rgba = ~is_index & (adiff != 0)
+    is_diff = (
+        ~is_index & ~is_rgba & np.all((diff[:, :3] >= -2) & (diff[:, :3] <= 1), axis=1)
+    )
+    is_luma = (
+        ~is_index
+        & ~is_rgba
+        & ~is_diff
+        & (rdiff_gdiff >= -8)
+        & (rdiff_gdiff <= 7)
+        & (bdiff_gdiff >= -8)
+        & (bdiff_gdiff <= 7)
+        & (gdiff >= -32)
+        & (gdiff <= 31)
+    )
+
+    # The first byte and the length of every opcode. Fallback to RGB and
+    # override it with the cheaper opcodes.
+    first_bytes = np.full(n_tokens, QOIOpcode.RGB, dtype=np.uint8)
+    lengths = np.full(n_tokens, 4, dtype=np.uint8)
+
+    first_bytes[is_rgba] = QOIOpcode.RGBA
+    lengths[is_rgba] = 5
+
+    first_bytes[is_luma] = QOIOpcode.LUMA | (gdiff[is_luma] + 32)
+    luma_bytes = ((rdiff_gdiff[is_luma] + 8) << 4) | (bdiff_gdiff[is_luma] + 8)
+    lengths[is_luma] = 2
+
+    first_bytes[is_diff] = (
+        QOIOpcode.DIFF
+        | ((rdiff[is_diff] + 2) << 4)
+        | ((gdiff[is_diff] + 2) << 2)
+        | (bdiff[is_diff] + 2)
+    )
+    lengths[is_diff] = 1
+
+    first_bytes[is_index] = QOIOpcode.INDEX | positions[is_index]
+    lengths[is_index] = 1
+    del diff, rdiff_gdiff, bdiff_gdiff, positions
+
+    # Every pixel which breaks a run is preceded by the run before it: full
+    # RUN chunks and the remaining RUN. The arrays are updated in place, as
+    # each takes 8 bytes per pixel.
+    full_runs = np.diff(run_breaks, prepend=-1)
+    full_runs -= 1
+    full_runs[:1] += state.run_length
+
+    # Full RUN opcodes of the final run are written, the rest stays pending
+    if n_tokens > 0:
+        state.previous = tuple(current[-1].tolist())
+        state.run_length = len(flat_pixels) - int(run_breaks[-1]) - 1
+    else:
+        state.run_length += len(flat_pixels)
+    final_full_runs, state.run_length = divmod(state.run_length, 62)
+    del run_breaks
+
+    remaining_run = (full_runs % 62).astype(np.uint8)
+    full_runs //= 62
+    has_remaining_run = remaining_run > 0
+
+    # The start of every opcode in the output, after its runs
+    starts = full_runs + lengths
+    starts += has_remaining_run
+    np.cumsum(starts, out=starts)
+    size = (int(starts[-1]) if n_tokens > 0 else 0) + final_full_runs
+    starts -= lengths
+    output = np.empty(size, dtype=np.uint8) if out is None else out
+
+    # Scatter every kind of byte straight to its place
+    has_full_runs = full_runs > 0
+    if has_full_runs.any():
+        repeats = full_runs[has_full_runs]
+        run_starts = starts[has_full_runs] - repeats - has_remaining_run[has_full_runs]
+        chunk_starts = np.cumsum(repeats) - repeats
+        offsets = np.arange(int(repeats.sum())) - np.repeat(chunk_starts, repeats)
+        output[np.repeat(run_starts, repeats) + offsets] = QOIOpcode.RUN | 61
+    del full_runs
+    output[starts[has_remaining_run] - 1] = QOIOpcode.RUN | (
+        remaining_run[has_remaining_run] - 1
+    )
+    output[starts] = first_bytes
+    output[starts[is_luma] + 1] = luma_bytes
+    literal_starts = starts[lengths >= 4]
+    literals = current[lengths >= 4]
+    for channel in range(3):
+        literal_starts += 1
+        output[literal_starts] = literals[:, channel]
+    output[starts[is_rgba] + 4] = current[is_rgba, 3]
+    output[size - final_full_runs : size] = QOIOpcode.RUN | 61
+
+    if out is None:
+        return output.tobytes()
+    return size
+
+
+def encode_pixels(
+    flat_pixels: np.ndarray,
+    channels: QOIChannelCount,
+    out: np.ndarray,
+    tolerance: int = 0,
+) -> int:
+    """
+    Encode the pixels of an image to QOI opcodes, see `encode_opcodes`.
+
+    The output is byte-identical to the reference encoder in `_python.py`.
+
+    Args:
+        flat_pixels (np.ndarray): The (n, channels) array of pixels.
+        channels (QOIChannelCount): The channel count of the pixels.
+        out (np.ndarray): The uint8 array to write the opcodes to, without
+            header and end marker. It must have room for n * (channels + 1)
+            bytes, the worst case.
+        tolerance (int): The largest error per channel of lossy encoding, or
+            0 for lossless encoding, see `encode_pixels_lossy`.
+
+    Returns:
+        int: The number of bytes written to `out`.
+    """
+    if tolerance > 0:
+        return encode_pixels_lossy(flat_pixels, channels, out, tolerance)
+
+    state = EncoderState()
+    used = encode_opcodes(flat_pixels, channels, state, out)
+    # There might be a final run left to flush, shorter than a RUN opcode
+    if state.run_length > 0:
+        out[used] = QOIOpcode.RUN | (state.run_length - 1)
+        used += 1
+    return used
+
+
+# Contribution of each opcode byte to the index position of the decoded pixel.
+# The index position is linear modulo 64, and as 64 divides 256 the
+# wraparound of the channels does not affect it.
+_DIFF_POSITION_DELTA = [(3 * r + 5 * g + 7 * b) % 64 for r, g, b in DIFF_DELTAS]
+_LUMA_POSITION_DELTA = [(15 * gdiff) % 64 for gdiff in LUMA_GREEN_DELTA]
+_LUMA_POSITION_DELTA_2 = [(3 * r + 7 * b) % 64 for r, b in LUMA_RED_BLUE_DELTAS]
+
+# Decoding starts with one virtual opcode for each entry of the running index
+# and one for the previous pixel.
+_PREVIOUS_PIXEL_OPCODE = 64
+
+
+@dataclass
+class DecoderState:
+    """The state a decoder carries from one opcode to the next."""
+
+    running_index: np.ndarray = field(
+        default_factory=lambda: np.zeros((64, 4), dtype=np.uint8)
+    )
+    """The (64, 4) running index, initially filled with (0, 0, 0, 0)."""
+    pixel: np.ndarray = field(
+        default_factory=lambda: np.array(START_PIXEL, dtype=np.uint8)
+    )
+    """The (4,) RGBA value of the previous pixel."""
+
+
+@dataclass
+class _Scan:
+    """The result of `_scan_opcodes`."""
+
+    offsets: list[int]
+    """The offsets of all opcodes which were scanned."""
+    end: int
+    """The offset after the last scanned opcode."""
+    index_opcodes: list[int]
+    """The numbers of all INDEX opcodes."""
+    index_sources: list[int]
+    """The numbers of the opcodes the INDEX opcodes copy."""
+    index_alphas: list[int]
+    """The alpha of the pixels the INDEX opcodes copy."""
+    source_of_position: list[int]
+    """The number of the opcode that last wrote each index position."""
+
+
+def _scan_opcodes(
+    data: Buffer, start: int, end: int, n_pixels: int, state: DecoderState
+) -> _Scan:
+    """
+    Find the opcode boundaries and resolve every INDEX opcode to its source.
+
+    Only the index position and the alpha of the current pixel are tracked,
+    which is enough to know which opcode last wrote each index position.
+
+    Opcodes are numbered after 65 virtual opcodes: the 64 entries of the
+    running index and the previous pixel of the decoder state.
+
+    Args:
+        data (Buffer): The encoded image.
+        start (int): The offset of the first opcode.
+        end (int): No opcode starting at or after this offset is scanned.
+        n_pixels (int): The scan stops once this many pixels are decoded.
+        state (DecoderState): The state before the first opcode.
+
+    Returns:
+        _Scan: The opcode offsets and where the INDEX opcodes copy from.
+    """
+    diff_position_delta = _DIFF_POSITION_DELTA
+    luma_position_delta = _LUMA_POSITION_DELTA
+    luma_position_delta_2 = _LUMA_POSITION_DELTA_2
+
+    offsets: list[int] = []
+    index_opcodes: list[int] = []
+    index_sources: list[int] = []
+    index_alphas: list[int] = []
+
+    source_of_position = list(range(64))
+    alpha_of_position = state.running_index[:, 3].tolist()
+    # Entries that were never written do not sit at their own index position
+    position_of_entry = qoi_hash_array(state.running_index).tolist()
+    position = int(qoi_hash_array(state.pixel[np.newaxis])[0])
+    alpha = int(state.pixel[3])
+
+    opcode_number = _PREVIOUS_PIXEL_OPCODE + 1
+    pointer = start
+    while pointer < end and n_pixels > 0:
+        offsets.append(pointer)
+        byte1 = data[pointer]
+        n_pixels -= 1
+        if byte1 < QOIOpcode.DIFF:
+            source = source_of_position[byte1]
+            alpha = alpha_of_position[byte1]
+            index_opcodes.append(opcode_number)
+            index_sources.append(source)
+            index_alphas.append(alpha)
+            position = position_of_entry[byte1]
+            pointer += 1
+        elif byte1 < QOIOpcode.LUMA:
+            position = (position + diff_position_delta[byte1]) & 0x3F
+            pointer += 1
+        elif byte1 < QOIOpcode.RUN:
+            position = (
+                position
+                + luma_position_delta[byte1]
+                + luma_position_delta_2[data[pointer + 1]]
+            ) & 0x3F
+            pointer += 2
+        elif byte1 < QOIOpcode.RGB:
+            n_pixels -= byte1 & MASK_2BIT_DATA
+            pointer += 1
+        elif byte1 == QOIOpcode.RGB:
+            position = (
+                data[pointer + 1] * 3
+                + data[pointer + 2] * 5
+                + data[pointer + 3] * 7
+                + alpha * 11
+            ) & 0x3F
+            pointer += 4
+        else:
+            alpha = data[pointer + 4]
+            position = (
+                data[pointer + 1] * 3
+                + data[pointer + 2] * 5
+                + data[pointer + 3] * 7
+                + alpha * 11
+            ) & 0x3F
+            pointer += 5
+
+        source_of_position[position] = opcode_number
+        alpha_of_position[position] = alpha
+        position_of_entry[position] = position
+        opcode_number += 1
+
+    return _Scan(
+        offsets=offsets,
+        end=pointer,
+        index_opcodes=index_opcodes,
+        index_sources=index_sources,
+        index_alphas=index_alphas,
+        source_of_position=source_of_position,
+    )
+
+
+def _resolve_anchors(
+    roots: np.ndarray, parents: np.ndarray, offsets: np.ndarray
+) -> np.ndarray:
+    """
+    Resolve values which are defined as an offset from another value.
+
+    Every value is either a root with a known value, or its parent's value
+    plus an offset. The chains are collapsed by pointer jumping, which takes a
+    logarithmic number of vectorized rounds.
+
+    Args:
+        roots (np.ndarray): The boolean mask of the roots.
+        parents (np.ndarray): The parent of every value, ignored for roots.
+        offsets (np.ndarray): The known value of the roots, and the offset to
+            the parent otherwise. All arithmetic is modulo 256.
+
+    Returns:
+        np.ndarray: The resolved values.
+    """
+    roots = roots.copy()
+    parents = parents.copy()
+    values = offsets.copy()
+    pending = np.flatnonzero(~roots)
+    while len(pending) > 0:
+        pending_parents = parents[pending]
+        values[pending] += values[pending_parents]
+        parent_is_root = roots[pending_parents]
+        parents[pending] = parents[pending_parents]
+        roots[pending[parent_is_root]] = True
+        pending = pending[~parent_is_root]
+    return values
+
+
+def decode_opcodes(
+    data: Buffer,
+    start: int,
+    end: int,
+    channels: QOIChannelCount,
+    n_pixels: int,
+    state: DecoderState,
+    alpha_fill: int | None = None,
+    premultiply_alpha: bool = False,
+    opcode_counts: np.ndarray | None = None,
+) -> tuple[np.ndarray, int]:
+    """
+    Decode a sequence of opcodes in two passes.
+
+    A cheap scalar pass finds the opcode boundaries and resolves which pixel
+    every INDEX opcode refers to. All pixel values are then reconstructed at
+    once: DIFF and LUMA chains as cumulative sums modulo 256 starting at the
+    last RGB, RGBA or INDEX opcode, and RUN opcodes with `np.repeat`.
+
+    Args:
+        data (Buffer): The encoded image.
+        start (int): The offset of the first opcode.
+        end (int): No opcode starting at or after this offset is decoded.
+            Every opcode starting before it must be complete.
+        channels (QOIChannelCount): The number of channels to decode. The
+            alpha channel is dropped for RGB.
+        n_pixels (int): Decoding stops once this many pixels are decoded.
+        state (DecoderState): The state before the first opcode, which is
+            updated to the state after the last opcode.
+        alpha_fill (int | None): If not None, the alpha of every pixel is
+            replaced by this value.
+        premultiply_alpha (bool): Whether to multiply the colors by the alpha.
+        opcode_counts (np.ndarray | None): If given, the (256,) int64 array
+            to which the number of decoded opcodes by first byte is added.
+
+    Returns:
+        tuple[np.ndarray, int]: The (m, channels) array of decoded pixels,
+            with m <= n_pixels, and the offset after the last decoded opcode.
+    """
+    scan = _scan_opcodes(data, start, end, n_pixels, state)
+
+    # Every opcode with the four bytes following it, after the virtual
+    # opcodes which hold the state as RGBA opcodes. Opcodes near the end of
+    # the data are shorter than five bytes, the gather is clipped to the data
+    # instead of copying it with padding, and the bytes past an opcode are
+    # never read.
+    raw = np.frombuffer(data, dtype=np.uint8)
+    gather = np.array(scan.offsets, dtype=np.intp)[:, np.newaxis] + np.arange(5)
+    np.minimum(gather, len(raw) - 1, out=gather)
+    n_opcodes = _PREVIOUS_PIXEL_OPCODE + 1 + len(scan.offsets)
+    opcodes = np.empty((n_opcodes, 5), dtype=np.uint8)
+    opcodes[: _PREVIOUS_PIXEL_OPCODE + 1, 0] = QOIOpcode.RGBA
+    opcodes[:_PREVIOUS_PIXEL_OPCODE, 1:] = state.running_index
+    opcodes[_PREVIOUS_PIXEL_OPCODE, 1:] = state.pixel
+    opcodes[_PREVIOUS_PIXEL_OPCODE + 1 :] = raw[gather]
+    del gather
+    byte1, byte2 = opcodes[:, 0], opcodes[:, 1].astype(np.int16)
+    if opcode_counts is not None:
+        opcode_counts += np.bincount(byte1[_PREVIOUS_PIXEL_OPCODE + 1 :], minlength=256)
+
+    is_rgb = byte1 == QOIOpcode.RGB
+    is_rgba = byte1 == QOIOpcode.RGBA
+    tag = byte1 & MASK_2BIT_OPCODE
+    is_run = (tag == QOIOpcode.RUN) & ~is_rgb & ~is_rgba
+
+    # Channel deltas of the DIFF and LUMA opcodes, modulo 256
+    deltas = np.zeros((n_opcodes, 3), dtype=np.int16)
+    is_diff = tag == QOIOpcode.DIFF
+    diff_bytes = byte1[is_diff].astype(np.int16)
+    deltas[is_diff, 0] = ((diff_bytes >> 4) & 0b11) - 2
+    deltas[is_diff, 1] = ((diff_bytes >> 2) & 0b11) - 2
+    deltas[is_diff, 2] = (diff_bytes & 0b11) - 2
+    is_luma = tag == QOIOpcode.LUMA
+    gdiff = (byte1[is_luma].astype(np.int16) & 0x3F) - 32
+    deltas[is_luma, 0] = gdiff + (byte2[is_luma] >> 4) - 8
+    deltas[is_luma, 1] = gdiff
+    deltas[is_luma, 2] = gdiff + (byte2[is_luma] & 0x0F) - 8
+    cumulative = np.cumsum(deltas.astype(np.uint8), axis=0, dtype=np.uint8)
+
+    # Every pixel is the last anchor plus the deltas since then. RGB and RGBA
+    # anchors are known, INDEX anchors copy an earlier pixel.
+    index_opcodes = np.array(scan.index_opcodes, dtype=np.intp)
+    index_sources = np.array(scan.index_sources, dtype=np.intp)
+    is_index = np.zeros(n_opcodes, dtype=np.bool_)
+    is_index[index_opcodes] = True
+    is_absolute = is_rgb | is_rgba
+    is_anchor = is_absolute | is_index
+
+    opcode_numbers = np.arange(n_opcodes)
+    anchor_of = np.maximum.accumulate(np.where(is_anchor, opcode_numbers, 0))
+    anchors = np.flatnonzero(is_anchor)
+    anchor_rank = np.cumsum(is_anchor) - 1
+
+    # The value of every anchor minus the cumulative deltas at its position
+    anchor_offsets = opcodes[anchors, 1:4] - cumulative[anchors]
+    anchor_parents = np.zeros(len(anchors), dtype=np.intp)
+    index_ranks = anchor_rank[index_opcodes]
+    anchor_parents[index_ranks] = anchor_rank[anchor_of[index_sources]]
+    anchor_offsets[index_ranks] = cumulative[index_sources] - cumulative[index_opcodes]
+    anchor_values = _resolve_anchors(
+        is_absolute[anchors], anchor_parents, anchor_offsets
+    )
+
+    pixels = np.empty((n_opcodes, 4), dtype=np.uint8)
+    pixels[:, :3] = anchor_values[anchor_rank[anchor_of]] + cumulative
+
+    # The alpha only changes on RGBA and INDEX opcodes
+    alphas = opcodes[:, 4].copy()
+    alphas[index_opcodes] = scan.index_alphas
+    sets_alpha = is_rgba | is_index
+    pixels[:, 3] = alphas[
+        np.maximum.accumulate(np.where(sets_alpha, opcode_numbers, 0))
+    ]
+
+    state.running_index = pixels[scan.source_of_position]
+    state.pixel = pixels[-1].copy()
+
+    repeats = np.ones(n_opcodes, dtype=np.intp)
+    repeats[: _PREVIOUS_PIXEL_OPCODE + 1] = 0
+    repeats[is_run] = (byte1[is_run] & MASK_2BIT_DATA) + 1
+
+    # Converting before repeating touches every opcode once, not every pixel
+    converted = convert_pixels(pixels, channels, alpha_fill, premultiply_alpha)
+    decoded = np.repeat(converted, repeats, axis=0)
+    return decoded[:n_pixels], scan.end
+
+
+def decode_pixels(
+    data: Buffer,
+    img_data: np.ndarray,
+    alpha_fill: int | None = None,
+    premultiply_alpha: bool = False,
+    opcode_counts: np.ndarray | None = None,
+) -> None:
+    """
+    Decode the opcodes of an image, see `decode_opcodes`.
+
+    Args:
+        data (Buffer): The complete encoded image, including the header.
+        img_data (np.ndarray): The (n_pixels, channels) uint8 array to decode
+            into, where n_pixels is the pixel count the header announces.
+            The alpha channel is dropped if it has 3 channels.
+        alpha_fill (int | None): If not None, the alpha of every pixel is
+            replaced by this value.
+        premultiply_alpha (bool): Whether to multiply the colors by the alpha.
+        opcode_counts (np.ndarray | None): If given, the (256,) int64 array
+            to which the number of decoded opcodes by first byte is added.
+    """
+    n_pixels = img_data.shape[0]
+    channels = QOIChannelCount(img_data.shape[1])
+
+    state = DecoderState()
+    # Last 8 bytes are padding (7x 0x00 and 1x 0x01)
+    decoded, _ = decode_opcodes(
+        data,
+        14,
+        len(data) - 8,
+        channels,
+        n_pixels,
+        state,
+        alpha_fill,
+        premultiply_alpha,
+        opcode_counts,
+    )
+
+    # Like the reference decoder, repeat the last pixel if the data ends early
+    img_data[: len(decoded)] = decoded
+    img_data[len(decoded) :] = convert_pixels(
+        state.pixel[np.newaxis], channels, alpha_fill, premultiply_alpha
+    )
@@ -0,0 +1,138 @@
+"""Selection of the implementation behind `qoi_encode` and `qoi_decode`.
+
+Every backend implements the same inner loops and produces the same output:
+
+- `numba`: the scalar loops compiled with numba, if it is installed.
+- `numpy`: vectorized NumPy implementation.
+- `python`: the pure Python reference implementation.
+
+By default the first available backend of this list is used. It can be
+overridden for the whole process or temporarily:
+
+```python
+from qoi_py import backend
+
+backend.get_backend()  # "numba" if installed, "numpy" otherwise
+backend.set_backend("python")
+with backend.use_backend("numpy"):
+    ...
+backend.set_backend(None)  # back to automatic selection
+```
+"""
+
+from collections.abc import Buffer, Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from importlib import import_module
+
+import numpy as np
+
+from .types import QOIChannelCount
+
+
+__all__ = [
+    "Backend",
+    "available_backends",
+    "get_backend",
+    "set_backend",
+    "use_backend",
+    "load_backend",
+]
+
+
+@dataclass(frozen=True)
+class Backend:
+    """The inner loops of the codec, as implemented by one backend."""
+
+    name: str
+    encode_pixels: Callable[[np.ndarray, QOIChannelCount, np.ndarray, int], int]
+    """Encode (n, channels) pixels to opcodes into a uint8 array with room for
+    the worst case, without header and end marker, returning the size. The
+    last argument is the tolerance of lossy encoding, 0 for lossless."""
+    decode_pixels: Callable[
+        [Buffer, np.ndarray, int | None, bool, np.ndarray | None], None
+    ]
+    """Decode the opcodes of a complete QOI image into (n, channels) pixels,
+    with an optional alpha to fill in, whether to premultiply alpha and an
+    optional (256,) int64 array to add the number of opcodes by first byte to."""
+
+
+# Backend names and the modules implementing them, in order of preference
+_BACKEND_MODULES = {
+    "numba": "._numba",
+    "numpy": "._vectorized",
+    "python": "._python",
+}
+
+_loaded: dict[str, Backend | None] = {}
+_selected: str | None = None
+
+
+def _load(name: str) -> Backend | None:
+    """Import a backend, returning None if its dependencies are missing."""
+    if name not in _loaded:
+        try:
+            module = import_module(_BACKEND_MODULES[name], __package__)
+        except ImportError:
+            _loaded[name] = None
+        else:
+            _loaded[name] = Backend(
+                name=name,
+                encode_pixels=module.encode_pixels,
+                decode_pixels=module.decode_pixels,
+            )
+    return _loaded[name]
+
+
+def available_backends() -> list[str]:
+    """Return the names of all usable backends, in order of preference."""
+    return [name for name in _BACKEND_MODULES if _load(name) is not None]
+
+
+def get_backend() -> str:
+    """Return the name of the backend which is currently active."""
+    if _selected is not None:
+        return _selected
+    return available_backends()[0]
+
+
+def set_backend(name: str | None) -> None:
+    """Select the backend to use, or None to select it automatically.
+
+    Raises:
+        ValueError: If the backend is unknown or its dependencies are missing.
+    """
+    global _selected
+    if name is not None:
+        load_backend(name)
+    _selected = name
+
+
+@contextmanager
+def use_backend(name: str | None) -> Iterator[None]:
+    """Temporarily select a backend, see `set_backend`."""
+    previous = _selected
+    set_backend(name)
+    try:
+        yield
+    finally:
+        set_backend(previous)
+
+
+def load_backend(name: str | None = None) -> Backend:
+    """Return the implementation of a backend, by default the active one.
+
+    Raises:
+        ValueError: If the backend is unknown or its dependencies are missing.
+    """
+    if name is None:
+        name = get_backend()
+    if name not in _BACKEND_MODULES:
+        raise ValueError(
+            f"Unknown backend {name!r}, expected one of {list(_BACKEND_MODULES)}."
+        )
+
+    backend = _load(name)
+    if backend is None:
+        raise ValueError(f"Backend {name!r} is not available, is it installed?")
+    return backend
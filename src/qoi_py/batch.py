@@ -0,0 +1,533 @@
+"""Encoding and decoding many images in parallel.
+
+The work is spread over a pool of processes. Pixel data and encoded images
+are handed between the processes through shared memory, so large arrays are
+never pickled:
+
+```python
+from qoi_py import batch
+
+for result in batch.decode_many(paths, workers=8, chunk_size=16):
+    if result.error is not None:
+        print(f"{paths[result.index]}: {result.error}")
+    else:
+        ...  # result.value is an RGBImage or RGBAImage
+```
+
+A failing item is reported in its `BatchResult` and never aborts the batch.
+"""
+
+import multiprocessing
+import os
+from collections import deque
+from collections.abc import Buffer, Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from io import BytesIO
+from itertools import batched
+from multiprocessing.context import BaseContext
+from multiprocessing.shared_memory import SharedMemory
+from os import PathLike
+from typing import Any
+
+import numpy as np
+
+from .types import (
+    ImageContent,
+    QOIChannelCount,
+    QOIColorspace,
+    RGBImage,
+    RGBAImage,
+)
+from ._decode import _clearing_frames, _released, qoi_decode, qoi_decode_file
+from ._encode import qoi_encode, qoi_max_encoded_size
+from ._structure import QOIHeader
+from .backend import get_backend, use_backend
+
+
+__all__ = [
+    "BatchResult",
+    "EncodeItem",
+    "DecodeItem",
+    "encode_many",
+    "decode_many",
+]
+
+
+EncodeItem = ImageContent | Buffer | str | PathLike[str]
+"""An image to encode: a (height, width, channels) uint8 array, or the content
+or path of an image file which Pillow can read, like a PNG."""
+
+DecodeItem = Buffer | str | PathLike[str]
+"""A QOI image to decode: its bytes or any other buffer, or its path."""
+
+
+@dataclass(frozen=True)
+class BatchResult[T]:
+    """The outcome of one item of a batch."""
+
+    index: int
+    """The position of the item in the input iterable."""
+    value: T | None = None
+    """The encoded bytes or decoded image, None if the item failed."""
+    error: Exception | None = None
+    """The error raised while processing the item, None if it succeeded."""
+
+    @property
+    def ok(self) -> bool:
+        """Whether the item was processed successfully."""
+        return self.error is None
+
+
+@dataclass(frozen=True)
+class _SharedArray:
+    """A uint8 array in a shared memory block, identified by its name."""
+
+    name: str
+    shape: tuple[int, ...]
+
+
+def _share(array: np.ndarray) -> _SharedArray:
+    """Copy a uint8 array into a new shared memory block."""
+    # Shared memory blocks cannot be empty
+    shm = SharedMemory(create=True, size=max(array.nbytes, 1), track=False)
+    try:
+        np.frombuffer(shm.buf, dtype=np.uint8, count=array.size)[:] = array.ravel()
+    except BaseException:
+        shm.unlink()
+        raise
+    finally:
+        shm.close()
+    return _SharedArray(shm.name, array.shape)
+
+
+def _allocate(size: int) -> SharedMemory:
+    """Create a shared memory block with room for `size` bytes."""
+    return SharedMemory(create=True, size=max(size, 1), track=False)
+
+
+def _take(shared: _SharedArray) -> np.ndarray:
+    """Copy a shared array into process memory and free its block."""
+    shm = SharedMemory(shared.name, track=False)
+    try:
+        size = int(np.prod(shared.shape))
+        view = np.frombuffer(shm.buf, dtype=np.uint8, count=size)
+        array = view.reshape(shared.shape).copy()
+        del view
+    finally:
+        shm.close()
+        shm.unlink()
+    return array
+
+
+def _release(shared: _SharedArray) -> None:
+    """Free the block of a shared array without reading it."""
+    try:
+        shm = SharedMemory(shared.name, track=False)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _read_image(item: Buffer | str | PathLike[str]) -> np.ndarray:
+    """Read the pixels of an image file, like a PNG, with Pillow."""
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError("Pillow is required to encode image files.") from None
+
+    source = item if isinstance(item, (str, PathLike)) else BytesIO(item)
+    with Image.open(source) as image:
+        mode = "RGBA" if image.has_transparency_data else "RGB"
+        return np.asarray(image.convert(mode))
+
+
+def _encode_item(
+    item: _SharedArray | str | PathLike[str], colorspace: QOIColorspace
+) -> _SharedArray:
+    """Encode one image into a new shared memory block, in a worker process."""
+    if not isinstance(item, _SharedArray):
+        return _encode_into_shared(_read_image(item), colorspace)
+
+    shm = SharedMemory(item.name, track=False)
+    try:
+        # Pixels are (height, width, channels), anything else is the content
+        # of an image file
+        if len(item.shape) != 3:
+            content = bytes(shm.buf[: item.shape[0]])
+            return _encode_into_shared(_read_image(content), colorspace)
+
+        pixels = np.ndarray(item.shape, dtype=np.uint8, buffer=shm.buf)
+        try:
+            # The frames of the traceback reference the pixels, which would
+            # keep the shared memory from being closed
+            with _clearing_frames():
+                return _encode_into_shared(pixels, colorspace)
+        finally:
+            del pixels
+    finally:
+        shm.close()
+
+
+def _encode_into_shared(image: np.ndarray, colorspace: QOIColorspace) -> _SharedArray:
+    """Encode an image into a new shared memory block."""
+    height, width, channels = image.shape
+    shm = _allocate(qoi_max_encoded_size(width, height, QOIChannelCount(channels)))
+    try:
+        # See `_encode_item`
+        with _clearing_frames():
+            used = qoi_encode(image, colorspace, out=shm.buf)
+    except Exception:
+        shm.close()
+        shm.unlink()
+        raise
+    shm.close()
+    return _SharedArray(shm.name, (used,))
+
+
+def _decode_item(
+    item: _SharedArray | str | PathLike[str], channels: QOIChannelCount | None
+) -> tuple[_SharedArray, QOIColorspace]:
+    """Decode one image into a new shared memory block, in a worker process."""
+    if not isinstance(item, _SharedArray):
+        with open(item, "rb") as f:
+            header = QOIHeader.from_bytes(f.read(14))
+        return _decode_into_shared(header, channels, qoi_decode_file, item)
+
+    source = SharedMemory(item.name, track=False)
+    try:
+        with _released(source.buf[: item.shape[0]]) as data:
+            header = QOIHeader.from_bytes(data)
+            return _decode_into_shared(header, channels, qoi_decode, data)
+    finally:
+        source.close()
+
+
+def _decode_into_shared(
+    header: QOIHeader,
+    channels: QOIChannelCount | None,
+    decode: Callable[..., RGBImage | RGBAImage],
+    source: Any,
+) -> tuple[_SharedArray, QOIColorspace]:
+    """Decode an image from `source` with `decode` into a new shared memory block."""
+    channels = channels if channels is not None else header.channels
+    shape = (header.height, header.width, channels.value)
+    size = header.height * header.width * channels.value
+
+    shm = _allocate(size)
+    try:
+        with _released(shm.buf[:size]) as out:
+            decode(source, channels, out)
+    except Exception:
+        shm.close()
+        shm.unlink()
+        raise
+    shm.close()
+    return _SharedArray(shm.name, shape), header.colorspace
+
+
+def _run_chunk(
+    function: Callable[..., Any], items: list[Any], backend: str, **kwargs: Any
+) -> list[tuple[Any, Exception | None]]:
+    """Process the items of a chunk in a worker process, catching their errors."""
+    outcomes: list[tuple[Any, Exception | None]] = []
+    with use_backend(backend):
+        for item in items:
+            try:
+                outcomes.append((function(item, **kwargs), None))
+            except Exception as error:
+                outcomes.append((None, error))
+    return outcomes
+
+
+@dataclass
+class _Chunk:
+    """Consecutive items of a batch, submitted to the pool as one task."""
+
+    indices: list[int]
+    inputs: list[Any] = field(default_factory=list)
+    """The prepared item for every index, or the error raised preparing it."""
+    future: Future | None = None
+
+    def shared_inputs(self) -> list[_SharedArray]:
+        return [item for item in self.inputs if isinstance(item, _SharedArray)]
+
+
+def _run_batch(
+    items: Iterable[Any],
+    prepare: Callable[[Any], Any],
+    function: Callable[..., Any],
+    collect: Callable[[Any], Any],
+    release: Callable[[Any], None],
+    workers: int,
+    chunk_size: int,
+    ordered: bool,
+    **kwargs: Any,
+) -> Iterator[BatchResult]:
+    """Process the items in chunks on a process pool.
+
+    Args:
+        items: The items of the batch.
+        prepare: Turns an item into the input of `function`, in this process.
+        function: Processes one prepared item, in a worker process.
+        collect: Turns the output of `function` into the result value.
+        release: Frees the output of `function` if it is never collected.
+        workers: The number of worker processes, at least 1.
+        chunk_size: The number of items per task.
+        ordered: Whether to yield the results in input order.
+    """
+    # Only a few chunks are in flight at a time, so the shared memory of the
+    # inputs does not grow with the size of the batch
+    max_pending = 2 * workers
+    backend = get_backend()
+    pending: deque[_Chunk] = deque()
+
+    # The outputs of the chunk whose results are being yielded which have not
+    # been collected yet, freed if the caller stops iterating
+    uncollected: deque[tuple[Any, Exception | None]] = deque()
+
+    def finish(chunk: _Chunk) -> Iterator[BatchResult]:
+        try:
+            outcomes = chunk.future.result() if chunk.future else []
+        except Exception as error:
+            # The pool itself failed, e.g. because a worker was killed
+            outcomes = [(None, error)] * len(chunk.indices)
+        finally:
+            for shared in chunk.shared_inputs():
+                _release(shared)
+        uncollected.extend(outcomes)
+
+        for index, prepared in zip(chunk.indices, chunk.inputs):
+            if isinstance(prepared, Exception):
+                yield BatchResult(index, error=prepared)
+                continue
+            output, error = uncollected.popleft()
+            if error is not None:
+                yield BatchResult(index, error=error)
+                continue
+            try:
+                result = BatchResult(index, value=collect(output))
+            except Exception as error:
+                result = BatchResult(index, error=error)
+            yield result
+
+    def discard(chunk: _Chunk) -> None:
+        if chunk.future is not None and not chunk.future.cancel():
+            try:
+                for output, error in chunk.future.result():
+                    if error is None:
+                        release(output)
+            except Exception:
+                pass
+        for shared in chunk.shared_inputs():
+            _release(shared)
+
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=_pool_context()
+    ) as executor:
+        try:
+            for indexed_items in batched(enumerate(items), chunk_size):
+                chunk = _Chunk(indices=[index for index, _ in indexed_items])
+                for _, item in indexed_items:
+                    try:
+                        chunk.inputs.append(prepare(item))
+                    except Exception as error:
+                        chunk.inputs.append(error)
+
+                to_submit = [x for x in chunk.inputs if not isinstance(x, Exception)]
+                if to_submit:
+                    chunk.future = executor.submit(
+                        _run_chunk, function, to_submit, backend, **kwargs
+                    )
+                pending.append(chunk)
+
+                while len(pending) >= max_pending:
+                    if ordered:
+                        yield from finish(pending.popleft())
+                    else:
+                        yield from _finish_completed(pending, finish)
+
+            while pending:
+                if ordered:
+                    yield from finish(pending.popleft())
+                else:
+                    yield from _finish_completed(pending, finish)
+        finally:
+            # Only reached early if the caller stops iterating or preparing
+            # an item fails unexpectedly
+            while uncollected:
+                output, error = uncollected.popleft()
+                if error is None:
+                    release(output)
+            while pending:
+                discard(pending.popleft())
+
+
+def _finish_completed(
+    pending: deque[_Chunk], finish: Callable[[_Chunk], Iterator[BatchResult]]
+) -> Iterator[BatchResult]:
+    """Wait for at least one pending chunk and yield the results of all done."""
+    futures = [chunk.future for chunk in pending if chunk.future is not None]
+    if futures:
+        wait(futures, return_when=FIRST_COMPLETED)
+
+    done = [chunk for chunk in pending if chunk.future is None or chunk.future.done()]
+    for chunk in done:
+        # The chunks after it stay pending, so they are discarded if the
+        # caller stops iterating
+        pending.remove(chunk)
+        yield from finish(chunk)
+
+
+def _pool_context() -> BaseContext:
+    """Return the context to start worker processes with.
+
+    Forking a process which runs threads, like the thread pools of the tiled
+    and async functions, may deadlock, so a fresh interpreter is started
+    instead. The forkserver is cheaper than spawn, but not available on every
+    platform.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _pool_size(workers: int | None, chunk_size: int) -> int:
+    """Return the number of worker processes to use.
+
+    Raises:
+        ValueError: If `workers` or `chunk_size` is less than 1.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+    if workers is None:
+        return os.process_cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    return workers
+
+
+def _prepare_encode(item: EncodeItem) -> _SharedArray | str | PathLike[str]:
+    """Move the pixels or file content of an item to shared memory."""
+    if isinstance(item, (str, PathLike)):
+        return item
+    if isinstance(item, np.ndarray):
+        if item.dtype != np.uint8 or item.ndim != 3 or item.shape[2] not in (3, 4):
+            raise ValueError(
+                "Images must be (height, width, 3 or 4) uint8 arrays, got a "
+                f"{item.dtype} array of shape {item.shape}."
+            )
+        return _share(item)
+    return _share(np.frombuffer(memoryview(item).cast("B"), dtype=np.uint8))
+
+
+def _prepare_decode(item: DecodeItem) -> _SharedArray | str | PathLike[str]:
+    """Move the bytes of an item to shared memory."""
+    if isinstance(item, (str, PathLike)):
+        return item
+    return _share(np.frombuffer(memoryview(item).cast("B"), dtype=np.uint8))
+
+
+def _collect_encoded(output: _SharedArray) -> bytes:
+    return _take(output).tobytes()
+
+
+def _collect_decoded(
+    output: tuple[_SharedArray, QOIColorspace],
+) -> RGBImage | RGBAImage:
+    shared, colorspace = output
+    data = _take(shared)
+    if shared.shape[2] == QOIChannelCount.RGB:
+        return RGBImage(colorspace=colorspace, data=data)
+    return RGBAImage(colorspace=colorspace, data=data)
+
+
+def _release_decoded(output: tuple[_SharedArray, QOIColorspace]) -> None:
+    _release(output[0])
+
+
+def encode_many(
+    items: Iterable[EncodeItem],
+    colorspace: QOIColorspace = QOIColorspace.SRGB,
+    workers: int | None = None,
+    chunk_size: int = 1,
+    ordered: bool = True,
+) -> Iterator[BatchResult[bytes]]:
+    """
+    Encode many images to QOI format in parallel.
+
+    The items are consumed lazily, and only a few chunks per worker are in
+    flight at a time.
+
+    Args:
+        items: The images to encode, see `EncodeItem`. Image files are read
+            with Pillow, which has to be installed.
+        colorspace: The colorspace stored in the headers.
+        workers: The number of worker processes. If None, one per CPU.
+        chunk_size: The number of images a worker processes per task. Larger
+            chunks reduce the overhead for many small images.
+        ordered: If True, the results are yielded in input order. Otherwise
+            they are yielded as soon as their chunk is complete.
+
+    Returns:
+        Iterator[BatchResult[bytes]]: The encoded image or the error of every
+            item.
+
+    Raises:
+        ValueError: If `workers` or `chunk_size` is less than 1.
+    """
+    return _run_batch(
+        items,
+        _prepare_encode,
+        _encode_item,
+        _collect_encoded,
+        _release,
+        _pool_size(workers, chunk_size),
+        chunk_size,
+        ordered,
+        colorspace=colorspace,
+    )
+
+
+def decode_many(
+    items: Iterable[DecodeItem],
+    channels: QOIChannelCount | None = None,
+    workers: int | None = None,
+    chunk_size: int = 1,
+    ordered: bool = True,
+) -> Iterator[BatchResult[RGBImage | RGBAImage]]:
+    """
+    Decode many QOI images in parallel.
+
+    The items are consumed lazily, and only a few chunks per worker are in
+    flight at a time.
+
+    Args:
+        items: The images to decode, see `DecodeItem`.
+        channels: The number of channels to decode. If None, the channel count
+            of every image header is used.
+        workers: The number of worker processes. If None, one per CPU.
+        chunk_size: The number of images a worker processes per task. Larger
+            chunks reduce the overhead for many small images.
+        ordered: If True, the results are yielded in input order. Otherwise
+            they are yielded as soon as their chunk is complete.
+
+    Returns:
+        Iterator[BatchResult[RGBImage | RGBAImage]]: The decoded image or the
+            error of every item.
+
+    Raises:
+        ValueError: If `workers` or `chunk_size` is less than 1.
+    """
+    return _run_batch(
+        items,
+        _prepare_decode,
+        _decode_item,
+        _collect_decoded,
+        _release_decoded,
+        _pool_size(workers, chunk_size),
+        chunk_size,
+        ordered,
+        channels=channels,
+    )
@@ -8,6 +8,7 @@ from enum import IntEnum
 __all__ = [
     "QOIColorspace",
     "QOIChannelCount",
+    "QOIScanOrder",
     "RGBImageContent",
     "RGBAImageContent",
     "ImageContent",
@@ -30,6 +31,21 @@ class QOIChannelCount(IntEnum):
     RGBA = 4
 
 
+class QOIScanOrder(IntEnum):
+    """Order in which the pixels of an image are encoded, see `qoi_encode_scan`"""
+
+    ROW_MAJOR = 0
+    """Row by row, the order of plain QOI images."""
+    COLUMN_MAJOR = 1
+    """Column by column."""
+    SERPENTINE = 2
+    """Row by row, every other row from right to left."""
+    TILES = 3
+    """8x8 tiles row by row, the pixels of every tile row by row."""
+    HILBERT = 4
+    """Along a Hilbert curve, which keeps neighboring pixels close."""
+
+
 RGBImageContent = Annotated[npt.NDArray[np.uint8], ("height", "width", 3)]
 """(height, width, 3) uint8 NumPy array for RGB image data."""
 
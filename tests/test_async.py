@@ -0,0 +1,138 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from qoi_py import (
+    get_async_limit,
+    qoi_decode,
+    qoi_decode_async,
+    qoi_decode_file,
+    qoi_decode_file_async,
+    qoi_encode,
+    qoi_encode_async,
+    qoi_encode_file_async,
+    set_async_limit,
+)
+from qoi_py._async import _run
+from qoi_py.types import QOIChannelCount
+
+ASSETS_PATH = Path(__file__).parent / "assets"
+
+
+@pytest.fixture
+def limit():
+    """Restore the default limit after the test."""
+    yield
+    set_async_limit(None)
+
+
+def test_encode_decode_async():
+    image = qoi_decode_file(ASSETS_PATH / "dice.qoi").data
+
+    async def main():
+        encoded = await qoi_encode_async(image)
+        decoded = await qoi_decode_async(encoded, QOIChannelCount.RGBA)
+        return encoded, decoded
+
+    encoded, decoded = asyncio.run(main())
+
+    assert encoded == qoi_encode(image)
+    assert np.array_equal(decoded.data, image)
+
+
+def test_file_helpers_async(tmp_path: Path):
+    image = qoi_decode_file(ASSETS_PATH / "testcard_rgba.qoi").data
+    path = tmp_path / "image.qoi"
+
+    async def main():
+        size = await qoi_encode_file_async(path, image)
+        return size, await qoi_decode_file_async(path)
+
+    size, decoded = asyncio.run(main())
+
+    assert size == path.stat().st_size
+    assert path.read_bytes() == qoi_encode(image)
+    assert np.array_equal(decoded.data, image)
+
+
+def test_process_executor():
+    data = (ASSETS_PATH / "qoi_logo.qoi").read_bytes()
+
+    async def main():
+        # Forking is unsafe in the multi-threaded test process
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=2, mp_context=context) as executor:
+            jobs = [qoi_decode_async(data, executor=executor) for _ in range(3)]
+            return await asyncio.gather(*jobs)
+
+    for decoded in asyncio.run(main()):
+        assert np.array_equal(decoded.data, qoi_decode(data).data)
+
+
+def test_errors_are_raised():
+    async def main():
+        await qoi_decode_async(b"not a qoi image")
+
+    with pytest.raises(ValueError, match="Invalid QOI header"):
+        asyncio.run(main())
+
+
+def test_concurrency_is_limited(limit):
+    set_async_limit(2)
+    lock = threading.Lock()
+    running, peak = 0, 0
+
+    def job():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    async def main():
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            await asyncio.gather(*(_run(executor, job) for _ in range(8)))
+
+    asyncio.run(main())
+
+    assert peak == 2
+
+
+def test_cancelled_jobs_free_their_slot(limit):
+    set_async_limit(1)
+    started = threading.Event()
+    finish = threading.Event()
+
+    async def main():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            running = asyncio.create_task(_run(executor, finish.wait))
+            waiting = asyncio.create_task(_run(executor, started.set))
+            await asyncio.sleep(0.01)
+
+            running.cancel()
+            waiting.cancel()
+            # The running job keeps its slot until it is actually done
+            assert not await asyncio.to_thread(started.wait, 0.05)
+            finish.set()
+
+            await asyncio.wait_for(_run(executor, lambda: 42), timeout=5)
+            return running.cancelled(), waiting.cancelled()
+
+    assert asyncio.run(main()) == (True, True)
+    assert not started.is_set()
+
+
+def test_set_async_limit(limit):
+    set_async_limit(3)
+    assert get_async_limit() == 3
+
+    with pytest.raises(ValueError, match="at least 1"):
+        set_async_limit(0)
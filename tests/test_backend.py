@@ -0,0 +1,34 @@
+import pytest
+
+from qoi_py import backend
+
+
+def test_reference_backends_are_available():
+    assert {"numpy", "python"} <= set(backend.available_backends())
+
+
+def test_default_backend_is_preferred():
+    assert backend.get_backend() == backend.available_backends()[0]
+
+
+def test_set_backend():
+    try:
+        backend.set_backend("python")
+        assert backend.get_backend() == "python"
+        assert backend.load_backend().name == "python"
+    finally:
+        backend.set_backend(None)
+
+    assert backend.get_backend() == backend.available_backends()[0]
+
+
+def test_use_backend_restores_previous():
+    with backend.use_backend("python"):
+        with backend.use_backend("numpy"):
+            assert backend.get_backend() == "numpy"
+        assert backend.get_backend() == "python"
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown backend"):
+        backend.set_backend("fortran")
@@ -0,0 +1,127 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from PIL import Image
+
+from qoi_py import batch, qoi_decode, qoi_decode_file, qoi_encode
+from qoi_py.types import QOIChannelCount
+
+ASSETS_PATH = Path(__file__).parent / "assets"
+ASSET_NAMES = ["dice", "edgecase", "qoi_logo", "testcard", "testcard_rgba"]
+
+
+def shared_memory_blocks() -> set[str]:
+    return {path.name for path in Path("/dev/shm").glob("psm_*")}
+
+
+def random_images(count: int) -> list[np.ndarray]:
+    rng = np.random.default_rng(count)
+    return [
+        rng.integers(0, 3, (8 + i, 5 + 2 * i, 3 + i % 2), dtype=np.uint8) * 100
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3])
+def test_encode_many_matches_qoi_encode(chunk_size: int):
+    images = random_images(7)
+
+    results = list(batch.encode_many(images, workers=2, chunk_size=chunk_size))
+
+    assert [result.index for result in results] == list(range(7))
+    assert [result.value for result in results] == [qoi_encode(i) for i in images]
+    assert all(result.ok for result in results)
+
+
+def test_encode_many_from_image_files():
+    paths = [ASSETS_PATH / f"{name}.png" for name in ASSET_NAMES]
+    contents = [paths[0].read_bytes()]
+
+    results = list(batch.encode_many([*paths, *contents], workers=2))
+
+    for path, result in zip([*paths, paths[0]], results):
+        assert result.ok, result.error
+        with Image.open(path) as image:
+            expected = np.asarray(image)
+        assert np.array_equal(qoi_decode(result.value).data, expected), path.name
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_decode_many_matches_qoi_decode_file(ordered: bool):
+    paths = [ASSETS_PATH / f"{name}.qoi" for name in ASSET_NAMES]
+    items = [*paths, *(path.read_bytes() for path in paths)]
+
+    results = list(batch.decode_many(items, workers=2, ordered=ordered))
+
+    assert sorted(result.index for result in results) == list(range(len(items)))
+    if ordered:
+        assert [result.index for result in results] == list(range(len(items)))
+    for result in results:
+        expected = qoi_decode_file(paths[result.index % len(paths)])
+        assert result.ok, result.error
+        assert np.array_equal(result.value.data, expected.data)
+        assert result.value.colorspace == expected.colorspace
+
+
+def test_decode_many_channels():
+    path = ASSETS_PATH / "dice.qoi"
+
+    (result,) = batch.decode_many([path], channels=QOIChannelCount.RGBA, workers=1)
+
+    expected = qoi_decode_file(path, QOIChannelCount.RGBA)
+    assert result.value.channels == QOIChannelCount.RGBA
+    assert np.array_equal(result.value.data, expected.data)
+
+
+def test_errors_do_not_abort_batch():
+    valid = qoi_encode(random_images(1)[0])
+    items = [valid, b"not a qoi image", ASSETS_PATH / "missing.qoi", valid]
+
+    results = list(batch.decode_many(items, workers=2, chunk_size=2))
+
+    assert [result.ok for result in results] == [True, False, False, True]
+    assert isinstance(results[1].error, ValueError)
+    assert isinstance(results[2].error, FileNotFoundError)
+    assert results[1].value is None
+
+
+def test_invalid_arrays_are_reported():
+    images = [np.zeros((2, 2, 2), dtype=np.uint8), np.zeros((2, 2, 3))]
+
+    results = list(batch.encode_many(images, workers=1))
+
+    assert all(isinstance(result.error, ValueError) for result in results)
+
+
+@pytest.mark.skipif(not Path("/dev/shm").is_dir(), reason="needs /dev/shm")
+def test_shared_memory_is_freed():
+    before = shared_memory_blocks()
+    images = random_images(6)
+
+    list(batch.encode_many(images, workers=2))
+    list(batch.decode_many([b"invalid", qoi_encode(images[0])], workers=2))
+    # Stopping early discards the pending chunks
+    next(batch.encode_many(images, workers=2))
+
+    assert shared_memory_blocks() <= before
+
+
+@pytest.mark.skipif(not Path("/dev/shm").is_dir(), reason="needs /dev/shm")
+@pytest.mark.parametrize("ordered", [True, False])
+def test_shared_memory_is_freed_when_closed_early(ordered: bool):
+    before = shared_memory_blocks()
+    images = random_images(12)
+
+    results = batch.encode_many(images, workers=2, chunk_size=4, ordered=ordered)
+    assert next(results).ok
+    results.close()
+
+    assert shared_memory_blocks() <= before
+
+
+@pytest.mark.parametrize("workers, chunk_size", [(0, 1), (1, 0)])
+def test_invalid_pool_size(workers: int, chunk_size: int):
+    with pytest.raises(ValueError, match="must be at least 1"):
+        batch.decode_many([], workers=workers, chunk_size=chunk_size)
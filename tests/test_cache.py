@@ -0,0 +1,128 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from qoi_py import QOIDecodeCache, qoi_decode, qoi_encode
+from qoi_py.types import QOIChannelCount
+
+ASSETS_PATH = Path(__file__).parent / "assets"
+
+
+def encoded_image(value: int, shape=(10, 10, 3)) -> bytes:
+    return qoi_encode(np.full(shape, value, dtype=np.uint8))
+
+
+def test_decode_hits_cache():
+    cache = QOIDecodeCache(max_bytes=10**7)
+    data = (ASSETS_PATH / "qoi_logo.qoi").read_bytes()
+
+    first = cache.decode(data)
+    second = cache.decode(bytearray(data))
+
+    assert np.array_equal(first.data, qoi_decode(data).data)
+    assert second.data is first.data
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+    assert cache.stats.nbytes == first.data.nbytes
+
+
+def test_cached_arrays_are_read_only():
+    cache = QOIDecodeCache(max_bytes=10_000)
+
+    image = cache.decode(encoded_image(1))
+
+    with pytest.raises(ValueError, match="read-only"):
+        image.data[0, 0, 0] = 2
+    assert cache.decode(encoded_image(1)).data[0, 0, 0] == 1
+
+
+def test_channels_are_part_of_key():
+    cache = QOIDecodeCache(max_bytes=10_000)
+    data = encoded_image(1)
+
+    rgb = cache.decode(data)
+    rgba = cache.decode(data, QOIChannelCount.RGBA)
+
+    assert rgb.data.shape[2] == 3 and rgba.data.shape[2] == 4
+    assert cache.stats.misses == 2
+
+
+def test_lru_eviction():
+    # Room for two 300-byte images
+    cache = QOIDecodeCache(max_bytes=600)
+    a, b, c = encoded_image(1), encoded_image(2), encoded_image(3)
+
+    cache.decode(a)
+    cache.decode(b)
+    cache.decode(a)  # b is now the least recently used image
+    cache.decode(c)
+
+    assert cache.stats.evictions == 1
+    assert cache.stats.nbytes == 600
+    cache.decode(a)
+    assert cache.stats.hits == 2
+    cache.decode(b)
+    assert cache.stats.misses == 4
+
+
+def test_images_over_budget_are_not_cached():
+    cache = QOIDecodeCache(max_bytes=100)
+
+    image = cache.decode(encoded_image(1))
+
+    assert image.data.shape == (10, 10, 3)
+    assert len(cache) == 0 and cache.stats.evictions == 0
+
+
+def test_decode_file_invalidates_modified_files(tmp_path: Path):
+    cache = QOIDecodeCache(max_bytes=10**8)
+    path = tmp_path / "image.qoi"
+    shutil.copy(ASSETS_PATH / "dice.qoi", path)
+
+    first = cache.decode_file(path)
+    assert cache.decode_file(str(path)).data is first.data
+
+    path.write_bytes(encoded_image(7))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    modified = cache.decode_file(path)
+
+    assert modified.data.shape == (10, 10, 3)
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test_clear():
+    cache = QOIDecodeCache(max_bytes=10_000)
+    cache.decode(encoded_image(1))
+
+    cache.clear()
+
+    assert len(cache) == 0 and cache.stats.nbytes == 0
+
+
+def test_thread_safety():
+    cache = QOIDecodeCache(max_bytes=1_500)
+    images = [encoded_image(value) for value in range(8)]
+    errors = []
+
+    def worker(seed: int):
+        rng = np.random.default_rng(seed)
+        try:
+            for value in rng.integers(0, 8, 200):
+                assert cache.decode(images[value]).data[0, 0, 0] == value
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats
+    assert not errors
+    assert stats.hits + stats.misses == 8 * 200
+    assert stats.nbytes == 300 * stats.entries <= 1_500
@@ -1,7 +1,15 @@
-from qoi_py import qoi_decode
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from qoi_py import qoi_decode, qoi_decode_file, qoi_encode
 from qoi_py.types import QOIChannelCount, QOIColorspace
+from qoi_py.backend import available_backends, load_backend, use_backend
 from qoi_py._structure import QOIHeader, END_MARKER
 
+ASSETS_PATH = Path(__file__).parent / "assets"
+
 
 def test_decode_minimal_rgb():
     header = QOIHeader(
@@ -348,3 +356,225 @@ def test_decode_index_use_multiple_times():
     assert tuple(img.data[0][2]) == px2
     assert tuple(img.data[0][3]) == px2
     assert tuple(img.data[0][4]) == px1
+
+
+def test_decode_index_never_written():
+    header = QOIHeader(
+        width=2,
+        height=1,
+        channels=QOIChannelCount.RGBA,
+        colorspace=QOIColorspace.SRGB,
+    ).to_bytes()
+    # RGBA opcode (0xFF) (r=10, g=20, b=30, a=40) -> hash is 12
+    # Index opcode (0x00) -> index 5 still holds the initial (0, 0, 0, 0)
+    data = header + bytes([0xFF, 10, 20, 30, 40, 0x05]) + END_MARKER
+    img = qoi_decode(data, QOIChannelCount.RGBA)
+
+    assert tuple(img.data[0][0]) == (10, 20, 30, 40)
+    assert tuple(img.data[0][1]) == (0, 0, 0, 0)
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_decode_deltas_wrap_around(backend: str):
+    """DIFF and LUMA deltas wrap around and keep the running index in sync."""
+    header = QOIHeader(
+        width=7,
+        height=1,
+        channels=QOIChannelCount.RGBA,
+        colorspace=QOIColorspace.SRGB,
+    ).to_bytes()
+    # fmt: off
+    data = header + bytes(
+        [
+            0xFF, 10, 20, 30, 40,  # RGBA opcode (0xFF) (r=10, g=20, b=30, a=40)
+            0x05,                  # INDEX opcode, index 5 holds (0, 0, 0, 0), hash is 0
+            0x57,                  # DIFF opcode (-1, -1, +1) -> (255, 255, 1, 0), hash is 63
+            0xA2, 0x80,            # LUMA opcode (+2, +2, -6) -> (1, 1, 251, 0), hash is 37
+            0x3F,                  # INDEX opcode and index 63
+            0x00,                  # INDEX opcode and index 0
+            0x25,                  # INDEX opcode and index 37
+        ]
+    ) + END_MARKER
+    # fmt: on
+    with use_backend(backend):
+        img = qoi_decode(data, QOIChannelCount.RGBA)
+
+    assert img.data[0].tolist() == [
+        [10, 20, 30, 40],
+        [0, 0, 0, 0],
+        [255, 255, 1, 0],
+        [1, 1, 251, 0],
+        [255, 255, 1, 0],
+        [0, 0, 0, 0],
+        [1, 1, 251, 0],
+    ]
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize(
+    "qoi_image", sorted(ASSETS_PATH.glob("*.qoi")), ids=lambda path: path.stem
+)
+def test_decoder_matches_reference(backend: str, qoi_image: Path):
+    """Every backend must produce the same pixels as the reference decoder."""
+    data = qoi_image.read_bytes()
+    header = QOIHeader.from_bytes(data[:14])
+    n_pixels = header.width * header.height
+
+    expected = np.empty((n_pixels, header.channels.value), dtype=np.uint8)
+    load_backend("python").decode_pixels(data, expected)
+    actual = np.empty_like(expected)
+    load_backend(backend).decode_pixels(data, actual)
+
+    assert np.array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("channels", [3, 4])
+def test_decode_index_chains(channels: int):
+    """INDEX opcodes that copy pixels which were themselves copied."""
+    rng = np.random.default_rng(channels)
+    palette = rng.integers(0, 256, (6, channels), dtype=np.uint8)
+    image = palette[rng.integers(0, 6, (32, 32))]
+    image[::3, ::5] += rng.integers(0, 2, (channels,), dtype=np.uint8)
+
+    assert np.array_equal(qoi_decode(qoi_encode(image)).data, image)
+
+
+@pytest.mark.parametrize(
+    "qoi_image", sorted(ASSETS_PATH.glob("*.qoi")), ids=lambda path: path.stem
+)
+def test_decode_file_matches_decode(qoi_image: Path):
+    img = qoi_decode_file(qoi_image)
+
+    assert np.array_equal(img.data, qoi_decode(qoi_image.read_bytes()).data)
+
+
+def test_decode_file_empty(tmp_path: Path):
+    path = tmp_path / "empty.qoi"
+    path.write_bytes(b"")
+
+    with pytest.raises(ValueError, match="Invalid QOI header"):
+        qoi_decode_file(path)
+
+
+def test_decode_file_error_is_raised():
+    """A decoding error must not be hidden by failing to unmap the file."""
+    with pytest.raises(ValueError, match="out must"):
+        qoi_decode_file(
+            ASSETS_PATH / "testcard_rgba.qoi", out=np.empty((1, 1, 4), np.uint8)
+        )
+
+
+def test_decode_error_keeps_traceback():
+    data = (ASSETS_PATH / "testcard_rgba.qoi").read_bytes()
+
+    with pytest.raises(ValueError, match="out must") as error:
+        qoi_decode(data, out=np.empty((1, 1, 4), np.uint8))
+
+    # The traceback reaches into the function which raised the error
+    assert error.traceback[-1].name != "qoi_decode"
+
+
+def test_decode_file_invalid_header(tmp_path: Path):
+    path = tmp_path / "invalid.qoi"
+    path.write_bytes(b"x" * 30)
+
+    with pytest.raises(ValueError, match="Invalid QOI header"):
+        qoi_decode_file(path)
+
+
+def test_decode_buffer_protocol():
+    data = (ASSETS_PATH / "testcard_rgba.qoi").read_bytes()
+    expected = qoi_decode(data).data
+
+    assert np.array_equal(qoi_decode(memoryview(data)).data, expected)
+    assert np.array_equal(qoi_decode(bytearray(data)).data, expected)
+    assert np.array_equal(qoi_decode(np.frombuffer(data, np.uint8)).data, expected)
+
+
+def test_decode_into_out():
+    data = (ASSETS_PATH / "testcard_rgba.qoi").read_bytes()
+    expected = qoi_decode(data).data
+    out = np.zeros_like(expected)
+
+    for _ in range(2):
+        img = qoi_decode(data, out=out)
+
+        assert img.data is out
+        assert np.array_equal(out, expected)
+
+
+def test_decode_into_writable_buffer():
+    data = (ASSETS_PATH / "testcard.qoi").read_bytes()
+    expected = qoi_decode(data, QOIChannelCount.RGB).data
+    out = bytearray(expected.nbytes)
+
+    qoi_decode(data, QOIChannelCount.RGB, out=out)
+
+    assert bytes(out) == expected.tobytes()
+
+
+@pytest.mark.parametrize(
+    "out",
+    [
+        np.empty((256, 256, 3), dtype=np.uint8),  # channels do not match
+        np.empty((256, 256, 4), dtype=np.uint16),
+        np.empty((256, 256, 4, 2), dtype=np.uint8)[..., 0],  # not contiguous
+        bytearray(256 * 256 * 4 - 1),
+        bytes(256 * 256 * 4),  # read-only
+    ],
+    ids=["shape", "dtype", "contiguous", "size", "readonly"],
+)
+def test_decode_into_invalid_out(out):
+    data = (ASSETS_PATH / "testcard_rgba.qoi").read_bytes()
+
+    with pytest.raises(ValueError, match="out must"):
+        qoi_decode(data, out=out)
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("channels", [QOIChannelCount.RGB, QOIChannelCount.RGBA])
+@pytest.mark.parametrize("premultiply_alpha", [False, True])
+@pytest.mark.parametrize("qoi_image", ["testcard_rgba", "kodim23"])
+def test_decode_conversions(
+    backend: str,
+    channels: QOIChannelCount,
+    premultiply_alpha: bool,
+    qoi_image: str,
+):
+    """Conversions while decoding match converting the decoded image."""
+    data = (ASSETS_PATH / f"{qoi_image}.qoi").read_bytes()
+    image = qoi_decode(data).data.astype(np.int64)
+    if image.shape[2] == 4:
+        alpha = image[..., 3:]
+    else:
+        # alpha_fill only applies when there is an alpha channel to fill
+        fill = 40 if channels == QOIChannelCount.RGBA else 255
+        alpha = np.full_like(image[..., :1], fill)
+    expected = np.concatenate([image[..., :3], alpha], axis=2)
+    if premultiply_alpha:
+        expected[..., :3] = (expected[..., :3] * alpha + 127) // 255
+
+    with use_backend(backend):
+        decoded = qoi_decode(
+            data, channels, premultiply_alpha=premultiply_alpha, alpha_fill=40
+        )
+
+    assert np.array_equal(decoded.data, expected[..., : channels.value])
+
+
+def test_decode_rgb_from_rgba_drops_alpha():
+    # RGBA opcode (0xFF) (r=10, g=20, b=30, a=40)
+    data = QOIHeader(1, 1, QOIChannelCount.RGBA, QOIColorspace.SRGB).to_bytes()
+    data += bytes([0xFF, 10, 20, 30, 40]) + END_MARKER
+
+    assert qoi_decode(data, QOIChannelCount.RGB).data.tolist() == [[[10, 20, 30]]]
+    premultiplied = qoi_decode(data, premultiply_alpha=True).data
+    assert premultiplied.tolist() == [[[2, 3, 5, 40]]]
+
+
+@pytest.mark.parametrize("alpha_fill", [-1, 256])
+def test_decode_invalid_alpha_fill(alpha_fill: int):
+    data = (ASSETS_PATH / "kodim23.qoi").read_bytes()
+
+    with pytest.raises(ValueError, match="alpha_fill"):
+        qoi_decode(data, QOIChannelCount.RGBA, alpha_fill=alpha_fill)
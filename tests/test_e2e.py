@@ -6,6 +6,14 @@ import numpy as np
 from typing import Any
 
 from qoi_py import qoi_decode, qoi_encode
+from qoi_py.backend import available_backends, use_backend
+
+
+@pytest.fixture(autouse=True, params=available_backends())
+def backend(request: pytest.FixtureRequest):
+    """Run every end-to-end test against every available backend."""
+    with use_backend(request.param):
+        yield request.param
 
 
 def get_test_images_map_and_ids() -> tuple[list[tuple[Path, Path]], list[str]]:
@@ -0,0 +1,164 @@
+import numpy as np
+import pytest
+
+from qoi_py import qoi_decode, qoi_encode, qoi_max_encoded_size
+from qoi_py.backend import available_backends, load_backend, use_backend
+from qoi_py._structure import QOIHeader, END_MARKER
+from qoi_py.types import QOIChannelCount, QOIColorspace
+
+
+def random_images(channels: int) -> dict[str, np.ndarray]:
+    """Images which exercise every opcode of the encoder."""
+    rng = np.random.default_rng(channels)
+    smooth = np.cumsum(rng.integers(-3, 4, (24, 40, channels)), axis=1)
+    few_colors = rng.integers(0, 3, (24, 40, channels)) * 90
+    long_runs = np.repeat(rng.integers(0, 256, (3, 1, channels)), 200, axis=1)
+    images = {
+        "noise": rng.integers(0, 256, (24, 40, channels)),
+        "smooth": smooth,
+        "few_colors": few_colors,
+        "long_runs": long_runs,
+        "empty": np.zeros((0, 4, channels)),
+    }
+    if channels == 4:
+        for image in images.values():
+            image[..., 3] = rng.choice([0, 128, 255, 255, 255], image.shape[:2])
+    return {name: image.astype(np.uint8) for name, image in images.items()}
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("channels", [QOIChannelCount.RGB, QOIChannelCount.RGBA])
+@pytest.mark.parametrize(
+    "name", ["noise", "smooth", "few_colors", "long_runs", "empty"]
+)
+def test_encoder_matches_reference(backend: str, channels: QOIChannelCount, name: str):
+    """Every backend must produce the same bytes as the reference encoder."""
+    image = random_images(channels.value)[name]
+    flat_pixels = image.reshape(-1, channels.value)
+
+    max_size = len(flat_pixels) * (channels.value + 1)
+
+    expected = np.zeros(max_size, dtype=np.uint8)
+    expected_size = load_backend("python").encode_pixels(
+        flat_pixels, channels, expected
+    )
+    actual = np.zeros(max_size, dtype=np.uint8)
+    actual_size = load_backend(backend).encode_pixels(flat_pixels, channels, actual)
+
+    assert actual_size == expected_size
+    assert np.array_equal(actual, expected)
+
+
+def test_encode_run_longer_than_62():
+    image = np.zeros((1, 130, 3), dtype=np.uint8)
+    header = QOIHeader(
+        width=130,
+        height=1,
+        channels=QOIChannelCount.RGB,
+        colorspace=QOIColorspace.SRGB,
+    ).to_bytes()
+    # (0, 0, 0) with its implicit alpha of 255 equals the start pixel, so the
+    # whole image is one run: 62 + 62 + 6
+    assert qoi_encode(image) == header + bytes([0xFD, 0xFD, 0xC5]) + END_MARKER
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("channels", [QOIChannelCount.RGB, QOIChannelCount.RGBA])
+def test_max_encoded_size_is_reached_by_worst_case(
+    backend: str, channels: QOIChannelCount
+):
+    """Noise which changes alpha with every pixel needs a full opcode for each."""
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (16, 16, channels.value), dtype=np.uint8)
+    if channels == QOIChannelCount.RGBA:
+        image[..., 3] = np.arange(256).reshape(16, 16)
+
+    with use_backend(backend):
+        encoded = qoi_encode(image)
+
+    assert len(encoded) == qoi_max_encoded_size(16, 16, channels)
+
+
+def test_max_encoded_size():
+    assert qoi_max_encoded_size(0, 0, QOIChannelCount.RGB) == 14 + 8
+    assert qoi_max_encoded_size(3, 2, QOIChannelCount.RGB) == 14 + 6 * 4 + 8
+    assert qoi_max_encoded_size(3, 2, QOIChannelCount.RGBA) == 14 + 6 * 5 + 8
+
+
+@pytest.mark.parametrize("make_out", [bytearray, lambda n: memoryview(bytearray(n))])
+def test_encode_into_out(make_out):
+    image = random_images(4)["smooth"]
+    expected = qoi_encode(image)
+    out = make_out(qoi_max_encoded_size(40, 24, QOIChannelCount.RGBA) + 10)
+
+    used = qoi_encode(image, out=out)
+
+    assert used == len(expected)
+    assert bytes(out[:used]) == expected
+
+
+def test_encode_into_reused_out():
+    out = bytearray(qoi_max_encoded_size(40, 24, QOIChannelCount.RGB))
+    for name, image in random_images(3).items():
+        if image.shape != (24, 40, 3):
+            continue
+        used = qoi_encode(image, out=out)
+        assert bytes(out[:used]) == qoi_encode(image), name
+
+
+@pytest.mark.parametrize(
+    "out",
+    [
+        bytearray(10),
+        bytes(qoi_max_encoded_size(40, 24, QOIChannelCount.RGB)),
+        memoryview(bytearray(2 * qoi_max_encoded_size(40, 24, QOIChannelCount.RGB)))[
+            ::2
+        ],
+    ],
+    ids=["too_small", "readonly", "not_contiguous"],
+)
+def test_encode_into_invalid_out(out):
+    with pytest.raises(ValueError, match="out must"):
+        qoi_encode(random_images(3)["noise"], out=out)
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("channels", [QOIChannelCount.RGB, QOIChannelCount.RGBA])
+@pytest.mark.parametrize("tolerance", [1, 3, 20])
+def test_lossy_encoding(backend: str, channels: QOIChannelCount, tolerance: int):
+    """Lossy output decodes within the tolerance, the same for every backend."""
+    image = random_images(channels.value)["smooth"]
+    image = np.concatenate([image, random_images(channels.value)["noise"]])
+
+    with use_backend("python"):
+        expected = qoi_encode(image, tolerance=tolerance)
+    with use_backend(backend):
+        encoded = qoi_encode(image, tolerance=tolerance)
+
+    assert encoded == expected
+    assert len(encoded) < len(qoi_encode(image))
+    decoded = qoi_decode(encoded).data
+    assert np.abs(decoded.astype(int) - image).max() <= tolerance
+
+
+def test_lossy_encoding_snaps_into_diff():
+    # (0, 0, 0) -> (3, 0, 0) is just outside of the DIFF range
+    image = np.array([[[0, 0, 0], [3, 0, 0]]], dtype=np.uint8)
+
+    encoded = qoi_encode(image, tolerance=2)
+
+    # A run of the start pixel, then a DIFF of (1, 0, 0)
+    assert encoded[14:-8] == bytes([0xC0, 0x40 | (3 << 4) | (2 << 2) | 2])
+    assert qoi_decode(encoded).data.tolist() == [[[0, 0, 0], [1, 0, 0]]]
+
+
+def test_lossy_encoding_with_zero_tolerance_is_lossless():
+    image = random_images(4)["noise"]
+
+    assert qoi_encode(image, tolerance=0) == qoi_encode(image)
+
+
+@pytest.mark.parametrize("tolerance", [-1, 256])
+def test_invalid_tolerance(tolerance: int):
+    with pytest.raises(ValueError, match="tolerance"):
+        qoi_encode(np.zeros((2, 2, 3), dtype=np.uint8), tolerance=tolerance)
@@ -16,3 +16,11 @@ def test_header_serialization(header_data: bytes):
 
 
 # TODO: Add invalid header tests
+
+
+def test_header_from_buffer():
+    header_data = b"qoif\x00\x00\x00\x05\x00\x00\x00\x08\x03\x00"
+    expected = QOIHeader.from_bytes(header_data)
+
+    assert QOIHeader.from_bytes(memoryview(header_data + b"\xfe")) == expected
+    assert QOIHeader.from_bytes(bytearray(header_data)) == expected
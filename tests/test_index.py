@@ -0,0 +1,139 @@
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from qoi_py import QOIIndex, qoi_decode_file, qoi_encode, qoi_probe
+from qoi_py.types import QOIChannelCount, QOIColorspace
+
+ASSETS_PATH = Path(__file__).parent / "assets"
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    """A directory tree with QOI files at several levels."""
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    shutil.copy(ASSETS_PATH / "dice.qoi", tmp_path / "dice.qoi")
+    shutil.copy(ASSETS_PATH / "qoi_logo.qoi", tmp_path / "a" / "logo.qoi")
+    shutil.copy(ASSETS_PATH / "edgecase.qoi", tmp_path / "a" / "b" / "edge.QOI")
+    shutil.copy(ASSETS_PATH / "dice.png", tmp_path / "a" / "dice.png")
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "qoi_image", sorted(ASSETS_PATH.glob("*.qoi")), ids=lambda path: path.stem
+)
+def test_probe_matches_decode(qoi_image: Path):
+    header = qoi_probe(qoi_image)
+    image = qoi_decode_file(qoi_image)
+
+    assert (header.height, header.width, header.channels) == image.data.shape
+    assert header.colorspace == image.colorspace
+    assert qoi_probe(qoi_image.read_bytes()) == header
+    assert qoi_probe(str(qoi_image)) == header
+
+
+def test_probe_invalid():
+    with pytest.raises(ValueError, match="Invalid QOI header"):
+        qoi_probe(b"qoif")
+
+
+def test_index_tree(tree: Path):
+    index = QOIIndex(tree)
+    assert len(index) == 0
+
+    assert index.refresh() == 3
+
+    assert sorted(index.paths) == ["a/b/edge.QOI", "a/logo.qoi", "dice.qoi"]
+    entry = index["a/logo.qoi"]
+    assert entry.header == qoi_probe(tree / "a" / "logo.qoi")
+    assert entry.size == (tree / "a" / "logo.qoi").stat().st_size
+    assert "dice.qoi" in index and "a/dice.png" not in index
+    assert {entry.path for entry in index} == set(index.paths)
+
+
+def test_index_is_cached(tree: Path):
+    QOIIndex(tree).refresh()
+
+    index = QOIIndex(tree)
+
+    assert len(index) == 3
+    assert index["dice.qoi"].header.channels == QOIChannelCount.RGBA
+    assert np.array_equal(
+        np.sort(index.records["width"]),
+        sorted(qoi_probe(tree / path).width for path in index.paths),
+    )
+
+
+def test_index_refreshes_incrementally(tree: Path):
+    index = QOIIndex(tree)
+    index.refresh()
+    assert index.refresh() == 0
+
+    image = np.zeros((3, 7, 3), dtype=np.uint8)
+    (tree / "a" / "logo.qoi").write_bytes(qoi_encode(image, QOIColorspace.LINEAR_RGB))
+    (tree / "new.qoi").write_bytes(qoi_encode(image))
+    (tree / "dice.qoi").unlink()
+    (tree / "broken.qoi").write_bytes(b"not a qoi image")
+
+    assert index.refresh() == 4
+
+    assert sorted(index.paths) == ["a/b/edge.QOI", "a/logo.qoi", "new.qoi"]
+    header = QOIIndex(tree)["a/logo.qoi"].header
+    assert (header.width, header.height) == (7, 3)
+    assert header.colorspace == QOIColorspace.LINEAR_RGB
+
+
+def test_index_remembers_invalid_files(tree: Path):
+    broken = tree / "broken.qoi"
+    broken.write_bytes(b"not a qoi image")
+    index = QOIIndex(tree)
+    assert index.refresh() == 4
+    cache_mtime = (tree / ".qoi_index").stat().st_mtime_ns
+
+    # Invalid files are remembered by the cache as well
+    assert QOIIndex(tree).refresh() == 0
+    assert (tree / ".qoi_index").stat().st_mtime_ns == cache_mtime
+    assert "broken.qoi" not in QOIIndex(tree)
+
+    broken.write_bytes(qoi_encode(np.zeros((2, 2, 3), dtype=np.uint8)))
+    assert index.refresh() == 1
+    assert index["broken.qoi"].header.width == 2
+
+    broken.unlink()
+    (tree / "other.qoi").write_bytes(b"not a qoi image either")
+    assert index.refresh() == 2
+    other = tree / "other.qoi"
+    other.unlink()
+    assert index.refresh() == 1
+
+
+def test_index_unchanged_files_are_not_read(tree: Path):
+    index = QOIIndex(tree)
+    index.refresh()
+    path = tree / "dice.qoi"
+    stat = path.stat()
+    # Same size and modification time, but different content
+    path.write_bytes(b"x" * stat.st_size)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert index.refresh() == 0
+    assert index["dice.qoi"].header.width == 800
+
+
+def test_index_custom_cache_path(tree: Path, tmp_path_factory):
+    cache_path = tmp_path_factory.mktemp("cache") / "index.bin"
+
+    QOIIndex(tree, cache_path).refresh()
+
+    assert cache_path.exists() and not (tree / ".qoi_index").exists()
+    assert len(QOIIndex(tree, cache_path)) == 3
+
+
+def test_index_invalid_cache(tree: Path):
+    (tree / ".qoi_index").write_bytes(b"garbage")
+
+    with pytest.raises(ValueError, match="not a QOI index"):
+        QOIIndex(tree)
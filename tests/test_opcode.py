@@ -1,4 +1,15 @@
-from qoi_py._opcodes import QOIOpcode
+from qoi_py._opcodes import (
+    QOIOpcode,
+    DIFF_BYTE_OF_DELTAS,
+    DIFF_DELTAS,
+    LUMA_BYTE_OF_GREEN_DELTA,
+    LUMA_BYTE_OF_RED_BLUE_DELTAS,
+    LUMA_GREEN_DELTA,
+    LUMA_RED_BLUE_DELTAS,
+    OPCODE_OF_BYTE,
+    PIXELS_OF_BYTE,
+    SIZE_OF_BYTE,
+)
 import pytest
 
 
@@ -23,3 +34,37 @@ import pytest
 def test_opcode(byte: int, expected_opcode: QOIOpcode):
     """Test the QOIOpcode.from_byte method."""
     assert QOIOpcode.from_byte(byte) == expected_opcode
+
+
+def test_dispatch_tables():
+    """The tables agree with QOIOpcode.from_byte and the specification."""
+    for byte in range(256):
+        opcode = QOIOpcode.from_byte(byte)
+        assert OPCODE_OF_BYTE[byte] is opcode
+        assert PIXELS_OF_BYTE[byte] == (
+            (byte & 0x3F) + 1 if opcode == QOIOpcode.RUN else 1
+        )
+
+    assert SIZE_OF_BYTE[0x00] == SIZE_OF_BYTE[0x40] == SIZE_OF_BYTE[0xC0] == 1
+    assert SIZE_OF_BYTE[0x80] == 2
+    assert SIZE_OF_BYTE[QOIOpcode.RGB] == 4
+    assert SIZE_OF_BYTE[QOIOpcode.RGBA] == 5
+
+    assert DIFF_DELTAS[0b01_00_10_11] == (-2, 0, 1)
+    assert LUMA_GREEN_DELTA[0b10_000000] == -32
+    assert LUMA_RED_BLUE_DELTAS[0x0F] == (-8, 7)
+
+
+def test_encoder_tables_invert_decoder_tables():
+    for deltas, byte in DIFF_BYTE_OF_DELTAS.items():
+        assert OPCODE_OF_BYTE[byte] == QOIOpcode.DIFF
+        assert DIFF_DELTAS[byte] == deltas
+    for gdiff, byte in LUMA_BYTE_OF_GREEN_DELTA.items():
+        assert OPCODE_OF_BYTE[byte] == QOIOpcode.LUMA
+        assert LUMA_GREEN_DELTA[byte] == gdiff
+    for deltas, byte in LUMA_BYTE_OF_RED_BLUE_DELTAS.items():
+        assert LUMA_RED_BLUE_DELTAS[byte] == deltas
+
+    assert len(DIFF_BYTE_OF_DELTAS) == 64
+    assert (2, 0, 0) not in DIFF_BYTE_OF_DELTAS
+    assert 32 not in LUMA_BYTE_OF_GREEN_DELTA
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from qoi_py import qoi_hash_array
+from qoi_py._pixel import Pixel
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("channels", [3, 4])
+def test_hash_array_matches_pixel_hash(seed: int, channels: int):
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (1000, channels), dtype=np.uint8)
+
+    positions = qoi_hash_array(pixels)
+
+    expected = [
+        Pixel(*pixel, *([255] * (4 - channels))).hash() for pixel in pixels.tolist()
+    ]
+    assert positions.dtype == np.uint8
+    assert positions.tolist() == expected
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.int16, np.int64, np.uint64])
+def test_hash_array_extremes(dtype: type):
+    pixels = np.array([[0, 0, 0, 0], [255, 255, 255, 255], [0, 0, 0, 255]], dtype)
+
+    assert qoi_hash_array(pixels).tolist() == [0, (26 * 255) % 64, (11 * 255) % 64]
+    assert qoi_hash_array(pixels[:, :3]).tolist() == [
+        (11 * 255) % 64,
+        (26 * 255) % 64,
+        (11 * 255) % 64,
+    ]
+
+
+def test_hash_array_wraps_large_values():
+    # Values beyond int32 keep the weighted sum exact modulo 64
+    pixels = np.array([[2**40 + 1, 2**33 + 2, 3, 2**63 + 4]], dtype=np.uint64)
+
+    assert qoi_hash_array(pixels).tolist() == [(1 * 3 + 2 * 5 + 3 * 7 + 4 * 11) % 64]
+
+
+def test_hash_array_empty():
+    assert qoi_hash_array(np.empty((0, 4), dtype=np.uint8)).shape == (0,)
+
+
+@pytest.mark.parametrize("shape", [(4,), (2, 2), (2, 5), (2, 2, 4)])
+def test_hash_array_invalid_shape(shape: tuple[int, ...]):
+    with pytest.raises(ValueError, match="Expected an array of shape"):
+        qoi_hash_array(np.zeros(shape, dtype=np.uint8))
@@ -0,0 +1,96 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from qoi_py import (
+    qoi_best_scan_order,
+    qoi_decode,
+    qoi_decode_file,
+    qoi_decode_scan,
+    qoi_encode,
+    qoi_encode_scan,
+)
+from qoi_py._scan import scan_permutation
+from qoi_py._structure import QOIScanHeader
+from qoi_py.types import QOIChannelCount, QOIColorspace, QOIScanOrder
+
+ASSETS_PATH = Path(__file__).parent / "assets"
+
+
+@pytest.mark.parametrize("order", list(QOIScanOrder))
+@pytest.mark.parametrize("shape", [(5, 7), (16, 16), (1, 9), (13, 1), (0, 3)])
+def test_scan_permutation(order: QOIScanOrder, shape: tuple[int, int]):
+    permutation = scan_permutation(order, *shape)
+
+    assert np.array_equal(np.sort(permutation), np.arange(shape[0] * shape[1]))
+    assert permutation.dtype == np.int32
+
+
+def test_scan_orders():
+    assert scan_permutation(QOIScanOrder.COLUMN_MAJOR, 2, 3).tolist() == [
+        0, 3, 1, 4, 2, 5
+    ]  # fmt: skip
+    assert scan_permutation(QOIScanOrder.SERPENTINE, 2, 3).tolist() == [
+        0, 1, 2, 5, 4, 3
+    ]  # fmt: skip
+    tiles = scan_permutation(QOIScanOrder.TILES, 16, 16)
+    assert tiles[:9].tolist() == [0, 1, 2, 3, 4, 5, 6, 7, 16]
+    # Consecutive pixels of a Hilbert curve are always neighbors
+    y, x = np.divmod(scan_permutation(QOIScanOrder.HILBERT, 16, 16), 16)
+    assert np.all(np.abs(np.diff(x)) + np.abs(np.diff(y)) == 1)
+
+
+@pytest.mark.parametrize("order", list(QOIScanOrder))
+@pytest.mark.parametrize("qoi_image", ["testcard_rgba", "edgecase"])
+def test_roundtrip(order: QOIScanOrder, qoi_image: str):
+    image = qoi_decode_file(ASSETS_PATH / f"{qoi_image}.qoi").data
+
+    encoded = qoi_encode_scan(image, order, QOIColorspace.LINEAR_RGB)
+
+    assert QOIScanHeader.from_bytes(encoded).order == order
+    decoded = qoi_decode_scan(encoded)
+    assert decoded.colorspace == QOIColorspace.LINEAR_RGB
+    assert np.array_equal(decoded.data, image)
+
+
+def test_payload_is_a_standard_qoi_image():
+    image = np.arange(24, dtype=np.uint8).reshape(2, 4, 3)
+
+    encoded = qoi_encode_scan(image, QOIScanOrder.COLUMN_MAJOR)
+
+    scanned = qoi_decode(encoded[QOIScanHeader(QOIScanOrder.ROW_MAJOR).size :])
+    assert np.array_equal(
+        scanned.data.reshape(-1, 3), image.transpose(1, 0, 2).reshape(-1, 3)
+    )
+
+
+def test_decode_channels():
+    image = qoi_decode_file(ASSETS_PATH / "edgecase.qoi").data
+
+    decoded = qoi_decode_scan(
+        qoi_encode_scan(image, QOIScanOrder.HILBERT), QOIChannelCount.RGB
+    )
+
+    assert np.array_equal(decoded.data, image[..., :3])
+
+
+def test_best_scan_order():
+    # Vertical stripes compress best column by column
+    stripes = np.zeros((64, 64, 3), dtype=np.uint8)
+    stripes[:, ::2] = np.random.default_rng(0).integers(0, 256, (1, 32, 3))
+
+    assert qoi_best_scan_order(stripes) == QOIScanOrder.COLUMN_MAJOR
+    assert (
+        qoi_best_scan_order(stripes, [QOIScanOrder.ROW_MAJOR, QOIScanOrder.TILES])
+        == QOIScanOrder.TILES
+    )
+    encoded = qoi_encode_scan(stripes)
+    assert QOIScanHeader.from_bytes(encoded).order == QOIScanOrder.COLUMN_MAJOR
+    assert len(encoded) < len(qoi_encode(stripes))
+
+
+@pytest.mark.parametrize("data", [b"", b"qoif" + bytes(30), b"qoio\x09" + bytes(30)])
+def test_invalid_header(data: bytes):
+    with pytest.raises(ValueError, match="Invalid reordered QOI header|Unknown"):
+        qoi_decode_scan(data)
@@ -0,0 +1,113 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from qoi_py import (
+    QOISequenceReader,
+    QOISequenceWriter,
+    qoi_decode,
+    qoi_decode_file,
+    qoi_encode,
+)
+from qoi_py._structure import QOISequenceIndex
+from qoi_py.types import QOIChannelCount, QOIColorspace
+
+ASSETS_PATH = Path(__file__).parent / "assets"
+
+
+@pytest.fixture(scope="module")
+def frames() -> list[np.ndarray]:
+    image = qoi_decode_file(ASSETS_PATH / "testcard_rgba.qoi").data
+    return [np.roll(image, shift, axis=0) for shift in range(0, 64, 16)]
+
+
+def test_roundtrip(frames: list[np.ndarray], tmp_path: Path):
+    path = tmp_path / "frames.qois"
+    with QOISequenceWriter(path) as writer:
+        numbers = [writer.append(frame) for frame in frames]
+
+    assert numbers == list(range(len(frames)))
+    with QOISequenceReader.open(path) as sequence:
+        assert len(sequence) == len(frames)
+        for decoded, frame in zip(sequence, frames):
+            assert np.array_equal(decoded.data, frame)
+
+
+def test_frames_are_qoi_images(frames: list[np.ndarray], tmp_path: Path):
+    path = tmp_path / "frames.qois"
+    with QOISequenceWriter(path) as writer:
+        writer.append(frames[0], QOIColorspace.LINEAR_RGB)
+        writer.append(frames[1][:10, :20, :3])
+
+    data = path.read_bytes()
+    # The file starts with the first frame
+    assert qoi_decode(data).colorspace == QOIColorspace.LINEAR_RGB
+    sequence = QOISequenceReader(data)
+    assert bytes(sequence.frame(1)) == qoi_encode(frames[1][:10, :20, :3])
+    with pytest.raises(IndexError):
+        sequence.frame(2)
+
+
+def test_append_keeps_existing_frames(frames: list[np.ndarray], tmp_path: Path):
+    path = tmp_path / "frames.qois"
+    with QOISequenceWriter(path) as writer:
+        writer.append(frames[0])
+        writer.append(frames[1])
+    before = path.read_bytes()
+    index = QOISequenceIndex.from_bytes(before)
+
+    with QOISequenceWriter(path) as writer:
+        assert len(writer) == 2
+        assert writer.append_encoded(qoi_encode(frames[2])) == 2
+
+    after = path.read_bytes()
+    assert after[: index.offsets[-1]] == before[: index.offsets[-1]]
+    with QOISequenceReader.open(path) as sequence:
+        assert np.array_equal(sequence.decode(2).data, frames[2])
+        assert np.array_equal(sequence.decode(0).data, frames[0])
+
+
+def test_decode_options(frames: list[np.ndarray], tmp_path: Path):
+    path = tmp_path / "frames.qois"
+    rgb = frames[0][..., :3].copy()
+    with QOISequenceWriter(path) as writer:
+        writer.append(rgb)
+
+    out = np.empty((*rgb.shape[:2], 4), dtype=np.uint8)
+    with QOISequenceReader.open(path) as sequence:
+        decoded = sequence.decode(0, QOIChannelCount.RGBA, out=out)
+
+    assert decoded.data is out
+    assert np.array_equal(out[..., :3], rgb)
+
+
+def test_empty_sequence(tmp_path: Path):
+    path = tmp_path / "frames.qois"
+    QOISequenceWriter(path).close()
+
+    with QOISequenceReader.open(path) as sequence:
+        assert len(sequence) == 0
+        assert list(sequence) == []
+
+
+def test_invalid_sequence(frames: list[np.ndarray], tmp_path: Path):
+    image = qoi_encode(frames[0])
+    with pytest.raises(ValueError, match="Invalid QOI sequence index"):
+        QOISequenceReader(image)
+
+    path = tmp_path / "image.qoi"
+    path.write_bytes(image)
+    with pytest.raises(ValueError, match="Invalid QOI sequence index"):
+        QOISequenceWriter(path)
+    with pytest.raises(ValueError, match="Invalid QOI header"):
+        with QOISequenceWriter(tmp_path / "frames.qois") as writer:
+            writer.append_encoded(b"junk")
+
+
+def test_index_roundtrip():
+    index = QOISequenceIndex(offsets=(0, 100, 250))
+
+    assert QOISequenceIndex.from_bytes(b"prefix" + index.to_bytes()) == index
+    assert len(index.to_bytes()) == index.size
+    assert index.frames == 2
@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from qoi_py import qoi_decode, qoi_decode_file, qoi_decode_stack, qoi_encode_stack
+from qoi_py.types import QOIChannelCount, QOIColorspace
+
+ASSETS_PATH = Path(__file__).parent / "assets"
+
+
+@pytest.fixture(scope="module")
+def frames() -> np.ndarray:
+    image = qoi_decode_file(ASSETS_PATH / "testcard_rgba.qoi").data
+    return np.stack([np.roll(image, shift, axis=1) for shift in range(0, 80, 16)])
+
+
+def test_roundtrip(frames: np.ndarray):
+    encoded = qoi_encode_stack(frames, workers=2)
+
+    assert len(encoded) == len(frames)
+    decoded = qoi_decode_stack(encoded, workers=2)
+    assert decoded.flags.c_contiguous
+    assert np.array_equal(decoded, frames)
+
+
+def test_frames_are_independent_qoi_images(frames: np.ndarray):
+    encoded = qoi_encode_stack(frames, QOIColorspace.LINEAR_RGB, workers=1)
+
+    image = qoi_decode(encoded[3])
+    assert image.colorspace == QOIColorspace.LINEAR_RGB
+    assert np.array_equal(image.data, frames[3])
+
+
+def test_decode_into_out(frames: np.ndarray):
+    encoded = qoi_encode_stack(frames)
+    out = np.zeros_like(frames)
+
+    assert qoi_decode_stack(encoded, out=out) is out
+    assert np.array_equal(out, frames)
+
+    with pytest.raises(ValueError, match="out must be"):
+        qoi_decode_stack(encoded, out=out[:-1])
+
+
+def test_decode_channels():
+    frames = np.random.default_rng(0).integers(0, 256, (3, 8, 5, 3), dtype=np.uint8)
+
+    decoded = qoi_decode_stack(qoi_encode_stack(frames), QOIChannelCount.RGBA)
+
+    assert decoded.shape == (3, 8, 5, 4)
+    assert np.array_equal(decoded[..., :3], frames)
+    assert np.all(decoded[..., 3] == 255)
+
+
+def test_decode_rejects_mismatched_frames(frames: np.ndarray):
+    encoded = qoi_encode_stack(frames[:2])
+    encoded.append(qoi_encode_stack(frames[:1, :100])[0])
+
+    with pytest.raises(ValueError, match="Frame 2"):
+        qoi_decode_stack(encoded)
+    with pytest.raises(ValueError, match="at least one frame"):
+        qoi_decode_stack([])
+
+
+def test_encode_rejects_non_stacks(frames: np.ndarray):
+    with pytest.raises(ValueError, match="shape"):
+        qoi_encode_stack(frames[0])
+    with pytest.raises(ValueError, match="uint8"):
+        qoi_encode_stack(frames.astype(np.uint16))
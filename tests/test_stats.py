@@ -0,0 +1,92 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from qoi_py import QOIStats, qoi_decode, qoi_decode_file, qoi_encode
+from qoi_py.backend import available_backends, use_backend
+
+ASSETS_PATH = Path(__file__).parent / "assets"
+
+
+@pytest.mark.parametrize(
+    "qoi_image", sorted(ASSETS_PATH.glob("*.qoi")), ids=lambda path: path.stem
+)
+def test_decode_stats_account_for_stream(qoi_image: Path):
+    data = qoi_image.read_bytes()
+    stats = QOIStats()
+
+    image = qoi_decode(data, stats=stats)
+
+    assert np.array_equal(image.data, qoi_decode(data).data)
+    assert stats.images == 1
+    assert stats.pixels == image.width * image.height
+    assert stats.encoded_bytes == len(data)
+    # Header, opcodes and end marker make up the whole file
+    assert 14 + sum(stats.opcode_bytes.values()) + 8 == len(data)
+    run_pixels = sum(length * count for length, count in stats.run_lengths.items())
+    assert stats.index_lookups + run_pixels == stats.pixels
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_encode_stats_match_decode_stats(backend: str):
+    image = qoi_decode_file(ASSETS_PATH / "testcard_rgba.qoi").data
+    encode_stats, decode_stats = QOIStats(), QOIStats()
+
+    data = qoi_encode(image, stats=encode_stats)
+    with use_backend(backend):
+        # The decoder counts the opcodes itself
+        qoi_decode(data, stats=decode_stats)
+
+    assert data == qoi_encode(image)
+    assert encode_stats.opcode_counts == decode_stats.opcode_counts
+    assert encode_stats.run_lengths == decode_stats.run_lengths
+    assert encode_stats.opcode_bytes == decode_stats.opcode_bytes
+    assert encode_stats.encoded_bytes == len(data)
+
+
+def test_run_length_histogram():
+    stats = QOIStats()
+
+    qoi_encode(np.zeros((1, 130, 3), dtype=np.uint8), stats=stats)
+
+    assert stats.run_lengths == {62: 2, 6: 1}
+    assert stats.opcode_counts["RUN"] == 3
+    assert stats.index_lookups == 0 and stats.index_hit_rate == 0.0
+
+
+def test_index_hit_rate():
+    # Two alternating colors: after the first of each, every pixel is an INDEX
+    image = np.full((1, 100, 3), 50, dtype=np.uint8)
+    image[0, 1::2] = (200, 10, 70)
+    stats = QOIStats()
+
+    qoi_encode(image, stats=stats)
+
+    assert stats.opcode_counts["INDEX"] == 98
+    assert stats.index_hit_rate == pytest.approx(98 / 100)
+
+
+def test_stats_accumulate():
+    stats = QOIStats()
+    data = (ASSETS_PATH / "dice.qoi").read_bytes()
+
+    qoi_decode(data, stats=stats)
+    qoi_decode_file(ASSETS_PATH / "dice.qoi", stats=stats)
+
+    assert stats.images == 2
+    assert stats.encoded_bytes == 2 * len(data)
+    assert {"decode_setup", "decode_opcodes", "analysis"} <= stats.timings.keys()
+
+
+def test_stats_as_dict():
+    stats = QOIStats()
+    qoi_encode(np.full((4, 4, 4), 128, dtype=np.uint8), stats=stats)
+
+    result = stats.as_dict()
+
+    assert result["opcode_counts"]["RGBA"] == 1
+    assert result["bits_per_pixel"] == stats.bits_per_pixel
+    assert {"encode_setup", "encode_opcodes", "encode_output"} <= result[
+        "timings"
+    ].keys()
@@ -0,0 +1,100 @@
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from qoi_py import QOIStreamDecoder, QOIStreamEncoder, qoi_decode, qoi_encode
+from qoi_py.types import QOIChannelCount
+
+ASSETS_PATH = Path(__file__).parent / "assets"
+
+
+@pytest.mark.parametrize("chunk_size, rows_per_band", [(4096, 1), (1 << 16, 64)])
+@pytest.mark.parametrize(
+    "qoi_image", sorted(ASSETS_PATH.glob("*.qoi")), ids=lambda path: path.stem
+)
+def test_stream_decoder_matches_qoi_decode(
+    qoi_image: Path, chunk_size: int, rows_per_band: int
+):
+    data = qoi_image.read_bytes()
+    expected = qoi_decode(data).data
+
+    decoder = QOIStreamDecoder(
+        BytesIO(data), rows_per_band=rows_per_band, chunk_size=chunk_size
+    )
+    bands = list(decoder)
+
+    assert all(band.shape[1:] == expected.shape[1:] for band in bands)
+    assert all(len(band) == rows_per_band for band in bands[:-1])
+    assert np.array_equal(np.concatenate(bands), expected)
+
+
+def test_stream_decoder_tiny_chunks():
+    # Opcodes and runs are split across every possible chunk boundary
+    data = (ASSETS_PATH / "testcard_rgba.qoi").read_bytes()[:2000]
+
+    bands = list(QOIStreamDecoder(BytesIO(data), rows_per_band=3, chunk_size=7))
+
+    assert np.array_equal(np.concatenate(bands), qoi_decode(data).data)
+
+
+@pytest.mark.parametrize("channels", [QOIChannelCount.RGBA, 4])
+def test_stream_decoder_channels(channels: QOIChannelCount | int):
+    data = (ASSETS_PATH / "kodim23.qoi").read_bytes()
+    expected = qoi_decode(data, QOIChannelCount.RGBA).data
+
+    decoder = QOIStreamDecoder(BytesIO(data), channels=channels)
+
+    assert np.array_equal(np.concatenate(list(decoder)), expected)
+
+
+def test_stream_decoder_truncated_data():
+    data = (ASSETS_PATH / "dice.qoi").read_bytes()
+    truncated = data[: len(data) // 2]
+
+    bands = list(QOIStreamDecoder(BytesIO(truncated), rows_per_band=16))
+
+    assert np.array_equal(np.concatenate(bands), qoi_decode(truncated).data)
+
+
+@pytest.mark.parametrize("rows_per_band", [1, 7, 1000])
+@pytest.mark.parametrize(
+    "qoi_image", sorted(ASSETS_PATH.glob("*.qoi")), ids=lambda path: path.stem
+)
+def test_stream_encoder_matches_qoi_encode(qoi_image: Path, rows_per_band: int):
+    image = qoi_decode(qoi_image.read_bytes()).data
+    height, width, channels = image.shape
+
+    sink = bytearray()
+    with QOIStreamEncoder(sink, width, height, QOIChannelCount(channels)) as encoder:
+        for row in range(0, height, rows_per_band):
+            encoder.write_rows(image[row : row + rows_per_band])
+
+    assert bytes(sink) == qoi_encode(image)
+
+
+def test_stream_encoder_file_sink():
+    image = np.zeros((3, 200, 3), dtype=np.uint8)
+    image[1, 100:] = 7
+
+    with BytesIO() as sink:
+        encoder = QOIStreamEncoder(sink, 200, 3, QOIChannelCount.RGB)
+        for row in image:
+            encoder.write_rows(row[np.newaxis])
+        encoder.close()
+
+        assert sink.getvalue() == qoi_encode(image)
+
+
+def test_stream_encoder_validates_rows():
+    encoder = QOIStreamEncoder(bytearray(), 4, 2, QOIChannelCount.RGB)
+
+    with pytest.raises(ValueError, match="shape"):
+        encoder.write_rows(np.zeros((1, 4, 4), dtype=np.uint8))
+    with pytest.raises(ValueError, match="rows are left"):
+        encoder.write_rows(np.zeros((3, 4, 3), dtype=np.uint8))
+
+    encoder.write_rows(np.zeros((1, 4, 3), dtype=np.uint8))
+    with pytest.raises(ValueError, match="1 of 2 rows"):
+        encoder.close()
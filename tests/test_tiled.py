@@ -0,0 +1,166 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from qoi_py import (
+    QOITiledImage,
+    qoi_decode,
+    qoi_decode_file,
+    qoi_decode_tiled,
+    qoi_encode,
+    qoi_encode_tiled,
+)
+from qoi_py._structure import QOITiledHeader
+from qoi_py.types import QOIChannelCount, QOIColorspace
+
+ASSETS_PATH = Path(__file__).parent / "assets"
+
+
+@pytest.fixture(scope="module")
+def image() -> np.ndarray:
+    return qoi_decode_file(ASSETS_PATH / "testcard_rgba.qoi").data
+
+
+@pytest.mark.parametrize(
+    "tile_width, tile_height", [(256, 256), (64, 64), (100, 37), (256, 16), (1, 300)]
+)
+def test_roundtrip(image: np.ndarray, tile_width: int, tile_height: int):
+    encoded = qoi_encode_tiled(image, tile_width, tile_height, workers=2)
+
+    assert np.array_equal(qoi_decode_tiled(encoded, workers=2).data, image)
+
+
+def test_tiles_are_independent_qoi_images(image: np.ndarray):
+    tiled = QOITiledImage(qoi_encode_tiled(image, 100, 64))
+
+    assert (tiled.header.columns, tiled.header.rows) == (3, 4)
+    tile = tiled.tile(2, 3)
+    assert bytes(tile) == qoi_encode(image[192:256, 200:256])
+    with pytest.raises(IndexError):
+        tiled.tile(3, 0)
+
+
+@pytest.mark.parametrize(
+    "region", [(0, 0, 256, 256), (10, 20, 30, 40), (63, 63, 2, 2), (255, 0, 1, 256)]
+)
+def test_decode_region(image: np.ndarray, region: tuple[int, int, int, int]):
+    x, y, width, height = region
+    tiled = QOITiledImage(qoi_encode_tiled(image, 64, 64))
+
+    decoded = tiled.decode_region(x, y, width, height)
+
+    assert np.array_equal(decoded.data, image[y : y + height, x : x + width])
+
+
+def test_decode_region_reads_only_overlapping_tiles(image: np.ndarray):
+    encoded = bytearray(qoi_encode_tiled(image, 64, 64))
+    header = QOITiledHeader.from_bytes(encoded)
+    # Corrupt every tile except the first one
+    for start in header.offsets[1:-1]:
+        encoded[start : start + 4] = b"junk"
+    tiled = QOITiledImage(encoded)
+
+    assert np.array_equal(tiled.decode_region(5, 5, 50, 50).data, image[5:55, 5:55])
+    with pytest.raises(ValueError, match="Invalid QOI header"):
+        tiled.decode_region(60, 0, 10, 10)
+
+
+@pytest.mark.parametrize(
+    "region", [(-1, 0, 1, 1), (0, 0, 257, 1), (200, 200, 57, 10), (0, 0, 1, -1)]
+)
+def test_decode_region_outside_image(image: np.ndarray, region):
+    tiled = QOITiledImage(qoi_encode_tiled(image, 64, 64))
+
+    with pytest.raises(ValueError, match="not within"):
+        tiled.decode_region(*region)
+
+
+def test_open_file(image: np.ndarray, tmp_path: Path):
+    path = tmp_path / "image.qoit"
+    path.write_bytes(qoi_encode_tiled(image, 32, 32, QOIColorspace.LINEAR_RGB))
+
+    with QOITiledImage.open(path) as tiled:
+        decoded = tiled.decode_region(16, 16, 64, 64, QOIChannelCount.RGBA)
+
+    assert decoded.colorspace == QOIColorspace.LINEAR_RGB
+    assert np.array_equal(decoded.data, image[16:80, 16:80])
+
+
+def test_open_file_closes_after_error(image: np.ndarray, tmp_path: Path):
+    path = tmp_path / "image.qoit"
+    encoded = bytearray(qoi_encode_tiled(image, 32, 32))
+    start = QOITiledHeader.from_bytes(encoded).offsets[0]
+    encoded[start : start + 4] = b"junk"
+    path.write_bytes(encoded)
+
+    with pytest.raises(ValueError, match="Invalid QOI header"):
+        with QOITiledImage.open(path) as tiled:
+            tiled.decode_region(16, 16, 64, 64, QOIChannelCount.RGB)
+
+
+def test_empty_image():
+    image = np.zeros((0, 5, 3), dtype=np.uint8)
+
+    decoded = qoi_decode_tiled(qoi_encode_tiled(image))
+
+    assert decoded.data.shape == (0, 5, 3)
+
+
+@pytest.mark.parametrize(
+    "data", [b"", b"qoif" + bytes(30), qoi_encode(np.zeros((2, 2, 3), np.uint8))]
+)
+def test_invalid_container(data: bytes):
+    with pytest.raises(ValueError, match="Invalid tiled QOI header"):
+        QOITiledImage(data)
+
+
+def test_truncated_container(image: np.ndarray):
+    encoded = qoi_encode_tiled(image, 64, 64)
+
+    with pytest.raises(ValueError, match="truncated"):
+        QOITiledImage(encoded[:-1])
+
+
+def test_tile_of_wrong_size(image: np.ndarray):
+    header = QOITiledHeader.from_bytes(qoi_encode_tiled(image, 32, 32))
+    tiles = [qoi_encode(image[:32, :32])] * (len(header.offsets) - 1)
+    # Swap the second tile for a valid 1x1 image
+    tiles[1] = qoi_encode(image[:1, :1])
+    offsets = [header.offsets[0]]
+    for tile in tiles:
+        offsets.append(offsets[-1] + len(tile))
+    header = QOITiledHeader(
+        image=header.image, tile_width=32, tile_height=32, offsets=tuple(offsets)
+    )
+
+    with pytest.raises(ValueError, match="Tile 1 is 1x1, expected 32x32"):
+        qoi_decode_tiled(header.to_bytes() + b"".join(tiles))
+
+
+@pytest.mark.parametrize(
+    "tile, offset", [(0, 0), (2, 100)], ids=["inside header", "overlapping"]
+)
+def test_invalid_offsets(image: np.ndarray, tile: int, offset: int):
+    header = QOITiledHeader.from_bytes(qoi_encode_tiled(image, 128, 128))
+    offsets = list(header.offsets)
+    offsets[tile] = offset
+    invalid = QOITiledHeader(
+        image=header.image, tile_width=128, tile_height=128, offsets=tuple(offsets)
+    )
+
+    with pytest.raises(ValueError, match="Invalid tiled QOI header"):
+        QOITiledHeader.from_bytes(invalid.to_bytes())
+
+
+def test_invalid_tile_size(image: np.ndarray):
+    with pytest.raises(ValueError, match="tile size"):
+        qoi_encode_tiled(image, 0, 64)
+
+
+def test_header_roundtrip(image: np.ndarray):
+    header = QOITiledHeader.from_bytes(qoi_encode_tiled(image, 128, 100))
+
+    assert QOITiledHeader.from_bytes(header.to_bytes()) == header
+    assert len(header.to_bytes()) == header.size == header.offsets[0]
+    assert qoi_decode(bytes(QOITiledImage(qoi_encode_tiled(image)).tile(0, 0)))